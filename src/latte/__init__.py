@@ -1,8 +1,12 @@
 import sys
-from typing import Optional
+from contextlib import contextmanager
+from typing import Iterator, Optional
 import types
 
+__VALID_VALIDATION_LEVEL__ = ["full", "shape-only", "off"]
+
 setattr(sys.modules[__name__], "RANDOM_STATE", None)
+setattr(sys.modules[__name__], "VALIDATION_LEVEL", "full")
 
 
 def seed(seed: Optional[int] = 42):
@@ -16,3 +20,42 @@ def seed(seed: Optional[int] = 42):
         Set to None for non-deterministic behavior.
     """
     setattr(sys.modules[__name__], "RANDOM_STATE", seed)
+
+
+def set_validation_level(level: str = "full"):
+    """
+    Set the level of input validation performed by the metrics
+
+    Parameters
+    ----------
+    level : str, optional
+        Validation level, by default "full". Must be one of {"full", "shape-only", "off"}.
+        If "full", the shapes and the values of the inputs are validated.
+        If "shape-only", only the shapes of the inputs are validated, and the O(n) checks on the input values (e.g., non-constant and equally-spaced interpolation points) are skipped.
+        If "off", no input validation is performed. This should only be used when the inputs are already known to be valid, as invalid inputs may then lead to silently incorrect results.
+    """
+    assert level in __VALID_VALIDATION_LEVEL__
+    setattr(sys.modules[__name__], "VALIDATION_LEVEL", level)
+
+
+@contextmanager
+def validation_level(level: str) -> Iterator[None]:
+    """
+    Context manager for temporarily setting the level of input validation performed by the metrics
+
+    Parameters
+    ----------
+    level : str
+        Validation level within the context. See `set_validation_level` for details.
+
+    Examples
+    --------
+    >>> with latte.validation_level("off"):
+    ...     smth = smoothness(z, a)
+    """
+    prev = getattr(sys.modules[__name__], "VALIDATION_LEVEL")
+    set_validation_level(level)
+    try:
+        yield
+    finally:
+        set_validation_level(prev)
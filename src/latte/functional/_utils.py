@@ -0,0 +1,130 @@
+import sys
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def _get_validation_level() -> str:
+    # this should be read inside a function, in case the level changes after this file is imported
+    return getattr(sys.modules[__name__.split(".")[0]], "VALIDATION_LEVEL")
+
+
+def _group_slices(groups: np.ndarray) -> Tuple[Optional[np.ndarray], list, List[slice]]:
+    """
+    Sort samples by group id and find the contiguous slice of each group.
+
+    Parameters
+    ----------
+    groups : np.ndarray, (n_samples,)
+        group id of each sample
+
+    Returns
+    -------
+    Tuple[Optional[np.ndarray], list, List[slice]]
+        A tuple of
+        - the stable sorting order of the samples, or None if the samples are already sorted by group id
+        - the unique group ids, in sorted order
+        - the slice of each group in the sorted samples
+    """
+
+    groups = np.asarray(groups)
+
+    assert groups.ndim == 1, "`groups` must be a 1D array"
+
+    n_samples = groups.shape[0]
+
+    if n_samples > 1 and np.any(groups[1:] < groups[:-1]):
+        order = np.argsort(groups, kind="stable")
+        sorted_groups = groups[order]
+    else:
+        order = None
+        sorted_groups = groups
+
+    bounds = np.concatenate(
+        [[0], np.flatnonzero(sorted_groups[1:] != sorted_groups[:-1]) + 1, [n_samples]]
+    )
+
+    keys = [sorted_groups[start].item() for start in bounds[:-1]]
+    slices = [slice(start, end) for start, end in zip(bounds[:-1], bounds[1:])]
+
+    return order, keys, slices
+
+
+def _sort_by_group(
+    groups: np.ndarray, *arrays: Optional[np.ndarray]
+) -> Tuple[list, List[slice], List[Optional[np.ndarray]]]:
+    """
+    Sort arrays along the sample axis by group id, so that each group is a contiguous slice.
+
+    Parameters
+    ----------
+    groups : np.ndarray, (n_samples,)
+        group id of each sample
+    *arrays : Optional[np.ndarray]
+        arrays with the sample axis first. None entries are passed through.
+
+    Returns
+    -------
+    Tuple[list, List[slice], List[Optional[np.ndarray]]]
+        A tuple of
+        - the unique group ids, in sorted order
+        - the slice of each group in the sorted arrays
+        - the sorted arrays. If the samples are already sorted by group id, the input arrays are returned without copying.
+    """
+
+    order, keys, slices = _group_slices(groups)
+
+    for x in arrays:
+        if x is not None:
+            assert x.shape[0] == len(groups), "`groups` must have one entry per sample"
+
+    if order is not None:
+        arrays = tuple(x[order] if x is not None else None for x in arrays)
+
+    return keys, slices, list(arrays)
+
+
+def _apply_grouped(
+    func: Callable[..., Any],
+    groups: np.ndarray,
+    *arrays: np.ndarray,
+    **kwarrays: Optional[np.ndarray]
+) -> Dict[Any, Any]:
+    """
+    Evaluate a function on each group of samples.
+
+    The arrays are sorted by group id once, and the function is evaluated on the contiguous slice of each group.
+
+    Parameters
+    ----------
+    func : Callable[..., Any]
+        function to evaluate on each group
+    groups : np.ndarray, (n_samples,)
+        group id of each sample
+    *arrays : np.ndarray
+        positional array arguments to `func`, with the sample axis first
+    **kwarrays : Optional[np.ndarray]
+        keyword array arguments to `func`, with the sample axis first. None values are passed through.
+
+    Returns
+    -------
+    Dict[Any, Any]
+        A dictionary mapping each group id to the output of `func` on that group.
+    """
+
+    names = list(kwarrays.keys())
+
+    keys, slices, sorted_arrays = _sort_by_group(
+        groups, *arrays, *[kwarrays[k] for k in names]
+    )
+
+    args = sorted_arrays[: len(arrays)]
+    kwargs = dict(zip(names, sorted_arrays[len(arrays) :]))
+
+    return {
+        key: func(
+            *[x[sl] for x in args],
+            **{k: (v[sl] if v is not None else None) for k, v in kwargs.items()}
+        )
+        for key, sl in zip(keys, slices)
+    }
@@ -1,7 +1,9 @@
-from typing import Dict, List, Optional, cast
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple, Union, cast
 
 import numpy as np
 
+from .._utils import _apply_grouped
 from ..disentanglement import _utils
 
 from ..disentanglement import mutual_info as minfo
@@ -12,7 +14,15 @@ def dependency_aware_mutual_info_bundle(
     a: np.ndarray,
     reg_dim: Optional[List[int]] = None,
     discrete: bool = False,
-) -> Dict[str, np.ndarray]:
+    anytime: bool = False,
+    anytime_tol: float = 1e-2,
+    anytime_min_samples: int = 5000,
+    max_samples: Optional[int] = None,
+    mask: Optional[np.ndarray] = None,
+    groups: Optional[np.ndarray] = None,
+) -> Union[
+    Dict[str, np.ndarray], Tuple[Dict[str, np.ndarray], int, bool], Dict[Any, Any]
+]:
     """
     Calculate Mutual Information Gap (MIG), Dependency-Aware Mutual Information Gap (DMIG), Dependency-Blind Mutual Information Gap (XMIG), and Dependency-Aware Latent Information Gap (DLIG) between latent vectors (`z`) and attributes (`a`).
 
@@ -27,11 +37,25 @@ def dependency_aware_mutual_info_bundle(
         Attribute `a[:, i]` is regularized by `z[:, reg_dim[i]]`. If `None`, `a[:, i]` is assumed to be regularized by `z[:, i]`. Note that this is the `reg_dim` behavior of the dependency-aware family but is different from the default `reg_dim` behavior of the conventional MIG.
     discrete : bool, optional
         Whether the attributes are discrete, by default False
+    anytime : bool, optional
+        Whether to use the anytime estimation, by default False. If True, the metrics are estimated on progressively larger random subsamples (growing by a factor of 4 from `anytime_min_samples`) until no value of any metric changes by `anytime_tol` or more between two successive rounds.
+    anytime_tol : float, optional
+        convergence tolerance of the anytime estimation, by default 1e-2. Ignored if `anytime` is False.
+    anytime_min_samples : int, optional
+        size of the first subsample of the anytime estimation, by default 5000. Ignored if `anytime` is False.
+    max_samples : Optional[int], optional
+        maximum number of samples used in the calculation, by default None (i.e., all samples are used). If there are more samples than `max_samples`, a random subsample seeded by `latte.RANDOM_STATE` is drawn. If `discrete` is True, the subsample is stratified by the attribute classes so that rare classes are retained.
+    mask : Optional[np.ndarray], (n_samples, n_attributes) or (n_samples,), optional
+        boolean mask of labelled attribute values, by default None. Each attribute is evaluated only on the samples in which it is labelled. NaN attribute values are always treated as unlabelled.
+    groups : Optional[np.ndarray], (n_samples,), optional
+        group id of each sample, by default None. If provided, the metrics are evaluated separately on each group of samples.
 
     Returns
     -------
     Dict[str, np.ndarray]
         A dictionary of mutual information metrics with keys ['MIG', 'DMIG', 'XMIG', 'DLIG'] each mapping to a corresponding metric np.ndarray of shape (n_attributes,).
+        If `anytime` is True, a tuple of the dictionary, the number of samples used in the final estimate, and whether the final two estimates agreed within `anytime_tol` is returned instead.
+        If `groups` is provided, a dictionary mapping each group id to the above is returned instead.
         
     See Also
     --------
@@ -47,7 +71,46 @@ def dependency_aware_mutual_info_bundle(
     .. [3] K. N. Watcharasupat, “Controllable Music: Supervised Learning of Disentangled Representations for Music Generation”, 2021.
     """
 
-    return _optimized_dependency_aware_mutual_info_bundle(z, a, reg_dim, discrete)
+    if groups is not None:
+        z, a, reg_dim = _utils._validate_za_shape(z, a, reg_dim, fill_reg_dim=True)
+        return _apply_grouped(
+            partial(
+                dependency_aware_mutual_info_bundle,
+                reg_dim=reg_dim,
+                discrete=discrete,
+                anytime=anytime,
+                anytime_tol=anytime_tol,
+                anytime_min_samples=anytime_min_samples,
+                max_samples=max_samples,
+            ),
+            groups,
+            z,
+            a,
+            mask=mask,
+        )
+
+    if anytime or max_samples is not None:
+        z, a, reg_dim = _utils._validate_za_shape(z, a, reg_dim, fill_reg_dim=True)
+        mask = _utils._validate_attr_mask(a, mask)
+        z, a, mask = _utils._subsample_za(z, a, max_samples, discrete, mask)
+
+    if anytime:
+        return _utils._anytime_estimate(
+            partial(
+                _optimized_dependency_aware_mutual_info_bundle,
+                reg_dim=reg_dim,
+                discrete=discrete,
+            ),
+            z,
+            a,
+            tol=anytime_tol,
+            min_samples=anytime_min_samples,
+            mask=mask,
+        )
+
+    return _optimized_dependency_aware_mutual_info_bundle(
+        z, a, reg_dim, discrete, mask=mask
+    )
 
 
 def _optimized_dependency_aware_mutual_info_bundle(
@@ -55,6 +118,7 @@ def _optimized_dependency_aware_mutual_info_bundle(
     a: np.ndarray,
     reg_dim: Optional[List[int]] = None,
     discrete: bool = False,
+    mask: Optional[np.ndarray] = None,
 ) -> Dict[str, np.ndarray]:
     """
     Calculate, using optimized implementation, Mutual Information Gap (MIG), Dependency-Aware Mutual Information Gap (DMIG), Dependency-Blind Mutual Information Gap (XMIG), and Dependency-Aware Latent Information Gap (DLIG) between latent vectors (`z`) and attributes (`a`).
@@ -70,6 +134,8 @@ def _optimized_dependency_aware_mutual_info_bundle(
         Attribute `a[:, i]` is regularized by `z[:, reg_dim[i]]`. If `None`, `a[:, i]` is assumed to be regularized by `z[:, i]`. Note that this is the `reg_dim` behavior of the dependency-aware family but is different from the default `reg_dim` behavior of the conventional MIG.
     discrete : bool, optional
         Whether the attributes are discrete, by default False
+    mask : Optional[np.ndarray], (n_samples, n_attributes) or (n_samples,), optional
+        boolean mask of labelled attribute values, by default None. Each attribute is evaluated only on the samples in which it is labelled. NaN attribute values are always treated as unlabelled.
 
     Returns
     -------
@@ -87,6 +153,8 @@ def _optimized_dependency_aware_mutual_info_bundle(
 
     reg_dim = cast(List[int], reg_dim)  # make type checker happy
 
+    valid = _utils._validate_attr_mask(a, mask)
+
     _, n_attr = a.shape
 
     assert n_attr > 1, "DLIG requires at least two attributes"
@@ -96,16 +164,19 @@ def _optimized_dependency_aware_mutual_info_bundle(
     xmig_ret = np.zeros((n_attr,))
 
     for i in range(n_attr):
-        ai = a[:, i]
+        rows = _utils._valid_rows(valid, i)
+        ai = a[rows, i]
         zi = reg_dim[i]
 
         en = minfo._entropy(ai, discrete)
-        mi = minfo._latent_attr_mutual_info(z, ai, discrete)
+        mi = minfo._latent_attr_mutual_info(z[rows], ai, discrete)
 
         gap, zj = _utils._top2gap(mi, zi)
 
         if zj in reg_dim:
-            cen = minfo._conditional_entropy(ai, a[:, reg_dim.index(zj)], discrete)
+            l = reg_dim.index(zj)
+            rows = _utils._valid_rows(valid, i, l)
+            cen = minfo._conditional_entropy(a[rows, i], a[rows, l], discrete)
         else:
             cen = minfo._entropy(ai, discrete)
 
@@ -119,11 +190,12 @@ def _optimized_dependency_aware_mutual_info_bundle(
 
     for i, zi in enumerate(reg_dim):
 
-        mi = minfo._attr_latent_mutual_info(z[:, zi], a, discrete)
+        mi = minfo._attr_latent_mutual_info(z[:, zi], a, discrete, valid)
 
         gap, j = _utils._top2gap(mi, i)
 
-        cen = minfo._conditional_entropy(a[:, i], a[:, j], discrete)
+        rows = _utils._valid_rows(valid, i, j)
+        cen = minfo._conditional_entropy(a[rows, i], a[rows, j], discrete)
 
         dlig_ret[i] = gap / cen
 
@@ -1,16 +1,23 @@
-from typing import Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 
+from .._utils import _sort_by_group
 from ..interpolatability import _utils
 
 from ..interpolatability.monotonicity import (
-    _get_monotonicity_from_liad,
+    _get_sample_monotonicity_from_liad,
+    _get_sample_monotonicity_from_ragged_liad,
     _validate_monotonicity_args,
 )
 from ..interpolatability.smoothness import (
     _get_2nd_order_liad,
-    _get_smoothness_from_liads,
+    _get_ragged_2nd_order_liad,
+    _get_sample_smoothness_from_liads,
+    _get_sample_smoothness_from_ragged_liads,
+    _get_sample_smoothness_from_ratio,
+    _get_smoothness_numerator,
+    _reduce_smoothness,
     _validate_smoothness_args,
 )
 
@@ -23,34 +30,38 @@ def liad_interpolatability_bundle(
     max_mode: str = "lehmer",
     ptp_mode: Union[float, str] = "naive",
     reduce_mode: str = "attribute",
-    liad_thresh: float = 1e-3,
+    liad_thresh: Union[float, np.ndarray] = 1e-3,
     degenerate_val: float = np.nan,
     nanmean: bool = True,
     clamp: bool = False,
     p: float = 2.0,
-) -> Dict[str, np.ndarray]:
+    groups: Optional[np.ndarray] = None,
+    chunk_size: Optional[int] = None,
+    model_axis: bool = False,
+    offsets: Optional[np.ndarray] = None,
+) -> Union[Dict[str, np.ndarray], Dict[Any, Dict[str, np.ndarray]]]:
     """
     Calculate latent smoothness and monotonicity.
 
     Parameters
     ----------
-    z : np.ndarray, (n_samples, n_interp) or (n_samples, n_features or n_attributes, n_interp)
-        a batch of latent vectors
+    z : np.ndarray, (n_samples, n_interp), (n_samples, n_features or n_attributes, n_interp), (n_interp,), or (n_features or n_attributes, n_interp)
+        a batch of latent vectors, or interpolation points shared by all samples. A 1D `z` is shared by all samples and attributes. A 2D `z` is shared by all samples if `a` is 3D, unless `a` has a single attribute and `z` has one row per sample.
     a : np.ndarray, (n_samples, n_interp) or (n_samples, n_attributes, n_interp)
         a batch of attribute(s)
     reg_dim : Optional[List], optional
         regularized dimensions, by default None
         Attribute `a[:, i]` is regularized by `z[:, reg_dim[i]]`. If `None`, `a[:, i]` is assumed to be regularized by `z[:, i]`.
     liad_mode : str, optional
-        options for calculating LIAD, by default "forward". Only "forward" is currently supported.
+        options for calculating LIAD, by default "forward". Must be one of {"forward", "central", "spline"}. If "forward", forward differences are used. If "central", second-order accurate central differences at the interior interpolation points are used. If "spline", the derivatives of the natural cubic spline through the interpolation points are used.
     max_mode : str, optional
         options for calculating array maximum of 2nd order LIAD, by default "lehmer". Must be one of {"lehmer", "naive"}. If "lehmer", the maximum is calculated using the Lehmer mean with power `p`. If "naive", the maximum is calculated using the naive array maximum. Only affects smoothness.
     ptp_mode : str, optional
         options for calculating range of 1st order LIAD for normalization, by default "naive". Must be either "naive" or a float value in (0.0, 1.0]. If "naive", the range is calculated using the naive peak-to-peak range. If float, the range is taken to be the range between quantile `0.5-0.5*ptp_mode` and quantile `0.5+0.5*ptp_mode`. Only affects smoothness.
     reduce_mode : str, optional
         options for reduction of the return array, by default "attribute". Must be one of {"attribute", "samples", "all", "none"}. If "all", returns a scalar. If "attribute", an average is taken along the sample axis and the return array is of shape `(n_attributes,)`. If "samples", an average is taken along the attribute axis and the return array is of shape `(n_samples,)`. If "none", returns a smoothness matrix of shape `(n_samples, n_attributes,)`.
-    liad_thresh : float, optional
-        threshold for ignoring noisy 1st order LIAD, by default 1e-3. Only affects monotonicity.
+    liad_thresh : Union[float, np.ndarray], optional
+        threshold for ignoring noisy 1st order LIAD, by default 1e-3. If a 1D array of thresholds is provided, a monotonicity curve with an additional leading axis of size `n_thresholds` is returned. Only affects monotonicity.
     degenerate_val : float, optional
         fill value for samples with all noisy LIAD (i.e., absolute value below `liad_thresh`), by default np.nan. Another possible option is to set this to 0.0. Only affects monotonicity.
     nanmean : bool, optional
@@ -59,11 +70,20 @@ def liad_interpolatability_bundle(
         Whether to clamp smoothness to [0, 1], by default False. Only affects smoothness.
     p : float, optional
         Lehmer mean power, by default 2.0 (i.e., contraharmonic mean). Only used if `max_mode == "lehmer"`. Must be greater than 1.0. Only affects smoothness.
+    groups : Optional[np.ndarray], (n_samples,), optional
+        group id of each sample, by default None. If provided, the metrics are evaluated separately on each group of samples. The LIADs are computed only once for all groups.
+    chunk_size : Optional[int], optional
+        number of samples to process at a time, by default None. If provided, `z` and `a` can be any arrays supporting slicing along the sample axis, such as `np.memmap`, and only one chunk of them is loaded into memory at a time. If None, all samples are processed at once.
+    model_axis : bool, optional
+        whether `z` and `a` have a leading model axis, by default False. If True, `z` and `a` are of shape `(n_models, ...)`, where `...` is one of the shapes above, and all models are evaluated at once. The return array(s) then have an additional leading axis of size `n_models`.
+    offsets : Optional[np.ndarray], (n_samples + 1,), optional
+        start of each sample in `z` and `a`, followed by their length, by default None. If provided, `z` and `a` are ragged: the interpolation points of all samples, whose number may differ between samples, are concatenated along the first axis without padding, and sample `i` spans `z[offsets[i]:offsets[i + 1]]` and `a[offsets[i]:offsets[i + 1]]`. `z` is then of shape `(n_values,)` or `(n_values, n_features or n_attributes)` and `a` of shape `(n_values,)` or `(n_values, n_attributes)`. The per-sample results are obtained with segment reductions over the concatenated LIADs. Only `liad_mode="forward"` is supported, and `chunk_size` and `model_axis` cannot be used.
 
     Returns
     -------
     Dict[str, np.ndarray]
         A dictionary of LIAD-based interpolatability metrics with keys ['smoothness', 'monotonicity'] each mapping to a corresponding metric np.ndarray. See `reduce_mode` for details on the shape of the return arrays.
+        If `groups` is provided, a dictionary mapping each group id to the above is returned instead.
         
     See Also
     --------
@@ -88,6 +108,10 @@ def liad_interpolatability_bundle(
         nanmean=nanmean,
         clamp=clamp,
         p=p,
+        groups=groups,
+        chunk_size=chunk_size,
+        model_axis=model_axis,
+        offsets=offsets,
     )
 
 
@@ -99,34 +123,38 @@ def _optimized_liad_interpolatability_bundle(
     max_mode: str = "lehmer",
     ptp_mode: Union[float, str] = "naive",
     reduce_mode: str = "attribute",
-    liad_thresh: float = 1e-3,
+    liad_thresh: Union[float, np.ndarray] = 1e-3,
     degenerate_val: float = np.nan,
     nanmean: bool = True,
     clamp: bool = False,
     p: float = 2.0,
-) -> Dict[str, np.ndarray]:
+    groups: Optional[np.ndarray] = None,
+    chunk_size: Optional[int] = None,
+    model_axis: bool = False,
+    offsets: Optional[np.ndarray] = None,
+) -> Union[Dict[str, np.ndarray], Dict[Any, Dict[str, np.ndarray]]]:
     """
     Calculate latent smoothness and monotonicity, using optimized implementation.
 
     Parameters
     ----------
-    z : np.ndarray, (n_samples, n_interp) or (n_samples, n_features or n_attributes, n_interp)
-        a batch of latent vectors
+    z : np.ndarray, (n_samples, n_interp), (n_samples, n_features or n_attributes, n_interp), (n_interp,), or (n_features or n_attributes, n_interp)
+        a batch of latent vectors, or interpolation points shared by all samples. A 1D `z` is shared by all samples and attributes. A 2D `z` is shared by all samples if `a` is 3D, unless `a` has a single attribute and `z` has one row per sample.
     a : np.ndarray, (n_samples, n_interp) or (n_samples, n_attributes, n_interp)
         a batch of attribute(s)
     reg_dim : Optional[List], optional
         regularized dimensions, by default None
         Attribute `a[:, i]` is regularized by `z[:, reg_dim[i]]`. If `None`, `a[:, i]` is assumed to be regularized by `z[:, i]`.
     liad_mode : str, optional
-        options for calculating LIAD, by default "forward". Only "forward" is currently supported.
+        options for calculating LIAD, by default "forward". Must be one of {"forward", "central", "spline"}. If "forward", forward differences are used. If "central", second-order accurate central differences at the interior interpolation points are used. If "spline", the derivatives of the natural cubic spline through the interpolation points are used.
     max_mode : str, optional
         options for calculating array maximum of 2nd order LIAD, by default "lehmer". Must be one of {"lehmer", "naive"}. If "lehmer", the maximum is calculated using the Lehmer mean with power `p`. If "naive", the maximum is calculated using the naive array maximum. Only affects smoothness.
     ptp_mode : str, optional
         options for calculating range of 1st order LIAD for normalization, by default "naive". Must be either "naive" or a float value in (0.0, 1.0]. If "naive", the range is calculated using the naive peak-to-peak range. If float, the range is taken to be the range between quantile `0.5-0.5*ptp_mode` and quantile `0.5+0.5*ptp_mode`. Only affects smoothness.
     reduce_mode : str, optional
         options for reduction of the return array, by default "attribute". Must be one of {"attribute", "samples", "all", "none"}. If "all", returns a scalar. If "attribute", an average is taken along the sample axis and the return array is of shape `(n_attributes,)`. If "samples", an average is taken along the attribute axis and the return array is of shape `(n_samples,)`. If "none", returns a smoothness matrix of shape `(n_samples, n_attributes,)`.
-    liad_thresh : float, optional
-        threshold for ignoring noisy 1st order LIAD, by default 1e-3. Only affects monotonicity.
+    liad_thresh : Union[float, np.ndarray], optional
+        threshold for ignoring noisy 1st order LIAD, by default 1e-3. If a 1D array of thresholds is provided, a monotonicity curve with an additional leading axis of size `n_thresholds` is returned. Only affects monotonicity.
     degenerate_val : float, optional
         fill value for samples with all noisy LIAD (i.e., absolute value below `liad_thresh`), by default np.nan. Another possible option is to set this to 0.0. Only affects monotonicity.
     nanmean : bool, optional
@@ -135,11 +163,20 @@ def _optimized_liad_interpolatability_bundle(
         Whether to clamp smoothness to [0, 1], by default False. Only affects smoothness.
     p : float, optional
         Lehmer mean power, by default 2.0 (i.e., contraharmonic mean). Only used if `max_mode == "lehmer"`. Must be greater than 1.0. Only affects smoothness.
+    groups : Optional[np.ndarray], (n_samples,), optional
+        group id of each sample, by default None. If provided, the metrics are evaluated separately on each group of samples. The LIADs are computed only once for all groups.
+    chunk_size : Optional[int], optional
+        number of samples to process at a time, by default None. If provided, `z` and `a` can be any arrays supporting slicing along the sample axis, such as `np.memmap`, and only one chunk of them is loaded into memory at a time. If None, all samples are processed at once.
+    model_axis : bool, optional
+        whether `z` and `a` have a leading model axis, by default False. If True, `z` and `a` are of shape `(n_models, ...)`, where `...` is one of the shapes above, and all models are evaluated at once. The return array(s) then have an additional leading axis of size `n_models`.
+    offsets : Optional[np.ndarray], (n_samples + 1,), optional
+        start of each sample in `z` and `a`, followed by their length, by default None. If provided, `z` and `a` are ragged: the interpolation points of all samples, whose number may differ between samples, are concatenated along the first axis without padding, and sample `i` spans `z[offsets[i]:offsets[i + 1]]` and `a[offsets[i]:offsets[i + 1]]`. `z` is then of shape `(n_values,)` or `(n_values, n_features or n_attributes)` and `a` of shape `(n_values,)` or `(n_values, n_attributes)`. The per-sample results are obtained with segment reductions over the concatenated LIADs. Only `liad_mode="forward"` is supported, and `chunk_size` and `model_axis` cannot be used.
 
     Returns
     -------
     Dict[str, np.ndarray]
         A dictionary of LIAD-based interpolatability metrics with keys ['smoothness', 'monotonicity'] each mapping to a corresponding metric np.ndarray. See `reduce_mode` for details on the shape of the return arrays.
+        If `groups` is provided, a dictionary mapping each group id to the above is returned instead.
         
     See Also
     --------
@@ -166,32 +203,316 @@ def _optimized_liad_interpolatability_bundle(
         nanmean=nanmean,
     )
 
-    z, a = _utils._validate_za_shape(z, a, reg_dim=reg_dim, min_size=3)
+    if offsets is not None:
+        assert (
+            chunk_size is None and not model_axis
+        ), "`chunk_size` and `model_axis` cannot be used with ragged inputs"
+        smth, flat, mntc = _get_sample_liad_interpolatability_ragged(
+            z,
+            a,
+            offsets,
+            reg_dim=reg_dim,
+            liad_mode=liad_mode,
+            max_mode=max_mode,
+            ptp_mode=ptp_mode,
+            liad_thresh=liad_thresh,
+            degenerate_val=degenerate_val,
+            clamp=clamp,
+            p=p,
+        )
+    else:
+        smth, flat, mntc = _utils._apply_chunked(
+            _get_sample_liad_interpolatability,
+            z,
+            a,
+            chunk_size=chunk_size,
+            model_axis=model_axis,
+            reg_dim=reg_dim,
+            liad_mode=liad_mode,
+            max_mode=max_mode,
+            ptp_mode=ptp_mode,
+            liad_thresh=liad_thresh,
+            degenerate_val=degenerate_val,
+            clamp=clamp,
+            p=p,
+            pool=_utils._LiadBufferPool(),
+        )
+
+    if groups is not None:
+        # the sample axis is moved to the front for grouping
+        keys, slices, (smth, flat, mntc) = _sort_by_group(
+            groups,
+            np.moveaxis(smth, -2, 0),
+            np.moveaxis(flat, -2, 0),
+            np.moveaxis(mntc, -2, 0),
+        )
+        return {
+            key: _reduce_liad_interpolatability(
+                np.moveaxis(smth[sl], 0, -2),
+                np.moveaxis(flat[sl], 0, -2),
+                np.moveaxis(mntc[sl], 0, -2),
+                reduce_mode=reduce_mode,
+                nanmean=nanmean,
+            )
+            for key, sl in zip(keys, slices)
+        }
+
+    return _reduce_liad_interpolatability(
+        smth, flat, mntc, reduce_mode=reduce_mode, nanmean=nanmean
+    )
+
+
+def _get_sample_liad_interpolatability(
+    z: np.ndarray,
+    a: np.ndarray,
+    reg_dim: Optional[List[int]] = None,
+    liad_mode: str = "forward",
+    max_mode: str = "lehmer",
+    ptp_mode: Union[float, str] = "naive",
+    liad_thresh: Union[float, np.ndarray] = 1e-3,
+    degenerate_val: float = np.nan,
+    clamp: bool = False,
+    p: float = 2.0,
+    model_axis: bool = False,
+    pool: Optional[_utils._LiadBufferPool] = None,
+    return_degenerate: bool = False,
+) -> Tuple[np.ndarray, ...]:
+    # if `return_degenerate` is True, the mask of samples with all noisy LIAD is returned last
+
+    z, a = _utils._validate_za_shape(
+        z, a, reg_dim=reg_dim, min_size=3, model_axis=model_axis
+    )
     _utils._validate_non_constant_interp(z)
-    _utils._validate_equal_interp_deltas(z)
+    _utils._validate_monotonic_interp(z)
 
-    liads = _get_2nd_order_liad(z, a, liad_mode=liad_mode)
+    out = pool.get(z, a, order=2, mode=liad_mode) if pool is not None else None
+    liads = _get_2nd_order_liad(z, a, liad_mode=liad_mode, out=out)
 
     liad1, _ = liads[0]
     liad2, _ = liads[1]
-    z_interval = z[..., 1] - z[..., 0]
+    # mean spacing of the interpolation points, which may be unequal
+    z_interval = (z[..., -1] - z[..., 0]) / (z.shape[-1] - 1)
 
-    smth = _get_smoothness_from_liads(
+    smth, flat = _get_sample_smoothness_from_liads(
         liad1=liad1,
         liad2=liad2,
         z_interval=z_interval,
         max_mode=max_mode,
         ptp_mode=ptp_mode,
-        reduce_mode=reduce_mode,
         clamp=clamp,
         p=p,
     )
-    mntc = _get_monotonicity_from_liad(
+    mntc = _get_sample_monotonicity_from_liad(
         liad1=liad1,
-        reduce_mode=reduce_mode,
         liad_thresh=liad_thresh,
         degenerate_val=degenerate_val,
-        nanmean=nanmean,
+        return_degenerate=return_degenerate,
+    )
+
+    if return_degenerate:
+        return (smth, flat) + mntc
+
+    return smth, flat, mntc
+
+
+def _get_sample_liad_interpolatability_ragged(
+    z: np.ndarray,
+    a: np.ndarray,
+    offsets: np.ndarray,
+    reg_dim: Optional[List[int]] = None,
+    liad_mode: str = "forward",
+    max_mode: str = "lehmer",
+    ptp_mode: Union[float, str] = "naive",
+    liad_thresh: Union[float, np.ndarray] = 1e-3,
+    degenerate_val: float = np.nan,
+    clamp: bool = False,
+    p: float = 2.0,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+
+    ((liad1, offsets1), (liad2, offsets2)), z_interval = _get_ragged_2nd_order_liad(
+        z, a, offsets, reg_dim=reg_dim, liad_mode=liad_mode
+    )
+
+    smth, flat = _get_sample_smoothness_from_ragged_liads(
+        liad1=liad1,
+        offsets1=offsets1,
+        liad2=liad2,
+        offsets2=offsets2,
+        z_interval=z_interval,
+        max_mode=max_mode,
+        ptp_mode=ptp_mode,
+        clamp=clamp,
+        p=p,
+    )
+    mntc = _get_sample_monotonicity_from_ragged_liad(
+        liad1, offsets1, liad_thresh=liad_thresh, degenerate_val=degenerate_val
+    )
+
+    return smth, flat, mntc
+
+
+def _reduce_liad_interpolatability(
+    smth: np.ndarray,
+    flat: np.ndarray,
+    mntc: np.ndarray,
+    reduce_mode: str = "attribute",
+    nanmean: bool = True,
+) -> Dict[str, np.ndarray]:
+
+    return {
+        "smoothness": _reduce_smoothness(smth, flat, reduce_mode),
+        "monotonicity": _utils._reduce_samples(mntc, reduce_mode, nanmean=nanmean),
+    }
+
+
+def liad_interpolatability_sweep(
+    z: np.ndarray,
+    a: np.ndarray,
+    reg_dim: Optional[List[int]] = None,
+    liad_mode: str = "forward",
+    max_modes: Optional[List[str]] = None,
+    ps: Optional[List[float]] = None,
+    ptp_modes: Optional[List[Union[float, str]]] = None,
+    reduce_modes: Optional[List[str]] = None,
+    liad_threshs: Optional[List[float]] = None,
+    degenerate_val: float = np.nan,
+    nanmean: bool = True,
+    clamp: bool = False,
+    model_axis: bool = False,
+) -> Dict[str, Dict[tuple, np.ndarray]]:
+    """
+    Calculate latent smoothness and monotonicity over a grid of configurations.
+
+    The inputs are validated and the LIADs are computed only once, and every configuration is evaluated from them. The numerator of smoothness is shared by all configurations with the same `max_mode` and `p`, the denominator is shared by all configurations with the same `ptp_mode`, and every `reduce_mode` is obtained from the same per-sample matrix.
+
+    Parameters
+    ----------
+    z : np.ndarray, (n_samples, n_interp), (n_samples, n_features or n_attributes, n_interp), (n_interp,), or (n_features or n_attributes, n_interp)
+        a batch of latent vectors, or interpolation points shared by all samples. See `liad_interpolatability_bundle` for details.
+    a : np.ndarray, (n_samples, n_interp) or (n_samples, n_attributes, n_interp)
+        a batch of attribute(s)
+    reg_dim : Optional[List], optional
+        regularized dimensions, by default None
+        Attribute `a[:, i]` is regularized by `z[:, reg_dim[i]]`. If `None`, `a[:, i]` is assumed to be regularized by `z[:, i]`.
+    liad_mode : str, optional
+        options for calculating LIAD, by default "forward". Must be one of {"forward", "central", "spline"}. See `liad_interpolatability_bundle` for details.
+    max_modes : Optional[List[str]], optional
+        values of `max_mode` to evaluate smoothness with, by default ["lehmer"]
+    ps : Optional[List[float]], optional
+        values of the Lehmer mean power `p` to evaluate smoothness with, by default [2.0]
+    ptp_modes : Optional[List[Union[float, str]]], optional
+        values of `ptp_mode` to evaluate smoothness with, by default ["naive"]
+    reduce_modes : Optional[List[str]], optional
+        values of `reduce_mode` to evaluate both metrics with, by default ["attribute"]
+    liad_threshs : Optional[List[float]], optional
+        values of `liad_thresh` to evaluate monotonicity with, by default [1e-3]
+    degenerate_val : float, optional
+        fill value for samples with all noisy LIAD (i.e., absolute value below `liad_thresh`), by default np.nan. Only affects monotonicity.
+    nanmean : bool, optional
+        whether to ignore the NaN values in calculating the return array, by default True. Only affects monotonicity.
+    clamp : bool, optional
+        Whether to clamp smoothness to [0, 1], by default False. Only affects smoothness.
+    model_axis : bool, optional
+        whether `z` and `a` have a leading model axis, by default False. If True, `z` and `a` are of shape `(n_models, ...)`, where `...` is one of the shapes above, and all models are evaluated at once. The return array(s) then have an additional leading axis of size `n_models`.
+
+    Returns
+    -------
+    Dict[str, Dict[tuple, np.ndarray]]
+        A dictionary with keys ['smoothness', 'monotonicity']. The smoothness values are keyed by `(max_mode, p, ptp_mode, reduce_mode)`, and the monotonicity values are keyed by `(liad_thresh, reduce_mode)`. See `reduce_mode` in `liad_interpolatability_bundle` for details on the shape of the arrays.
+
+    See Also
+    --------
+    liad_interpolatability_bundle : LIAD-based Interpolatability Bundle
+    """
+
+    max_modes = ["lehmer"] if max_modes is None else max_modes
+    ps = [2.0] if ps is None else ps
+    ptp_modes = ["naive"] if ptp_modes is None else ptp_modes
+    reduce_modes = ["attribute"] if reduce_modes is None else reduce_modes
+    liad_threshs = [1e-3] if liad_threshs is None else liad_threshs
+
+    for max_mode in max_modes:
+        for p in ps:
+            for ptp_mode in ptp_modes:
+                for reduce_mode in reduce_modes:
+                    _validate_smoothness_args(
+                        liad_mode=liad_mode,
+                        max_mode=max_mode,
+                        ptp_mode=ptp_mode,
+                        reduce_mode=reduce_mode,
+                        p=p,
+                    )
+
+    for reduce_mode in reduce_modes:
+        _validate_monotonicity_args(
+            liad_mode=liad_mode,
+            reduce_mode=reduce_mode,
+            degenerate_val=degenerate_val,
+            nanmean=nanmean,
+        )
+
+    z, a = _utils._validate_za_shape(
+        z, a, reg_dim=reg_dim, min_size=3, model_axis=model_axis
+    )
+    _utils._validate_non_constant_interp(z)
+    _utils._validate_monotonic_interp(z)
+
+    liads = _get_2nd_order_liad(z, a, liad_mode=liad_mode)
+
+    liad1, _ = liads[0]
+    liad2, _ = liads[1]
+    # mean spacing of the interpolation points, which may be unequal
+    z_interval = (z[..., -1] - z[..., 0]) / (z.shape[-1] - 1)
+
+    liad2abs = np.abs(liad2)
+    nums = {}
+    for max_mode in max_modes:
+        for p in ps:
+            # the naive maximum does not depend on `p`
+            key = (max_mode, p if max_mode == "lehmer" else None)
+            if key not in nums:
+                nums[key] = _get_smoothness_numerator(liad2abs, max_mode=max_mode, p=p)
+
+    # all quantiles of the 1st order LIAD are obtained from a single selection pass
+    qs = sorted(
+        {
+            q
+            for m in ptp_modes
+            if m != "naive"
+            for q in (0.5 - 0.5 * m, 0.5 + 0.5 * m)
+        }
+    )
+    quantiles = dict(zip(qs, _utils._partition_quantiles(liad1, qs))) if qs else {}
+
+    dens = {}
+    for ptp_mode in ptp_modes:
+        if ptp_mode == "naive":
+            den = np.ptp(liad1, axis=-1)
+        else:
+            den = quantiles[0.5 + 0.5 * ptp_mode] - quantiles[0.5 - 0.5 * ptp_mode]
+        dens[ptp_mode] = den / z_interval
+
+    smoothness = {}
+    for max_mode in max_modes:
+        for p in ps:
+            num = nums[(max_mode, p if max_mode == "lehmer" else None)]
+            for ptp_mode in ptp_modes:
+                smth, flat = _get_sample_smoothness_from_ratio(
+                    num, dens[ptp_mode], clamp=clamp
+                )
+                for reduce_mode in reduce_modes:
+                    key = (max_mode, p, ptp_mode, reduce_mode)
+                    smoothness[key] = _reduce_smoothness(smth, flat, reduce_mode)
+
+    # all thresholds are evaluated in a single pass over the 1st order LIAD
+    mntc = _get_sample_monotonicity_from_liad(
+        liad1=liad1, liad_thresh=np.asarray(liad_threshs), degenerate_val=degenerate_val,
     )
 
-    return {"smoothness": smth, "monotonicity": mntc}
+    monotonicity = {}
+    for reduce_mode in reduce_modes:
+        curve = _utils._reduce_samples(mntc, reduce_mode, nanmean=nanmean)
+        for liad_thresh, val in zip(liad_threshs, curve):
+            monotonicity[(liad_thresh, reduce_mode)] = val
+
+    return {"smoothness": smoothness, "monotonicity": monotonicity}
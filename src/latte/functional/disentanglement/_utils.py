@@ -1,7 +1,13 @@
-from typing import List, Optional, Tuple
+import sys
+
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 
+from .._utils import _get_validation_level
+
+__ANYTIME_GROWTH_FACTOR__ = 4
+
 
 def _validate_za_shape(
     z: np.ndarray,
@@ -10,22 +16,27 @@ def _validate_za_shape(
     fill_reg_dim: bool = False,
 ) -> Tuple[np.ndarray, np.ndarray, Optional[List[int]]]:
 
-    assert a.ndim <= 2
+    check = _get_validation_level() != "off"
+
+    if check:
+        assert a.ndim <= 2
 
     if a.ndim == 1:
         a = a[:, None]
 
-    assert z.ndim == 2
-    assert z.shape[0] == a.shape[0]
-    assert z.shape[1] >= a.shape[1]
+    if check:
+        assert z.ndim == 2
+        assert z.shape[0] == a.shape[0]
+        assert z.shape[1] >= a.shape[1]
 
     _, n_attr = a.shape
     _, n_features = z.shape
 
     if reg_dim is not None:
-        assert len(reg_dim) == n_attr
-        assert min(reg_dim) >= 0
-        assert max(reg_dim) < n_features
+        if check:
+            assert len(reg_dim) == n_attr
+            assert min(reg_dim) >= 0
+            assert max(reg_dim) < n_features
     else:
         if fill_reg_dim:
             reg_dim = [i for i in range(n_attr)]
@@ -33,6 +44,69 @@ def _validate_za_shape(
     return z, a, reg_dim
 
 
+def _validate_attr_mask(
+    a: np.ndarray, mask: Optional[np.ndarray] = None
+) -> Optional[np.ndarray]:
+    """
+    Combine a user-provided label mask with the NaN entries of the attributes.
+
+    Parameters
+    ----------
+    a : np.ndarray, (n_samples, n_attributes)
+        a batch of attributes, possibly with NaN for unlabelled values
+    mask : Optional[np.ndarray], (n_samples, n_attributes) or (n_samples,), optional
+        boolean mask of labelled attribute values, by default None
+
+    Returns
+    -------
+    Optional[np.ndarray], (n_samples, n_attributes)
+        boolean mask of valid attribute values, or None if every attribute value is valid
+    """
+
+    if mask is not None:
+        mask = np.asarray(mask, dtype=bool)
+
+        if mask.ndim == 1:
+            # a per-sample mask applies to every attribute
+            mask = np.broadcast_to(mask[:, None], a.shape)
+
+        if _get_validation_level() != "off":
+            assert mask.shape == a.shape
+
+    if np.issubdtype(a.dtype, np.floating):
+        isnan = np.isnan(a)
+        if np.any(isnan):
+            mask = ~isnan if mask is None else (mask & ~isnan)
+
+    if mask is not None and np.all(mask):
+        return None
+
+    return mask
+
+
+def _valid_rows(valid: Optional[np.ndarray], *cols: int) -> Union[slice, np.ndarray]:
+    """
+    Get the rows in which all the given attributes are valid.
+
+    Parameters
+    ----------
+    valid : Optional[np.ndarray], (n_samples, n_attributes)
+        boolean mask of valid attribute values, or None if every attribute value is valid
+    *cols : int
+        attribute indices
+
+    Returns
+    -------
+    Union[slice, np.ndarray]
+        a full slice if every row is valid, so that indexing returns a view, otherwise the indices of the valid rows
+    """
+
+    if valid is None:
+        return slice(None)
+
+    return np.flatnonzero(np.all(valid[:, list(cols)], axis=1))
+
+
 def _top2gap(
     score: np.ndarray, zi: Optional[int] = None
 ) -> Tuple[np.ndarray, Optional[int]]:
@@ -63,3 +137,273 @@ def _top2gap(
             return (sc_sort[-1] - sc_sort[-2]), sc_argsort[-2]
         else:
             return (score[zi] - sc_sort[-1]), sc_argsort[-1]
+
+
+def _get_random_state() -> np.random.RandomState:
+    """
+    Get a NumPy random state seeded by `latte.RANDOM_STATE`.
+
+    Returns
+    -------
+    np.random.RandomState
+        random state for subsampling
+    """
+
+    RANDOM_STATE = getattr(
+        sys.modules[__name__.split(".")[0]], "RANDOM_STATE"
+    )  # this should be imported inside a function, in case the seed changes after this file is imported
+
+    return np.random.RandomState(RANDOM_STATE)
+
+
+def _anytime_sample_sizes(
+    n_samples: int, min_samples: int, growth: int = __ANYTIME_GROWTH_FACTOR__
+) -> List[int]:
+    """
+    Generate the geometrically growing subsample sizes used by the anytime estimation.
+
+    Parameters
+    ----------
+    n_samples : int
+        total number of samples
+    min_samples : int
+        size of the first subsample
+    growth : int, optional
+        growth factor between successive subsamples, by default 4
+
+    Returns
+    -------
+    List[int]
+        increasing subsample sizes, always ending with `n_samples`
+    """
+
+    assert min_samples > 0, "`min_samples` must be positive"
+    assert growth > 1, "`growth` must be more than 1"
+
+    sizes = []
+    size = min_samples
+    while size < n_samples:
+        sizes.append(size)
+        size *= growth
+    sizes.append(n_samples)
+
+    return sizes
+
+
+def _max_abs_change(
+    prev: Union[np.ndarray, Dict[str, np.ndarray]],
+    curr: Union[np.ndarray, Dict[str, np.ndarray]],
+) -> float:
+    """
+    Calculate the largest absolute change between two metric values, or two dictionaries of metric values.
+
+    NaN changes are propagated so that they never count as converged.
+    """
+
+    if isinstance(curr, dict):
+        return max(_max_abs_change(prev[k], curr[k]) for k in curr)
+
+    return float(np.max(np.abs(np.asarray(curr) - np.asarray(prev))))
+
+
+def _anytime_estimate(
+    func: Callable[[np.ndarray, np.ndarray], Any],
+    z: np.ndarray,
+    a: np.ndarray,
+    tol: float = 1e-2,
+    min_samples: int = 5000,
+    mask: Optional[np.ndarray] = None,
+) -> Tuple[Any, int, bool]:
+    """
+    Estimate a metric on progressively larger random subsamples until successive estimates agree.
+
+    The subsamples are nested prefixes of a single random permutation, growing geometrically from `min_samples`. The estimation stops as soon as no metric value changes by `tol` or more between two successive rounds. If this never happens, the metric is evaluated on the full sample set.
+
+    Parameters
+    ----------
+    func : Callable[[np.ndarray, np.ndarray], Any]
+        metric function taking `z` and `a`, returning an array or a dictionary of arrays
+    z : np.ndarray, (n_samples, n_features)
+        a batch of latent vectors
+    a : np.ndarray, (n_samples, n_attributes)
+        a batch of attributes
+    tol : float, optional
+        convergence tolerance on the absolute change of the metric values, by default 1e-2
+    min_samples : int, optional
+        size of the first subsample, by default 5000
+    mask : Optional[np.ndarray], (n_samples, n_attributes), optional
+        boolean mask of valid attribute values, by default None. If provided, the subsampled mask is passed to `func` as the keyword argument `mask`.
+
+    Returns
+    -------
+    Tuple[Any, int, bool]
+        A tuple of
+        - the metric value(s) of the last round
+        - the number of samples used in the last round
+        - whether the last two rounds agreed within `tol`
+    """
+
+    n_samples = z.shape[0]
+    sizes = _anytime_sample_sizes(n_samples, min_samples)
+
+    perm = _get_random_state().permutation(n_samples)
+
+    prev = None
+    for size in sizes:
+        idx = perm[:size] if size < n_samples else slice(None)
+
+        if mask is None:
+            curr = func(z[idx], a[idx])
+        else:
+            curr = func(z[idx], a[idx], mask=mask[idx])
+
+        if prev is not None and _max_abs_change(prev, curr) < tol:
+            return curr, size, True
+
+        prev = curr
+
+    return curr, n_samples, False
+
+
+def _attribute_class_codes(
+    a: np.ndarray, mask: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Encode the class of each attribute value as a positive integer, independently for each attribute.
+
+    Parameters
+    ----------
+    a : np.ndarray, (n_samples, n_attributes)
+        a batch of discrete attributes, possibly with NaN for unlabelled values
+    mask : Optional[np.ndarray], (n_samples, n_attributes), optional
+        boolean mask of valid attribute values, by default None
+
+    Returns
+    -------
+    np.ndarray, (n_samples, n_attributes)
+        class codes starting from 1, with 0 for invalid attribute values
+    """
+
+    valid = _validate_attr_mask(a, mask)
+
+    codes = np.zeros(a.shape, dtype=np.int64)
+    for j in range(a.shape[1]):
+        rows = _valid_rows(valid, j)
+        _, inv = np.unique(a[rows, j], return_inverse=True)
+        codes[rows, j] = inv.ravel() + 1
+
+    return codes
+
+
+def _stratified_indices(
+    codes: np.ndarray, n_select: int, random_state: np.random.RandomState
+) -> np.ndarray:
+    """
+    Draw a random subsample stratified by attribute class.
+
+    One random sample of every attribute class is always kept, rarest classes first, so that no class vanishes from any attribute. The rest of the budget is allocated proportionally, by largest remainder, to the joint class combinations of the attributes. If there are more attribute classes than `n_select`, only the samples of the rarest classes are kept.
+
+    Parameters
+    ----------
+    codes : np.ndarray, (n_samples, n_attributes)
+        class codes of each attribute, as returned by `_attribute_class_codes`
+    n_select : int
+        number of samples to select
+    random_state : np.random.RandomState
+        random state used for drawing the samples
+
+    Returns
+    -------
+    np.ndarray, (n_select,)
+        sorted indices of the selected samples
+    """
+
+    n_samples, n_attr = codes.shape
+    perm = random_state.permutation(n_samples)
+
+    # the first sample of each attribute class in the shuffled order, with its class size
+    firsts = []
+    for j in range(n_attr):
+        classes, first, counts = np.unique(
+            codes[perm, j], return_index=True, return_counts=True
+        )
+        labelled = classes > 0
+        firsts.append(np.stack([counts[labelled], perm[first[labelled]]], axis=1))
+    firsts = np.concatenate(firsts, axis=0)
+    firsts = firsts[np.argsort(firsts[:, 0], kind="stable"), 1]
+
+    _, first = np.unique(firsts, return_index=True)
+    required = firsts[np.sort(first)][:n_select]
+
+    n_left = n_select - required.shape[0]
+    if n_left == 0:
+        return np.sort(required)
+
+    rest = np.ones(n_samples, dtype=bool)
+    rest[required] = False
+
+    _, strata = np.unique(codes, axis=0, return_inverse=True)
+    strata = strata.ravel()
+    counts = np.bincount(strata[rest], minlength=np.max(strata) + 1)
+
+    quota = counts * (n_left / np.sum(rest))
+    alloc = np.floor(quota).astype(int)
+    n_extra = n_left - np.sum(alloc)
+    alloc[np.argsort(alloc - quota, kind="stable")[:n_extra]] += 1
+
+    # group the remaining samples by stratum while keeping the shuffled order within each stratum
+    order = perm[rest[perm]]
+    order = order[np.argsort(strata[order], kind="stable")]
+    sorted_strata = strata[order]
+    rank = np.arange(order.shape[0]) - (np.cumsum(counts) - counts)[sorted_strata]
+
+    return np.sort(np.concatenate([required, order[rank < alloc[sorted_strata]]]))
+
+
+def _subsample_za(
+    z: np.ndarray,
+    a: np.ndarray,
+    max_samples: Optional[int],
+    discrete: bool = False,
+    mask: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+    """
+    Randomly subsample latent vectors and attributes along the sample axis.
+
+    If `discrete` is True, the subsample is stratified by attribute class so that rare classes are retained. Otherwise, the subsample is drawn uniformly at random.
+
+    Parameters
+    ----------
+    z : np.ndarray, (n_samples, n_features)
+        a batch of latent vectors
+    a : np.ndarray, (n_samples, n_attributes)
+        a batch of attributes
+    max_samples : Optional[int]
+        maximum number of samples to keep. If None or not less than `n_samples`, the inputs are returned as-is.
+    discrete : bool, optional
+        whether the attributes are discrete, by default False
+    mask : Optional[np.ndarray], (n_samples, n_attributes), optional
+        boolean mask of valid attribute values, by default None
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]
+        subsampled `z`, `a`, and `mask`
+    """
+
+    n_samples = z.shape[0]
+
+    if max_samples is None or max_samples >= n_samples:
+        return z, a, mask
+
+    assert max_samples > 0, "`max_samples` must be positive"
+
+    random_state = _get_random_state()
+
+    if discrete:
+        codes = _attribute_class_codes(a, mask)
+        idx = _stratified_indices(codes, max_samples, random_state)
+    else:
+        idx = np.sort(random_state.choice(n_samples, size=max_samples, replace=False))
+
+    return z[idx], a[idx], (mask[idx] if mask is not None else None)
@@ -1,10 +1,17 @@
+from functools import partial
 from typing import List, Optional
 
 import numpy as np
 
 from .mutual_info import _latent_attr_mutual_info
 
-from ._utils import _validate_za_shape
+from .._utils import _apply_grouped
+from ._utils import (
+    _subsample_za,
+    _validate_attr_mask,
+    _valid_rows,
+    _validate_za_shape,
+)
 
 
 def modularity(
@@ -13,6 +20,9 @@ def modularity(
     reg_dim: Optional[List[int]] = None,
     discrete: bool = False,
     thresh: float = 1e-12,
+    max_samples: Optional[int] = None,
+    mask: Optional[np.ndarray] = None,
+    groups: Optional[np.ndarray] = None,
 ):
     """
     Calculate Modularity between latent vectors and attributes
@@ -39,11 +49,18 @@ def modularity(
         Whether the attributes are discrete, by default False
     thresh : float, optional
         threshold for mutual information, by default 1e-12. Latent-attribute pair with variance below `thresh` will have modularity contribution zeroed.
+    max_samples : Optional[int], optional
+        maximum number of samples used in the calculation, by default None (i.e., all samples are used). If there are more samples than `max_samples`, a random subsample seeded by `latte.RANDOM_STATE` is drawn. If `discrete` is True, the subsample is stratified by the attribute classes so that rare classes are retained.
+    mask : Optional[np.ndarray], (n_samples, n_attributes) or (n_samples,), optional
+        boolean mask of labelled attribute values, by default None. Each attribute is evaluated only on the samples in which it is labelled. NaN attribute values are always treated as unlabelled.
+    groups : Optional[np.ndarray], (n_samples,), optional
+        group id of each sample, by default None. If provided, the metric is evaluated separately on each group of samples.
 
     Returns
     -------
     np.ndarray, (n_features,)
         Modularity for each latent vector dimension
+        If `groups` is provided, a dictionary mapping each group id to the above is returned instead.
     
     References
     ----------
@@ -52,15 +69,38 @@ def modularity(
 
     z, a, reg_dim = _validate_za_shape(z, a, reg_dim)
 
+    if groups is not None:
+        return _apply_grouped(
+            partial(
+                modularity,
+                reg_dim=reg_dim,
+                discrete=discrete,
+                thresh=thresh,
+                max_samples=max_samples,
+            ),
+            groups,
+            z,
+            a,
+            mask=mask,
+        )
+
+    valid = _validate_attr_mask(a, mask)
+    z, a, valid = _subsample_za(z, a, max_samples, discrete, valid)
+
     _, n_attr = a.shape
 
     assert n_attr > 1, "Modularity requires at least two attributes"
 
     sqthresh = np.square(thresh)
 
+    rows = [_valid_rows(valid, i) for i in range(n_attr)]
+
     sqmi = np.square(
         np.stack(
-            [_latent_attr_mutual_info(z, a[:, i], discrete) for i in range(n_attr)],
+            [
+                _latent_attr_mutual_info(z[rows[i]], a[rows[i], i], discrete)
+                for i in range(n_attr)
+            ],
             axis=1,
         )
     )
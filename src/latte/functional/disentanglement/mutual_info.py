@@ -1,13 +1,14 @@
 import sys
 
 from functools import partial
-from typing import Any, Callable, List, Optional, Tuple, cast
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union, cast
 
 import numpy as np
 from numpy.core.numerictypes import ScalarType
 from sklearn import feature_selection as fs
 
 from . import _utils
+from .._utils import _apply_grouped
 
 
 def _get_mi_func(discrete: bool) -> Callable:
@@ -58,7 +59,10 @@ def _latent_attr_mutual_info(
 
 
 def _attr_latent_mutual_info(
-    z: np.ndarray, a: np.ndarray, discrete: bool = False
+    z: np.ndarray,
+    a: np.ndarray,
+    discrete: bool = False,
+    valid: Optional[np.ndarray] = None,
 ) -> np.ndarray:
     """
     Calculate mutual information between latent vectors and a target attribute.
@@ -71,6 +75,8 @@ def _attr_latent_mutual_info(
         a batch of attributes
     discrete : bool, optional
         whether the attribute is discrete, by default False
+    valid : Optional[np.ndarray], (n_samples, n_attr), optional
+        boolean mask of valid attribute values, by default None. Each attribute only uses the samples in which it is valid.
 
     Returns
     -------
@@ -78,9 +84,14 @@ def _attr_latent_mutual_info(
         mutual information between each latent vector dimension and the attribute
     """
 
-    return np.concatenate(
-        [_get_mi_func(discrete)(z[:, None], a[:, i]) for i in range(a.shape[1])]
-    )
+    mi_func = _get_mi_func(discrete)
+
+    ret = []
+    for i in range(a.shape[1]):
+        rows = _utils._valid_rows(valid, i)
+        ret.append(mi_func(z[rows, None], a[rows, i]))
+
+    return np.concatenate(ret)
 
 
 def _single_mutual_info(a: np.ndarray, b: np.ndarray, discrete: bool) -> float:
@@ -165,7 +176,13 @@ def mig(
     reg_dim: Optional[List[int]] = None,
     discrete: bool = False,
     fill_reg_dim: bool = False,
-) -> np.ndarray:
+    anytime: bool = False,
+    anytime_tol: float = 1e-2,
+    anytime_min_samples: int = 5000,
+    max_samples: Optional[int] = None,
+    mask: Optional[np.ndarray] = None,
+    groups: Optional[np.ndarray] = None,
+) -> Union[np.ndarray, Tuple[np.ndarray, int, bool], Dict[Any, Any]]:
     """
     Calculate Mutual Information Gap (MIG) between latent vectors and attributes. 
     
@@ -192,11 +209,25 @@ def mig(
         Whether the attributes are discrete, by default False
     fill_reg_dim : bool, optional
         Whether to automatically fill `reg_dim` with `range(n_attributes)`, by default False. If `fill_reg_dim` is True, the `reg_dim` behavior is the same as the dependency-aware family. This option is mainly used for compatibility with the dependency-aware family in a bundle.
+    anytime : bool, optional
+        Whether to use the anytime estimation, by default False. If True, the metric is estimated on progressively larger random subsamples (growing by a factor of 4 from `anytime_min_samples`) until no value changes by `anytime_tol` or more between two successive rounds.
+    anytime_tol : float, optional
+        convergence tolerance of the anytime estimation, by default 1e-2. Ignored if `anytime` is False.
+    anytime_min_samples : int, optional
+        size of the first subsample of the anytime estimation, by default 5000. Ignored if `anytime` is False.
+    max_samples : Optional[int], optional
+        maximum number of samples used in the calculation, by default None (i.e., all samples are used). If there are more samples than `max_samples`, a random subsample seeded by `latte.RANDOM_STATE` is drawn. If `discrete` is True, the subsample is stratified by the attribute classes so that rare classes are retained.
+    mask : Optional[np.ndarray], (n_samples, n_attributes) or (n_samples,), optional
+        boolean mask of labelled attribute values, by default None. Each attribute is evaluated only on the samples in which it is labelled. NaN attribute values are always treated as unlabelled.
+    groups : Optional[np.ndarray], (n_samples,), optional
+        group id of each sample, by default None. If provided, the metric is evaluated separately on each group of samples.
 
     Returns
     -------
     np.ndarray, (n_attributes,)
         MIG for each attribute
+        If `anytime` is True, a tuple of the metric array, the number of samples used in the final estimate, and whether the final two estimates agreed within `anytime_tol` is returned instead.
+        If `groups` is provided, a dictionary mapping each group id to the above is returned instead.
         
     See Also
     --------
@@ -211,16 +242,47 @@ def mig(
 
     z, a, reg_dim = _utils._validate_za_shape(z, a, reg_dim, fill_reg_dim=fill_reg_dim)
 
+    if groups is not None:
+        return _apply_grouped(
+            partial(
+                mig,
+                reg_dim=reg_dim,
+                discrete=discrete,
+                anytime=anytime,
+                anytime_tol=anytime_tol,
+                anytime_min_samples=anytime_min_samples,
+                max_samples=max_samples,
+            ),
+            groups,
+            z,
+            a,
+            mask=mask,
+        )
+
+    valid = _utils._validate_attr_mask(a, mask)
+    z, a, valid = _utils._subsample_za(z, a, max_samples, discrete, valid)
+
+    if anytime:
+        return _utils._anytime_estimate(
+            partial(mig, reg_dim=reg_dim, discrete=discrete),
+            z,
+            a,
+            tol=anytime_tol,
+            min_samples=anytime_min_samples,
+            mask=valid,
+        )
+
     _, n_attr = a.shape
 
     ret = np.zeros((n_attr,))
 
     for i in range(n_attr):
-        ai = a[:, i]
+        rows = _utils._valid_rows(valid, i)
+        ai = a[rows, i]
         zi = reg_dim[i] if reg_dim is not None else None
 
         en = _entropy(ai, discrete)
-        mi = _latent_attr_mutual_info(z, ai, discrete)
+        mi = _latent_attr_mutual_info(z[rows], ai, discrete)
 
         gap, _ = _utils._top2gap(mi, zi)
         ret[i] = gap / en
@@ -233,7 +295,13 @@ def dmig(
     a: np.ndarray,
     reg_dim: Optional[List[int]] = None,
     discrete: bool = False,
-) -> np.ndarray:
+    anytime: bool = False,
+    anytime_tol: float = 1e-2,
+    anytime_min_samples: int = 5000,
+    max_samples: Optional[int] = None,
+    mask: Optional[np.ndarray] = None,
+    groups: Optional[np.ndarray] = None,
+) -> Union[np.ndarray, Tuple[np.ndarray, int, bool], Dict[Any, Any]]:
     """
     Calculate Dependency-Aware Mutual Information Gap (DMIG) between latent vectors and attributes
 
@@ -256,11 +324,25 @@ def dmig(
         Attribute `a[:, i]` is regularized by `z[:, reg_dim[i]]`. If `None`, `a[:, i]` is assumed to be regularized by `z[:, i]`.
     discrete : bool, optional
         Whether the attributes are discrete, by default False
+    anytime : bool, optional
+        Whether to use the anytime estimation, by default False. If True, the metric is estimated on progressively larger random subsamples (growing by a factor of 4 from `anytime_min_samples`) until no value changes by `anytime_tol` or more between two successive rounds.
+    anytime_tol : float, optional
+        convergence tolerance of the anytime estimation, by default 1e-2. Ignored if `anytime` is False.
+    anytime_min_samples : int, optional
+        size of the first subsample of the anytime estimation, by default 5000. Ignored if `anytime` is False.
+    max_samples : Optional[int], optional
+        maximum number of samples used in the calculation, by default None (i.e., all samples are used). If there are more samples than `max_samples`, a random subsample seeded by `latte.RANDOM_STATE` is drawn. If `discrete` is True, the subsample is stratified by the attribute classes so that rare classes are retained.
+    mask : Optional[np.ndarray], (n_samples, n_attributes) or (n_samples,), optional
+        boolean mask of labelled attribute values, by default None. Each attribute is evaluated only on the samples in which it is labelled. NaN attribute values are always treated as unlabelled.
+    groups : Optional[np.ndarray], (n_samples,), optional
+        group id of each sample, by default None. If provided, the metric is evaluated separately on each group of samples.
 
     Returns
     -------
     np.ndarray, (n_attributes,)
         DMIG for each attribute
+        If `anytime` is True, a tuple of the metric array, the number of samples used in the final estimate, and whether the final two estimates agreed within `anytime_tol` is returned instead.
+        If `groups` is provided, a dictionary mapping each group id to the above is returned instead.
         
     See Also
     --------
@@ -276,22 +358,55 @@ def dmig(
     """
     z, a, reg_dim = _utils._validate_za_shape(z, a, reg_dim, fill_reg_dim=True)
 
+    if groups is not None:
+        return _apply_grouped(
+            partial(
+                dmig,
+                reg_dim=reg_dim,
+                discrete=discrete,
+                anytime=anytime,
+                anytime_tol=anytime_tol,
+                anytime_min_samples=anytime_min_samples,
+                max_samples=max_samples,
+            ),
+            groups,
+            z,
+            a,
+            mask=mask,
+        )
+
+    valid = _utils._validate_attr_mask(a, mask)
+    z, a, valid = _utils._subsample_za(z, a, max_samples, discrete, valid)
+
     reg_dim = cast(List[int], reg_dim)  # make the type checker happy
 
+    if anytime:
+        return _utils._anytime_estimate(
+            partial(dmig, reg_dim=reg_dim, discrete=discrete),
+            z,
+            a,
+            tol=anytime_tol,
+            min_samples=anytime_min_samples,
+            mask=valid,
+        )
+
     _, n_attr = a.shape
 
     ret = np.zeros((n_attr,))
 
     for i in range(n_attr):
-        ai = a[:, i]
+        rows = _utils._valid_rows(valid, i)
+        ai = a[rows, i]
         zi = reg_dim[i]
 
-        mi = _latent_attr_mutual_info(z, ai, discrete)
+        mi = _latent_attr_mutual_info(z[rows], ai, discrete)
 
         gap, zj = _utils._top2gap(mi, zi)
 
         if zj in reg_dim:
-            cen = _conditional_entropy(ai, a[:, reg_dim.index(zj)], discrete)
+            l = reg_dim.index(zj)
+            rows = _utils._valid_rows(valid, i, l)
+            cen = _conditional_entropy(a[rows, i], a[rows, l], discrete)
         else:
             cen = _entropy(ai, discrete)
 
@@ -305,6 +420,9 @@ def dlig(
     a: np.ndarray,
     reg_dim: Optional[List[int]] = None,
     discrete: bool = False,
+    max_samples: Optional[int] = None,
+    mask: Optional[np.ndarray] = None,
+    groups: Optional[np.ndarray] = None,
 ):
     """
     Calculate Dependency-Aware Latent Information Gap (DLIG) between latent vectors and attributes
@@ -328,11 +446,18 @@ def dlig(
         Attribute `a[:, i]` is regularized by `z[:, reg_dim[i]]`. If `None`, `a[:, i]` is assumed to be regularized by `z[:, i]`.
     discrete : bool, optional
         Whether the attributes are discrete, by default False
+    max_samples : Optional[int], optional
+        maximum number of samples used in the calculation, by default None (i.e., all samples are used). If there are more samples than `max_samples`, a random subsample seeded by `latte.RANDOM_STATE` is drawn. If `discrete` is True, the subsample is stratified by the attribute classes so that rare classes are retained.
+    mask : Optional[np.ndarray], (n_samples, n_attributes) or (n_samples,), optional
+        boolean mask of labelled attribute values, by default None. Each attribute is evaluated only on the samples in which it is labelled. NaN attribute values are always treated as unlabelled.
+    groups : Optional[np.ndarray], (n_samples,), optional
+        group id of each sample, by default None. If provided, the metric is evaluated separately on each group of samples.
 
     Returns
     -------
     np.ndarray, (n_attributes,)
         DLIG for each attribute-regularizing latent dimension
+        If `groups` is provided, a dictionary mapping each group id to the above is returned instead.
         
     See Also
     --------
@@ -347,6 +472,18 @@ def dlig(
     """
     z, a, reg_dim = _utils._validate_za_shape(z, a, reg_dim, fill_reg_dim=True)
 
+    if groups is not None:
+        return _apply_grouped(
+            partial(dlig, reg_dim=reg_dim, discrete=discrete, max_samples=max_samples),
+            groups,
+            z,
+            a,
+            mask=mask,
+        )
+
+    valid = _utils._validate_attr_mask(a, mask)
+    z, a, valid = _utils._subsample_za(z, a, max_samples, discrete, valid)
+
     reg_dim = cast(List[int], reg_dim)  # make the type checker happy
 
     _, n_attr = a.shape  # same as len(reg_dim)
@@ -357,11 +494,12 @@ def dlig(
 
     for i, zi in enumerate(reg_dim):
 
-        mi = _attr_latent_mutual_info(z[:, zi], a, discrete)
+        mi = _attr_latent_mutual_info(z[:, zi], a, discrete, valid)
 
         gap, j = _utils._top2gap(mi, i)
 
-        cen = _conditional_entropy(a[:, i], a[:, j], discrete)
+        rows = _utils._valid_rows(valid, i, j)
+        cen = _conditional_entropy(a[rows, i], a[rows, j], discrete)
 
         ret[i] = gap / cen
 
@@ -373,6 +511,9 @@ def xmig(
     a: np.ndarray,
     reg_dim: Optional[List[int]] = None,
     discrete: bool = False,
+    max_samples: Optional[int] = None,
+    mask: Optional[np.ndarray] = None,
+    groups: Optional[np.ndarray] = None,
 ):
     """
     Calculate Dependency-Blind Mutual Information Gap (XMIG) between latent vectors and attributes
@@ -396,11 +537,18 @@ def xmig(
         Attribute `a[:, i]` is regularized by `z[:, reg_dim[i]]`. If `None`, `a[:, i]` is assumed to be regularized by `z[:, i]`.
     discrete : bool, optional
         Whether the attributes are discrete, by default False
+    max_samples : Optional[int], optional
+        maximum number of samples used in the calculation, by default None (i.e., all samples are used). If there are more samples than `max_samples`, a random subsample seeded by `latte.RANDOM_STATE` is drawn. If `discrete` is True, the subsample is stratified by the attribute classes so that rare classes are retained.
+    mask : Optional[np.ndarray], (n_samples, n_attributes) or (n_samples,), optional
+        boolean mask of labelled attribute values, by default None. Each attribute is evaluated only on the samples in which it is labelled. NaN attribute values are always treated as unlabelled.
+    groups : Optional[np.ndarray], (n_samples,), optional
+        group id of each sample, by default None. If provided, the metric is evaluated separately on each group of samples.
 
     Returns
     -------
     np.ndarray, (n_attributes,)
         XMIG for each attribute
+        If `groups` is provided, a dictionary mapping each group id to the above is returned instead.
         
     See Also
     --------
@@ -415,6 +563,18 @@ def xmig(
 
     z, a, reg_dim = _utils._validate_za_shape(z, a, reg_dim, fill_reg_dim=True)
 
+    if groups is not None:
+        return _apply_grouped(
+            partial(xmig, reg_dim=reg_dim, discrete=discrete, max_samples=max_samples),
+            groups,
+            z,
+            a,
+            mask=mask,
+        )
+
+    valid = _utils._validate_attr_mask(a, mask)
+    z, a, valid = _utils._subsample_za(z, a, max_samples, discrete, valid)
+
     reg_dim = cast(List[int], reg_dim)  # make the type checker happy
 
     _, n_features = z.shape
@@ -425,11 +585,12 @@ def xmig(
     ret = np.zeros((n_attr,))
 
     for i in range(n_attr):
-        ai = a[:, i]
+        rows = _utils._valid_rows(valid, i)
+        ai = a[rows, i]
         zi = reg_dim[i]
 
         en = _entropy(ai, discrete)
-        mi = _latent_attr_mutual_info(z, ai, discrete)
+        mi = _latent_attr_mutual_info(z[rows], ai, discrete)
 
         gap, _ = _xgap(mi, zi, reg_dim)
         ret[i] = gap / en
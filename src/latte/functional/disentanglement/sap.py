@@ -1,33 +1,227 @@
 import sys
+import warnings
 
-from typing import List, Optional
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 from sklearn import svm
 
-from ._utils import _top2gap, _validate_za_shape
+from .._utils import _apply_grouped, _sort_by_group
+from ._utils import (
+    _subsample_za,
+    _top2gap,
+    _validate_attr_mask,
+    _valid_rows,
+    _validate_za_shape,
+)
 
+__VALID_DISCRETE_MODE__ = ["svc", "exact"]
 
-def _get_continuous_sap_score(z: np.ndarray, a: np.ndarray, thresh: float = 1e-12):
+
+def _get_continuous_sap_score(
+    z: np.ndarray,
+    a: np.ndarray,
+    thresh: float = 1e-12,
+    valid: Optional[np.ndarray] = None,
+):
+
+    if valid is None:
+        return _get_continuous_sap_score_matrix(z, a, thresh=thresh)
 
     _, n_features = z.shape
     _, n_attr = a.shape
 
     score = np.zeros(shape=(n_features, n_attr))
 
-    for i in range(n_features):
-        for j in range(n_attr):
-            cov = np.cov(z[:, i], a[:, j], ddof=1)
+    # each attribute is scored on its own labelled rows, against all latent dimensions at once
+    for j in range(n_attr):
+        rows = _valid_rows(valid, j)
+        score[:, [j]] = _get_continuous_sap_score_matrix(
+            z[rows], a[rows, j][:, None], thresh=thresh
+        )
+
+    return score
+
+
+def _get_continuous_sap_score_matrix(
+    z: np.ndarray, a: np.ndarray, thresh: float = 1e-12,
+):
+
+    n_samples, n_features = z.shape
+    _, n_attr = a.shape
+
+    zc = z - np.mean(z, axis=0)
+    ac = a - np.mean(a, axis=0)
+
+    z_var = np.sum(np.square(zc), axis=0) / (n_samples - 1)
+    a_var = np.sum(np.square(ac), axis=0) / (n_samples - 1)
+    cov = (zc.T @ ac) / (n_samples - 1)
+
+    score = np.zeros(shape=(n_features, n_attr))
+
+    reg = z_var > thresh
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        score[reg, :] = np.square(cov[reg, :]) / (z_var[reg, None] * a_var[None, :])
+
+    return score
+
+
+def _get_continuous_sap_moments(
+    z: np.ndarray, a: np.ndarray, valid: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, ...]:
+    """
+    Calculate the sufficient statistics of the continuous SAP score for a batch of samples.
+
+    Parameters
+    ----------
+    z : np.ndarray, (n_samples, n_features)
+        a batch of latent vectors
+    a : np.ndarray, (n_samples, n_attributes)
+        a batch of attributes
+    valid : Optional[np.ndarray], (n_samples, n_attributes), optional
+        boolean mask of labelled attribute values, by default None (i.e., all values are labelled)
+
+    Returns
+    -------
+    Tuple[np.ndarray, ...]
+        A tuple of
+        - the number of labelled samples, (n_attributes,)
+        - the latent means over the labelled samples of each attribute, (n_features, n_attributes)
+        - the attribute means, (n_attributes,)
+        - the latent sums of squared deviations, (n_features, n_attributes)
+        - the attribute sums of squared deviations, (n_attributes,)
+        - the latent-attribute sums of cross deviations, (n_features, n_attributes)
+    """
+
+    if valid is None:
+        valid = np.ones(a.shape, dtype=bool)
+
+    w = valid.astype(float)
+    n = np.sum(w, axis=0)
+
+    # shift by the batch means before accumulating to limit cancellation in the sums of squares
+    z_shift = np.mean(z, axis=0)
+    a_shift = _safe_divide(np.sum(np.where(valid, a, 0.0), axis=0), n)
+
+    zc = z - z_shift
+    ac = np.where(valid, a - a_shift, 0.0)
+
+    z_sum = zc.T @ w
+    a_sum = np.sum(ac, axis=0)
 
-            z_var = cov[0, 0]
+    z_mean = _safe_divide(z_sum, n)
+    a_mean = _safe_divide(a_sum, n)
 
-            if z_var > thresh:
-                score[i, j] = np.square(cov[0, 1]) / (z_var * cov[1, 1])
+    z_m2 = np.square(zc).T @ w - z_sum * z_mean
+    a_m2 = np.sum(np.square(ac), axis=0) - a_sum * a_mean
+    za_m2 = zc.T @ ac - z_sum * a_mean
+
+    return (
+        n,
+        z_mean + z_shift[:, None],
+        a_mean + a_shift,
+        z_m2,
+        a_m2,
+        za_m2,
+    )
+
+
+def _merge_continuous_sap_moments(
+    moments1: Tuple[np.ndarray, ...], moments2: Tuple[np.ndarray, ...]
+) -> Tuple[np.ndarray, ...]:
+    """
+    Merge the sufficient statistics of the continuous SAP score of two disjoint sets of samples, using the pairwise update of Chan et al.
+
+    Parameters
+    ----------
+    moments1 : Tuple[np.ndarray, ...]
+        sufficient statistics of the first set of samples, as returned by `_get_continuous_sap_moments`. Scalar zeros can be used for an empty set.
+    moments2 : Tuple[np.ndarray, ...]
+        sufficient statistics of the second set of samples, as returned by `_get_continuous_sap_moments`
+
+    Returns
+    -------
+    Tuple[np.ndarray, ...]
+        sufficient statistics of the union of the two sets of samples
+
+    References
+    ----------
+    .. [1] T. F. Chan, G. H. Golub, and R. J. LeVeque, “Updating formulae and a pairwise algorithm for computing sample variances,” Stanford University, Tech. Rep. STAN-CS-79-773, 1979.
+    """
+
+    n1, z_mean1, a_mean1, z_m21, a_m21, za_m21 = moments1
+    n2, z_mean2, a_mean2, z_m22, a_m22, za_m22 = moments2
+
+    n = n1 + n2
+    w2 = _safe_divide(n2, n)
+    f = n1 * w2
+
+    dz = z_mean2 - z_mean1
+    da = a_mean2 - a_mean1
+
+    return (
+        n,
+        z_mean1 + dz * w2,
+        a_mean1 + da * w2,
+        z_m21 + z_m22 + np.square(dz) * f,
+        a_m21 + a_m22 + np.square(da) * f,
+        za_m21 + za_m22 + dz * da * f,
+    )
+
+
+def _get_continuous_sap_score_from_moments(
+    n: np.ndarray,
+    z_m2: np.ndarray,
+    a_m2: np.ndarray,
+    za_m2: np.ndarray,
+    thresh: float = 1e-12,
+) -> np.ndarray:
+
+    ddof = n - 1
+    z_var = z_m2 / ddof
+
+    score = np.zeros(shape=z_var.shape)
+
+    reg = z_var > thresh
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        full = np.square(za_m2 / ddof) / (z_var * (a_m2 / ddof))
+
+    score[reg] = full[reg]
 
     return score
 
 
-def _get_discrete_sap_score(z: np.ndarray, a: np.ndarray, l2_reg: float = 1.0):
+def _safe_divide(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    num, den = np.broadcast_arrays(
+        np.asarray(num, dtype=float), np.asarray(den, dtype=float)
+    )
+    return np.divide(num, den, out=np.zeros(num.shape), where=den > 0)
+
+
+def _get_sap_from_score(
+    score: np.ndarray, reg_dim: Optional[List[int]] = None
+) -> np.ndarray:
+
+    _, n_attr = score.shape
+
+    ret = np.zeros((n_attr,))
+
+    for i in range(n_attr):
+        zi = reg_dim[i] if reg_dim is not None else None
+        ret[i], _ = _top2gap(score[:, i], zi=zi)
+
+    return ret
+
+
+def _get_discrete_sap_score(
+    z: np.ndarray,
+    a: np.ndarray,
+    l2_reg: float = 1.0,
+    valid: Optional[np.ndarray] = None,
+):
 
     assert l2_reg > 0, "`l2_reg` must be more than 0.0"
 
@@ -40,18 +234,541 @@ def _get_discrete_sap_score(z: np.ndarray, a: np.ndarray, l2_reg: float = 1.0):
 
     score = np.zeros(shape=(n_features, n_attr))
 
-    for i in range(n_features):
-        for j in range(n_attr):
+    for j in range(n_attr):
+        rows = _valid_rows(valid, j)
+        zj = z[rows]
+        aj = a[rows, j]
+        for i in range(n_features):
             score[i, j] = np.mean(
                 svm.LinearSVC(C=l2_reg, random_state=RANDOM_STATE)
-                .fit(z[:, [i]], a[:, j])
-                .predict(z[:, [i]])
-                == a[:, j]
+                .fit(zj[:, [i]], aj)
+                .predict(zj[:, [i]])
+                == aj
             )
 
     return score
 
 
+def _get_exact_discrete_sap_score(
+    z: np.ndarray,
+    a: np.ndarray,
+    valid: Optional[np.ndarray] = None,
+    order: Optional[np.ndarray] = None,
+):
+
+    n_samples, n_features = z.shape
+    _, n_attr = a.shape
+
+    score = np.zeros(shape=(n_features, n_attr))
+
+    # each latent column is sorted only once, and every attribute reuses the rank order
+    if order is None:
+        order = np.argsort(z, axis=0, kind="stable")
+
+    for j in range(n_attr):
+        rows = _valid_rows(valid, j)
+        zj = z[rows]
+        orderj = _restrict_rank_order(order, rows, n_samples)
+        classes, aj = np.unique(a[rows, j], return_inverse=True)
+        onehot = np.eye(len(classes))[aj.ravel()]
+
+        for i in range(n_features):
+            zs = zj[orderj[:, i], i]
+            # the decision boundary can only be placed between distinct latent values
+            starts = np.flatnonzero(np.r_[True, zs[1:] != zs[:-1]])
+            counts = np.add.reduceat(onehot[orderj[:, i]], starts, axis=0)
+            score[i, j] = _best_interval_accuracy(counts)
+
+    return score
+
+
+def _restrict_rank_order(
+    order: np.ndarray, rows: Union[slice, np.ndarray], n_samples: int
+) -> np.ndarray:
+    """
+    Restrict the stable rank order of each latent column to a subset of the samples, without sorting again.
+
+    Parameters
+    ----------
+    order : np.ndarray, (n_samples, n_features)
+        stable argsort of each latent column
+    rows : Union[slice, np.ndarray]
+        sorted indices of the samples to keep, or a full slice
+    n_samples : int
+        number of samples
+
+    Returns
+    -------
+    np.ndarray, (n_rows, n_features)
+        stable argsort of each latent column of `z[rows]`
+    """
+
+    if isinstance(rows, slice):
+        return order
+
+    keep = np.zeros((n_samples,), dtype=bool)
+    keep[rows] = True
+    local = np.cumsum(keep) - 1
+
+    # the kept entries of each column, in rank order
+    kept = order.T[keep[order.T]].reshape((order.shape[1], -1)).T
+
+    return local[kept]
+
+
+def _get_grouped_rank_order(z: np.ndarray, slices: List[slice]) -> np.ndarray:
+    """
+    Calculate the stable rank order of each latent column within every group of samples, with a single sort over all samples.
+
+    The latent columns are sorted once over all samples, and the sorted entries are then stably partitioned by group, which keeps the rank order within each group.
+
+    Parameters
+    ----------
+    z : np.ndarray, (n_samples, n_features)
+        a batch of latent vectors, already sorted by group id as in `_sort_by_group`
+    slices : List[slice]
+        the contiguous slice of each group in `z`
+
+    Returns
+    -------
+    np.ndarray, (n_samples, n_features)
+        rank order of each group, aligned with `z`. The slice of each group is the stable argsort of each latent column of the samples of that group, indexed within the group.
+    """
+
+    # a small integer type allows a linear-time radix sort for the partition
+    gid = np.empty((z.shape[0],), dtype=np.min_scalar_type(len(slices)))
+    start = np.empty((z.shape[0],), dtype=np.int64)
+    for k, sl in enumerate(slices):
+        gid[sl] = k
+        start[sl] = sl.start
+
+    order = np.argsort(z, axis=0, kind="stable")
+    order = np.take_along_axis(
+        order, np.argsort(gid[order], axis=0, kind="stable"), axis=0
+    )
+
+    return order - start[:, None]
+
+
+def _best_interval_accuracy(counts: np.ndarray) -> float:
+    """
+    Calculate the best training accuracy of a 1-D ordered-interval classifier.
+
+    The classifier partitions the latent axis into contiguous intervals, each assigned to a different class, with the classes arranged along the axis in the order of their mean rank (or its reverse). The partition maximizing the number of correctly classified samples is found exactly by dynamic programming over the prefix sums of the class counts.
+
+    Parameters
+    ----------
+    counts : np.ndarray, (n_bins, n_classes)
+        number of samples of each class in each bin, with the bins sorted along the latent axis
+
+    Returns
+    -------
+    float
+        the best training accuracy
+    """
+
+    n_bins, _ = counts.shape
+
+    total = np.sum(counts)
+
+    if total == 0:
+        return 0.0
+
+    prefix = np.concatenate([np.zeros_like(counts[:1]), np.cumsum(counts, axis=0)])
+
+    mean_rank = (np.arange(n_bins) @ counts) / np.maximum(np.sum(counts, axis=0), 1)
+    class_order = np.argsort(mean_rank, kind="stable")
+
+    correct = max(
+        _ordered_interval_correct(prefix[:, class_order]),
+        _ordered_interval_correct(prefix[:, class_order[::-1]]),
+    )
+
+    return correct / total
+
+
+def _ordered_interval_correct(prefix: np.ndarray) -> float:
+
+    # best[p] is the largest number of correctly classified samples among the first p bins, using only the classes considered so far
+    best = np.full(prefix.shape[0], -np.inf)
+    best[0] = 0.0
+
+    for k in range(prefix.shape[1]):
+        best = prefix[:, k] + np.maximum.accumulate(best - prefix[:, k])
+
+    return best[-1]
+
+
+def _get_histogram_range(
+    z: np.ndarray,
+    hist_range: Optional[Tuple[float, float]] = None,
+    n_bins: int = 256,
+) -> Tuple[np.ndarray, np.ndarray]:
+
+    _, n_features = z.shape
+
+    if hist_range is None:
+        return _get_histogram_lattice(np.min(z, axis=0), np.max(z, axis=0), n_bins)
+
+    lo = np.full((n_features,), hist_range[0], dtype=float)
+    hi = np.full((n_features,), hist_range[1], dtype=float)
+
+    assert np.all(hi >= lo), "`hist_range` must be increasing"
+
+    # a constant latent dimension still needs a bin of nonzero width
+    hi = np.where(hi > lo, hi, lo + 1.0)
+
+    return lo, hi
+
+
+def _get_histogram_lattice(
+    zmin: np.ndarray,
+    zmax: np.ndarray,
+    n_bins: int,
+    exp: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the histogram range of each latent dimension on a power-of-two lattice.
+
+    The bins of each latent dimension have a width of `2**exp` and start at an integer multiple of their width. The smallest such width, no smaller than `2**exp`, for which `n_bins` bins cover [`zmin`, `zmax`] is used. Since every bin of a lattice lies entirely inside one bin of any coarser lattice, histograms on these ranges can be widened and merged without splitting any bin.
+
+    Parameters
+    ----------
+    zmin : np.ndarray, (n_features,)
+        smallest value to cover in each latent dimension
+    zmax : np.ndarray, (n_features,)
+        largest value to cover in each latent dimension
+    n_bins : int
+        number of histogram bins
+    exp : Optional[np.ndarray], (n_features,), optional
+        smallest allowed base-2 exponent of the bin width, by default None (i.e., no bound)
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        lower and upper edges of the histogram of each latent dimension. The upper edges are exclusive.
+    """
+
+    if exp is None:
+        # a constant latent dimension still needs a bin of nonzero width
+        span = np.where(zmax > zmin, zmax - zmin, 1.0)
+        exp = np.ceil(np.log2(span / n_bins)).astype(np.int64)
+
+    while True:
+        width = np.ldexp(1.0, exp)
+        start = np.floor(zmin / width)
+        short = np.floor(zmax / width) - start >= n_bins
+
+        if not np.any(short):
+            return start * width, (start + n_bins) * width
+
+        exp = exp + short
+
+
+def _get_histogram_lattice_index(
+    lo: np.ndarray, hi: np.ndarray, n_bins: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    # base-2 exponent of the bin width, and lattice index of the first bin
+    width = (hi - lo) / n_bins
+    return (
+        np.round(np.log2(width)).astype(np.int64),
+        np.round(lo / width).astype(np.int64),
+    )
+
+
+def _get_occupied_histogram_range(
+    hists: List[np.ndarray], lo: np.ndarray, hi: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    # lower edges of the first and the last non-empty bins of each latent dimension, or of the first and the last bins if all are empty
+    n_bins = hists[0].shape[1]
+    width = (hi - lo) / n_bins
+
+    occupied = np.sum([np.sum(hist, axis=-1) for hist in hists], axis=0) > 0
+    first = np.where(np.any(occupied, axis=-1), np.argmax(occupied, axis=-1), 0)
+    last = n_bins - 1 - np.argmax(occupied[:, ::-1], axis=-1)
+
+    return lo + first * width, lo + last * width
+
+
+def _rebin_discrete_sap_histograms(
+    hists: List[np.ndarray],
+    lo: np.ndarray,
+    hi: np.ndarray,
+    new_lo: np.ndarray,
+    new_hi: np.ndarray,
+) -> List[np.ndarray]:
+    """
+    Move per-class latent histograms to a wider range of the same power-of-two lattice, by merging adjacent bins.
+
+    Parameters
+    ----------
+    hists : List[np.ndarray]
+        histogram of each attribute, each of shape (n_features, n_bins, n_classes)
+    lo : np.ndarray, (n_features,)
+        current lower edge of the histogram of each latent dimension
+    hi : np.ndarray, (n_features,)
+        current upper edge of the histogram of each latent dimension
+    new_lo : np.ndarray, (n_features,)
+        new lower edge, as returned by `_get_histogram_lattice` for a range covering the non-empty bins
+    new_hi : np.ndarray, (n_features,)
+        new upper edge
+
+    Returns
+    -------
+    List[np.ndarray]
+        the histograms on the new range. The inputs are not modified.
+    """
+
+    if np.array_equal(lo, new_lo) and np.array_equal(hi, new_hi):
+        return hists
+
+    n_features, n_bins, _ = hists[0].shape
+
+    exp, start = _get_histogram_lattice_index(lo, hi, n_bins)
+    new_exp, new_start = _get_histogram_lattice_index(new_lo, new_hi, n_bins)
+
+    assert np.all(new_exp >= exp), "histograms can only be moved to a coarser lattice"
+
+    # the arithmetic shift floors the lattice index of each bin to that of the coarser lattice
+    idx = np.right_shift(
+        start[:, None] + np.arange(n_bins), (new_exp - exp)[:, None]
+    ) - new_start[:, None]
+
+    # empty bins outside of the new range are dropped
+    keep = ((idx >= 0) & (idx < n_bins)).ravel()
+    idx = (idx + n_bins * np.arange(n_features)[:, None]).ravel()[keep]
+
+    new_hists = []
+    for hist in hists:
+        n_classes = hist.shape[-1]
+        hist = hist.reshape(-1, n_classes)
+
+        assert not np.any(hist[~keep]), "the new range must cover the non-empty bins"
+
+        new_hist = np.zeros((n_features * n_bins, n_classes), dtype=hist.dtype)
+        np.add.at(new_hist, idx, hist[keep])
+        new_hists.append(new_hist.reshape((n_features, n_bins, n_classes)))
+
+    return new_hists
+
+
+def _widen_discrete_sap_histograms(
+    hists: List[np.ndarray],
+    lo: np.ndarray,
+    hi: np.ndarray,
+    zmin: np.ndarray,
+    zmax: np.ndarray,
+    n_bins: int,
+) -> Tuple[List[np.ndarray], np.ndarray, np.ndarray]:
+    """
+    Widen the power-of-two lattice range of per-class latent histograms to also cover [`zmin`, `zmax`].
+
+    Parameters
+    ----------
+    hists : List[np.ndarray]
+        histogram of each attribute, each of shape (n_features, n_bins, n_classes)
+    lo : np.ndarray, (n_features,)
+        current lower edge of the histogram of each latent dimension, on a lattice from `_get_histogram_lattice`
+    hi : np.ndarray, (n_features,)
+        current upper edge of the histogram of each latent dimension
+    zmin : np.ndarray, (n_features,)
+        smallest value to cover in each latent dimension
+    zmax : np.ndarray, (n_features,)
+        largest value to cover in each latent dimension
+    n_bins : int
+        number of histogram bins
+
+    Returns
+    -------
+    Tuple[List[np.ndarray], np.ndarray, np.ndarray]
+        the histograms and their lower and upper edges. If [`lo`, `hi`) already covers [`zmin`, `zmax`], the inputs are returned as-is.
+    """
+
+    if np.all(zmin >= lo) and np.all(zmax < hi):
+        return hists, lo, hi
+
+    exp, _ = _get_histogram_lattice_index(lo, hi, n_bins)
+    first, last = _get_occupied_histogram_range(hists, lo, hi)
+
+    new_lo, new_hi = _get_histogram_lattice(
+        np.minimum(first, zmin), np.maximum(last, zmax), n_bins, exp=exp
+    )
+
+    return _rebin_discrete_sap_histograms(hists, lo, hi, new_lo, new_hi), new_lo, new_hi
+
+
+def _update_discrete_sap_histograms(
+    hists: List[np.ndarray],
+    classes: List[np.ndarray],
+    z: np.ndarray,
+    a: np.ndarray,
+    lo: np.ndarray,
+    hi: np.ndarray,
+    n_bins: int,
+    valid: Optional[np.ndarray] = None,
+) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+    """
+    Add a batch of samples to the per-class latent histograms of the discrete SAP score.
+
+    Parameters
+    ----------
+    hists : List[np.ndarray]
+        histogram of each attribute, each of shape (n_features, n_bins, n_classes). An empty list is used before the first batch.
+    classes : List[np.ndarray]
+        sorted class labels of each attribute, each of shape (n_classes,). An empty list is used before the first batch.
+    z : np.ndarray, (n_samples, n_features)
+        a batch of latent vectors
+    a : np.ndarray, (n_samples, n_attributes)
+        a batch of attributes
+    lo : np.ndarray, (n_features,)
+        lower edge of the histogram of each latent dimension
+    hi : np.ndarray, (n_features,)
+        upper edge of the histogram of each latent dimension. Latent values outside of [`lo`, `hi`] are counted in the outermost bins, with a warning.
+    n_bins : int
+        number of histogram bins
+    valid : Optional[np.ndarray], (n_samples, n_attributes), optional
+        boolean mask of labelled attribute values, by default None (i.e., all values are labelled)
+
+    Returns
+    -------
+    Tuple[List[np.ndarray], List[np.ndarray]]
+        The updated histograms and class labels. The input lists and arrays are not modified.
+    """
+
+    _, n_features = z.shape
+    _, n_attr = a.shape
+
+    if np.any(z < lo) or np.any(z > hi):
+        warnings.warn(
+            "Some latent values are outside of the histogram range and are counted in the outermost bins, which may lower the SAP scores. Set `hist_range` to cover all latent values.",
+            RuntimeWarning,
+        )
+
+    bins = np.floor((z - lo) / (hi - lo) * n_bins).astype(int)
+    bins = np.clip(bins, 0, n_bins - 1) + np.arange(n_features) * n_bins
+
+    new_hists = []
+    new_classes = []
+
+    for j in range(n_attr):
+        rows = _valid_rows(valid, j)
+        batch_classes, aj = np.unique(a[rows, j], return_inverse=True)
+
+        if len(classes) > j:
+            cls = np.union1d(classes[j], batch_classes)
+        else:
+            cls = batch_classes
+
+        n_classes = len(cls)
+        labels = np.searchsorted(cls, batch_classes)[aj.ravel()]
+
+        hist = np.bincount(
+            (bins[rows] * n_classes + labels[:, None]).ravel(),
+            minlength=n_features * n_bins * n_classes,
+        ).reshape((n_features, n_bins, n_classes))
+
+        if len(hists) > j:
+            hist[:, :, np.searchsorted(cls, classes[j])] += hists[j]
+
+        new_hists.append(hist)
+        new_classes.append(cls)
+
+    return new_hists, new_classes
+
+
+def _merge_discrete_sap_histograms(
+    state1: Tuple[List[np.ndarray], List[np.ndarray], np.ndarray, np.ndarray],
+    state2: Tuple[List[np.ndarray], List[np.ndarray], np.ndarray, np.ndarray],
+    adaptive: bool = False,
+) -> Tuple[List[np.ndarray], List[np.ndarray], np.ndarray, np.ndarray]:
+    """
+    Merge the per-class latent histograms of the discrete SAP score of two disjoint sets of samples, e.g. from different workers.
+
+    Parameters
+    ----------
+    state1 : Tuple[List[np.ndarray], List[np.ndarray], np.ndarray, np.ndarray]
+        histograms, sorted class labels, lower edges, and upper edges of the first set of samples, as used by `_update_discrete_sap_histograms`. Empty lists and edges can be used for an empty set.
+    state2 : Tuple[List[np.ndarray], List[np.ndarray], np.ndarray, np.ndarray]
+        the same for the second set of samples
+    adaptive : bool, optional
+        whether both ranges are on power-of-two lattices from `_get_histogram_lattice`, by default False. If True, histograms with different ranges are first moved to a common range covering both.
+
+    Returns
+    -------
+    Tuple[List[np.ndarray], List[np.ndarray], np.ndarray, np.ndarray]
+        histograms, sorted class labels, lower edges, and upper edges of the union of the two sets of samples. The class labels of each attribute are the union of those of both sets, and the histogram counts are aligned to them.
+
+    Raises
+    ------
+    ValueError
+        if the histogram edges of the two sets differ and `adaptive` is False
+    """
+
+    hists1, classes1, lo1, hi1 = state1
+    hists2, classes2, lo2, hi2 = state2
+
+    if len(hists1) == 0:
+        return state2
+
+    if len(hists2) == 0:
+        return state1
+
+    if adaptive:
+        n_bins = hists1[0].shape[1]
+        exp1, _ = _get_histogram_lattice_index(lo1, hi1, n_bins)
+        exp2, _ = _get_histogram_lattice_index(lo2, hi2, n_bins)
+        first1, last1 = _get_occupied_histogram_range(hists1, lo1, hi1)
+        first2, last2 = _get_occupied_histogram_range(hists2, lo2, hi2)
+
+        lo, hi = _get_histogram_lattice(
+            np.minimum(first1, first2),
+            np.maximum(last1, last2),
+            n_bins,
+            exp=np.maximum(exp1, exp2),
+        )
+        hists1 = _rebin_discrete_sap_histograms(hists1, lo1, hi1, lo, hi)
+        hists2 = _rebin_discrete_sap_histograms(hists2, lo2, hi2, lo, hi)
+        lo1, hi1 = lo, hi
+    elif not (np.array_equal(lo1, lo2) and np.array_equal(hi1, hi2)):
+        raise ValueError(
+            "Histograms with different ranges cannot be merged. Set `hist_range` to the same value for all workers."
+        )
+
+    assert len(hists1) == len(hists2), "the number of attributes must be the same"
+    assert (
+        hists1[0].shape[:2] == hists2[0].shape[:2]
+    ), "the number of latent dimensions and bins must be the same"
+
+    hists = []
+    classes = []
+
+    for hist1, cls1, hist2, cls2 in zip(hists1, classes1, hists2, classes2):
+        cls = np.union1d(cls1, cls2)
+
+        hist = np.zeros(hist1.shape[:2] + (len(cls),), dtype=hist1.dtype)
+        hist[:, :, np.searchsorted(cls, cls1)] += hist1
+        hist[:, :, np.searchsorted(cls, cls2)] += hist2
+
+        hists.append(hist)
+        classes.append(cls)
+
+    return hists, classes, lo1, hi1
+
+
+def _get_discrete_sap_score_from_histograms(hists: List[np.ndarray]) -> np.ndarray:
+
+    n_features, _, _ = hists[0].shape
+    n_attr = len(hists)
+
+    score = np.zeros(shape=(n_features, n_attr))
+
+    for j, hist in enumerate(hists):
+        for i in range(n_features):
+            score[i, j] = _best_interval_accuracy(hist[i])
+
+    return score
+
+
 def sap(
     z: np.ndarray,
     a: np.ndarray,
@@ -59,7 +776,11 @@ def sap(
     discrete: bool = False,
     l2_reg: float = 1.0,
     thresh: float = 1e-12,
-) -> np.ndarray:
+    max_samples: Optional[int] = None,
+    mask: Optional[np.ndarray] = None,
+    groups: Optional[np.ndarray] = None,
+    discrete_mode: str = "svc",
+) -> Union[np.ndarray, Dict[Any, np.ndarray]]:
     """
     Calculate Separate Attribute Predictability (SAP) between latent vectors and attributes
 
@@ -86,11 +807,20 @@ def sap(
         regularization parameter for linear classifier, by default 1.0. Ignored if `discrete` is `False`. See `sklearn.svm.LinearSVC` for more details.
     thresh : float, optional
         threshold for latent vector variance, by default 1e-12. Latent dimensions with variance below `thresh` will have SAP contribution zeroed. Ignored if `discrete` is `True`.
+    max_samples : Optional[int], optional
+        maximum number of samples used in the calculation, by default None (i.e., all samples are used). If there are more samples than `max_samples`, a random subsample seeded by `latte.RANDOM_STATE` is drawn. If `discrete` is True, the subsample is stratified by the attribute classes so that rare classes are retained.
+    mask : Optional[np.ndarray], (n_samples, n_attributes) or (n_samples,), optional
+        boolean mask of labelled attribute values, by default None. Each attribute is evaluated only on the samples in which it is labelled. NaN attribute values are always treated as unlabelled.
+    groups : Optional[np.ndarray], (n_samples,), optional
+        group id of each sample, by default None. If provided, the metric is evaluated separately on each group of samples.
+    discrete_mode : str, optional
+        options for calculating the classification accuracy of discrete attributes, by default "svc". Must be one of {"svc", "exact"}. If "svc", a `sklearn.svm.LinearSVC` is fitted for each latent dimension and attribute. If "exact", the best training accuracy of a 1-D classifier assigning contiguous intervals of the latent dimension to the classes, ordered by their mean rank along the latent dimension, is found exactly from the sorted latent values. For binary attributes, this is the best threshold classifier, and its accuracy is always at least the training accuracy of the "svc" mode. For multi-class attributes, the "exact" accuracy may differ from the "svc" accuracy in either direction, since the class order of the one-vs-rest SVC need not be the class-mean order. Ignored if `discrete` is `False`.
 
     Returns
     -------
     np.ndarray, (n_attributes,)
         SAP for each attribute
+        If `groups` is provided, a dictionary mapping each group id to the above is returned instead.
     
     See Also
     --------
@@ -101,19 +831,73 @@ def sap(
     .. [1] A. Kumar, P. Sattigeri, and A. Balakrishnan, “Variational inference of disentangled latent concepts from unlabeled observations”, in Proceedings of the 6th International Conference on Learning Representations, 2018.
     """
 
+    assert discrete_mode in __VALID_DISCRETE_MODE__
+
     z, a, reg_dim = _validate_za_shape(z, a, reg_dim)
 
-    _, n_attr = a.shape
+    if groups is not None:
+        func = partial(
+            _get_sap,
+            reg_dim=reg_dim,
+            discrete=discrete,
+            l2_reg=l2_reg,
+            thresh=thresh,
+            max_samples=max_samples,
+            discrete_mode=discrete_mode,
+        )
+
+        if not (discrete and discrete_mode == "exact" and max_samples is None):
+            return _apply_grouped(func, groups, z, a, mask=mask)
+
+        # all groups share a single sort of the latent columns, on the samples
+        # that are already sorted by group id
+        keys, slices, (z, a, mask) = _sort_by_group(groups, z, a, mask)
+        order = _get_grouped_rank_order(z, slices)
+
+        return {
+            key: func(
+                z[sl],
+                a[sl],
+                mask=mask[sl] if mask is not None else None,
+                order=order[sl],
+            )
+            for key, sl in zip(keys, slices)
+        }
+
+    return _get_sap(
+        z,
+        a,
+        reg_dim=reg_dim,
+        discrete=discrete,
+        l2_reg=l2_reg,
+        thresh=thresh,
+        max_samples=max_samples,
+        mask=mask,
+        discrete_mode=discrete_mode,
+    )
+
+
+def _get_sap(
+    z: np.ndarray,
+    a: np.ndarray,
+    reg_dim: Optional[List[int]] = None,
+    discrete: bool = False,
+    l2_reg: float = 1.0,
+    thresh: float = 1e-12,
+    max_samples: Optional[int] = None,
+    mask: Optional[np.ndarray] = None,
+    discrete_mode: str = "svc",
+    order: Optional[np.ndarray] = None,
+) -> np.ndarray:
 
-    ret = np.zeros((n_attr,))
+    valid = _validate_attr_mask(a, mask)
+    z, a, valid = _subsample_za(z, a, max_samples, discrete, valid)
 
-    if discrete:
-        score = _get_discrete_sap_score(z, a, l2_reg=l2_reg)
+    if discrete and discrete_mode == "exact":
+        score = _get_exact_discrete_sap_score(z, a, valid=valid, order=order)
+    elif discrete:
+        score = _get_discrete_sap_score(z, a, l2_reg=l2_reg, valid=valid)
     else:
-        score = _get_continuous_sap_score(z, a, thresh=thresh)
-
-    for i in range(n_attr):
-        zi = reg_dim[i] if reg_dim is not None else None
-        ret[i], _ = _top2gap(score[:, i], zi=zi)
+        score = _get_continuous_sap_score(z, a, thresh=thresh, valid=valid)
 
-    return ret
+    return _get_sap_from_score(score, reg_dim)
@@ -1,61 +1,104 @@
-from typing import List, Optional, Tuple, Union
+import warnings
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 
-__VALID_LIAD_MODE__ = ["forward"]  # ["forward", "central", "spline"]
+from .._utils import _get_validation_level
+
+__VALID_LIAD_MODE__ = ["forward", "central", "spline"]
 __VALID_MAX_MODE__ = ["naive", "lehmer"]
 __VALID_PTP_MODE__ = ["naive"]
 __VALID_REDUCE_MODE__ = ["all", "attribute", "sample", "none"]
 
 
+def _is_shared_grid(z: np.ndarray, a: np.ndarray) -> bool:
+    if z.ndim == 1:
+        return True
+
+    # a 2D `z` is a per-sample array if `a` has no attribute axis, or if it matches a single-attribute `a`
+    if z.ndim == 2 and a.ndim == 3:
+        return not (a.shape[1] == 1 and z.shape[0] == a.shape[0])
+
+    return False
+
+
 def _validate_za_shape(
     z: np.ndarray,
     a: np.ndarray,
     reg_dim: Optional[List[int]] = None,
     min_size: int = None,
+    model_axis: bool = False,
 ) -> Tuple[np.ndarray, np.ndarray]:
 
-    assert 2 <= a.ndim <= 3
-    assert 2 <= z.ndim <= 3
+    check = _get_validation_level() != "off"
+
+    # a leading model axis is carried through all the reshaping below
+    lead = int(model_axis)
+
+    if check:
+        assert 2 + lead <= a.ndim <= 3 + lead
+        assert 1 + lead <= z.ndim <= 3 + lead
+        if model_axis:
+            assert (
+                z.shape[0] == a.shape[0]
+            ), "`z` and `a` must have the same number of models"
+
+    shared = _is_shared_grid(z[0], a[0]) if model_axis else _is_shared_grid(z, a)
+
+    if a.ndim == 2 + lead:
+        a = a[..., None, :]
 
-    if a.ndim == 2:
-        a = a[:, None, :]
+    if z.ndim == 1 + lead:
+        z = z[..., None, None, :]
+    elif z.ndim == 2 + lead:
+        z = z[..., None, :, :] if shared else z[..., :, None, :]
 
-    if z.ndim == 2:
-        z = z[:, None, :]
+    n_samples_a, n_attr, n_interp_a = a.shape[-3:]
+    n_samples_z, n_features, n_interp_z = z.shape[-3:]
 
-    n_samples_a, n_attr, n_interp_a = a.shape
-    n_samples_z, n_features, n_interp_z = z.shape
+    if check:
+        assert n_samples_a == n_samples_z or shared
+        assert n_interp_a == n_interp_z
+        assert n_attr <= n_features or n_features == 1
 
-    assert n_samples_a == n_samples_z
-    assert n_interp_a == n_interp_z
-    assert n_attr <= n_features
+        if min_size is not None:
+            assert n_interp_a >= min_size
 
-    if min_size is not None:
-        assert n_interp_a >= min_size
+    if n_features == 1 and n_attr > 1:
+        # the same interpolation points are shared by all attributes
+        return z, a
 
     if reg_dim is not None:
-        assert len(reg_dim) == n_attr
-        assert min(reg_dim) >= 0
-        assert max(reg_dim) < n_features
+        if check:
+            assert len(reg_dim) == n_attr
+            assert min(reg_dim) >= 0
+            assert max(reg_dim) < n_features
 
-        z = z[:, reg_dim, :]
+        z = z[..., reg_dim, :]
     else:
         if n_attr < n_features:
-            z = z[:, :n_attr, :]
+            z = z[..., :n_attr, :]
 
     return z, a
 
 
 def _validate_non_constant_interp(z):
+    if _get_validation_level() != "full":
+        return
+
     if np.any(np.all(z == z[..., [0]], axis=-1)):
         raise ValueError("`z` must not be constant along the interpolation axis.")
 
 
-def _validate_equal_interp_deltas(z):
-    d2z = np.diff(z, n=2, axis=-1)
-    if not np.allclose(d2z, np.zeros_like(d2z)):
-        raise NotImplementedError("Unequal `z` spacing is currently not supported.")
+def _validate_monotonic_interp(z):
+    if _get_validation_level() != "full":
+        return
+
+    dz = np.diff(z, n=1, axis=-1)
+    if not np.all(np.all(dz > 0, axis=-1) | np.all(dz < 0, axis=-1)):
+        raise ValueError(
+            "`z` must be strictly monotonic along the interpolation axis."
+        )
 
 
 def _finite_diff(
@@ -64,8 +107,15 @@ def _finite_diff(
     order: int = 1,
     mode: str = "forward",
     return_list: bool = False,
+    return_z: bool = True,
+    out: Optional[List[np.ndarray]] = None,
 ) -> Union[Tuple[np.ndarray, np.ndarray], List[Tuple[np.ndarray, np.ndarray]]]:
 
+    if mode == "forward" and not return_z:
+        liads = _fused_forward_diff(z, a, order=order, out=out)
+        rets = [(liad, None) for liad in liads]
+        return rets if return_list else rets[-1]
+
     rets = []
 
     if mode == "forward":
@@ -77,13 +127,246 @@ def _finite_diff(
             z = 0.5 * (z[..., :-1] + z[..., 1:])
 
             rets.append((a, z))
+    elif mode == "central":
+        rets = _central_diff(z, a, order=order)
     else:
         raise NotImplementedError
 
     if return_list:
         return rets
     else:
-        return a, z
+        return rets[-1]
+
+
+def _central_diff(
+    z: np.ndarray, a: np.ndarray, order: int = 1
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Calculate central finite differences using compact three-point stencils.
+
+    The first- and second-order differences are evaluated at the interior interpolation points using the second-order accurate three-point stencils for non-uniformly spaced points. Each higher order is obtained by applying the first-order stencil to the previous order.
+
+    Parameters
+    ----------
+    z : np.ndarray, (..., n_interp)
+        interpolation points
+    a : np.ndarray, (..., n_interp)
+        attribute values
+    order : int, optional
+        highest order of difference, by default 1
+
+    Returns
+    -------
+    List[Tuple[np.ndarray, np.ndarray]]
+        finite differences of each order, from 1 to `order`, and the interpolation points at which they are evaluated
+    """
+
+    rets = []
+
+    for k in range(order):
+        if k == 1:
+            # use the direct stencil on the original points rather than differencing twice
+            d = _central_stencil(z, a, second=True)
+            rets.append((d, rets[0][1]))
+            continue
+
+        zk, ak = (z, a) if k == 0 else rets[-1][::-1]
+
+        d = _central_stencil(zk, ak, second=False)
+        rets.append((d, zk[..., 1:-1]))
+
+    return rets
+
+
+def _central_stencil(z: np.ndarray, a: np.ndarray, second: bool = False) -> np.ndarray:
+
+    h1 = z[..., 1:-1] - z[..., :-2]
+    h2 = z[..., 2:] - z[..., 1:-1]
+    h12 = h1 + h2
+
+    am = a[..., :-2]
+    a0 = a[..., 1:-1]
+    ap = a[..., 2:]
+
+    if second:
+        return 2.0 * (am / (h1 * h12) - a0 / (h1 * h2) + ap / (h2 * h12))
+
+    return (-h2 / (h1 * h12)) * am + ((h2 - h1) / (h1 * h2)) * a0 + (h1 / (h2 * h12)) * ap
+
+
+def _spline_diff(
+    z: np.ndarray, a: np.ndarray, order: int = 1
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Calculate derivatives of the natural cubic spline interpolating the attribute values.
+
+    The second derivatives of the spline at the knots are solved for with the Thomas algorithm, vectorized over all leading axes. The first derivatives are evaluated at all knots, the second derivatives at the interior knots (since they are zero at the boundary knots by construction), and the third derivatives at the midpoints of the intervals, where they are constant.
+
+    Parameters
+    ----------
+    z : np.ndarray, (..., n_interp)
+        interpolation points, strictly increasing along the last axis
+    a : np.ndarray, (..., n_interp)
+        attribute values
+    order : int, optional
+        highest order of derivative, by default 1. Must be at most 3.
+
+    Returns
+    -------
+    List[Tuple[np.ndarray, np.ndarray]]
+        derivatives of each order, from 1 to `order`, and the interpolation points at which they are evaluated
+    """
+
+    assert 1 <= order <= 3, "spline LIAD supports orders up to 3"
+
+    z, a = np.broadcast_arrays(z, a)
+    z = z.astype(float)
+    a = a.astype(float)
+
+    n_interp = a.shape[-1]
+
+    h = np.diff(z, axis=-1)
+    slope = np.diff(a, axis=-1) / h
+
+    # second derivatives at the knots, zero at both ends for the natural spline
+    m = np.zeros_like(a)
+
+    if n_interp > 2:
+        diag = 2.0 * (h[..., :-1] + h[..., 1:])
+        rhs = 6.0 * np.diff(slope, axis=-1)
+        off = h[..., 1:-1]
+
+        # forward sweep
+        cp = np.zeros_like(diag)
+        dp = np.zeros_like(diag)
+        cp[..., 0] = off[..., 0] / diag[..., 0] if n_interp > 3 else 0.0
+        dp[..., 0] = rhs[..., 0] / diag[..., 0]
+        for i in range(1, n_interp - 2):
+            den = diag[..., i] - off[..., i - 1] * cp[..., i - 1]
+            if i < n_interp - 3:
+                cp[..., i] = off[..., i] / den
+            dp[..., i] = (rhs[..., i] - off[..., i - 1] * dp[..., i - 1]) / den
+
+        # back substitution
+        m[..., n_interp - 2] = dp[..., -1]
+        for i in range(n_interp - 4, -1, -1):
+            m[..., i + 1] = dp[..., i] - cp[..., i] * m[..., i + 2]
+
+    d1 = np.empty_like(a)
+    d1[..., :-1] = slope - h * (2.0 * m[..., :-1] + m[..., 1:]) / 6.0
+    d1[..., -1] = slope[..., -1] + h[..., -1] * (m[..., -2] + 2.0 * m[..., -1]) / 6.0
+
+    rets = [(d1, z)]
+
+    if order >= 2:
+        rets.append((m[..., 1:-1], z[..., 1:-1]))
+
+    if order >= 3:
+        rets.append((np.diff(m, axis=-1) / h, 0.5 * (z[..., :-1] + z[..., 1:])))
+
+    return rets
+
+
+def _fused_forward_diff(
+    z: np.ndarray,
+    a: np.ndarray,
+    order: int = 1,
+    out: Optional[List[np.ndarray]] = None,
+) -> List[np.ndarray]:
+    """
+    Calculate forward finite differences of all orders up to `order` in a single pass.
+
+    The differences are identical to those of `_finite_diff` with `mode="forward"`, but the midpoints of the interpolation points are never formed. Instead, the spacing between the midpoints of each order is obtained by averaging adjacent spacings of the previous order. Each order is written directly into its output buffer.
+
+    Parameters
+    ----------
+    z : np.ndarray, (..., n_interp)
+        interpolation points, broadcastable to `a`
+    a : np.ndarray, (..., n_interp)
+        attribute values
+    order : int, optional
+        highest order of difference, by default 1
+    out : Optional[List[np.ndarray]], optional
+        output buffers of each order, by default None. The buffer of order `k` must have shape `a.shape[:-1] + (n_interp - k,)` and a floating dtype. If None, new arrays are allocated.
+
+    Returns
+    -------
+    List[np.ndarray]
+        finite differences of each order, from 1 to `order`
+    """
+
+    n_interp = a.shape[-1]
+    shape = np.broadcast(z, a).shape[:-1]
+
+    assert 1 <= order < n_interp
+
+    if out is None:
+        out = [np.empty(shape + (n_interp - k,)) for k in range(1, order + 1)]
+    else:
+        assert len(out) == order
+        for k, buf in enumerate(out, start=1):
+            assert buf.shape == shape + (n_interp - k,)
+
+    spacing = np.subtract(z[..., 1:], z[..., :-1], dtype=float)
+
+    prev = a
+    for k, buf in enumerate(out, start=1):
+        np.subtract(prev[..., 1:], prev[..., :-1], out=buf)
+        if k > 1:
+            # spacing between adjacent midpoints of the previous order
+            spacing = 0.5 * (spacing[..., 1:] + spacing[..., :-1])
+        np.divide(buf, spacing, out=buf)
+        prev = buf
+
+    return out
+
+
+class _LiadBufferPool:
+    """
+    Pool of output buffers for forward LIADs, reused by successive chunks of samples.
+
+    A buffer is allocated for each distinct shape, so that all chunks of the same size write their LIADs into the same arrays. The LIADs of a chunk are overwritten by the next chunk, so they must not be kept beyond the evaluation of that chunk.
+    """
+
+    def __init__(self):
+        self._buffers: Dict[Tuple[int, ...], np.ndarray] = {}
+
+    def get(
+        self, z: np.ndarray, a: np.ndarray, order: int, mode: str = "forward"
+    ) -> Optional[List[np.ndarray]]:
+        """
+        Get the output buffers of the forward LIADs of `a` with respect to `z`.
+
+        Parameters
+        ----------
+        z : np.ndarray, (..., n_interp)
+            interpolation points, broadcastable to `a`
+        a : np.ndarray, (..., n_interp)
+            attribute values
+        order : int
+            highest order of LIAD
+        mode : str, optional
+            LIAD mode, by default "forward"
+
+        Returns
+        -------
+        Optional[List[np.ndarray]]
+            buffers of each order, from 1 to `order`, to be passed as `out` to `_liad`, or None if `mode` is not "forward"
+        """
+
+        if mode != "forward":
+            return None
+
+        shape = np.broadcast(z, a).shape[:-1]
+
+        out = []
+        for k in range(1, order + 1):
+            key = shape + (a.shape[-1] - k,)
+            if key not in self._buffers:
+                self._buffers[key] = np.empty(key)
+            out.append(self._buffers[key])
+
+        return out
 
 
 def _liad(
@@ -92,17 +375,129 @@ def _liad(
     order: int = 1,
     mode: str = "forward",
     return_list: bool = False,
+    return_z: bool = True,
+    out: Optional[List[np.ndarray]] = None,
 ) -> Union[Tuple[np.ndarray, np.ndarray], List[Tuple[np.ndarray, np.ndarray]]]:
 
-    if mode in ["forward"]:
-        rets = _finite_diff(z, a, order, mode, return_list=return_list)
+    if mode in ["forward", "central"]:
+        rets = _finite_diff(
+            z, a, order, mode, return_list=return_list, return_z=return_z, out=out
+        )
+    elif mode == "spline":
+        rets = _spline_diff(z, a, order)
+        if not return_list:
+            rets = rets[-1]
     else:
-        # TODO: add spline interpolation derivatives
         raise NotImplementedError
 
     return rets
 
 
+def _apply_chunked(
+    func: Callable[..., Any],
+    z: np.ndarray,
+    a: np.ndarray,
+    chunk_size: Optional[int] = None,
+    model_axis: bool = False,
+    **kwargs: Any
+) -> Union[np.ndarray, Tuple[np.ndarray, ...]]:
+    """
+    Evaluate a per-sample function on chunks of samples.
+
+    Parameters
+    ----------
+    func : Callable[..., Any]
+        function of `(z, a, **kwargs)` returning one or a tuple of arrays of shape `(..., n_samples, n_attributes)`
+    z : np.ndarray
+        latent vectors. Can be any array supporting slicing along the sample axis, such as `np.memmap`.
+    a : np.ndarray
+        attributes. Can be any array supporting slicing along the sample axis, such as `np.memmap`.
+    chunk_size : Optional[int], optional
+        number of samples per chunk, by default None. If None, `func` is evaluated on all samples at once.
+    model_axis : bool, optional
+        whether `z` and `a` have a leading model axis, by default False. If True, the samples are chunked along the second axis, and `model_axis` is passed on to `func`.
+    **kwargs : Any
+        keyword arguments to `func`
+
+    Returns
+    -------
+    Union[np.ndarray, Tuple[np.ndarray, ...]]
+        output(s) of `func`, concatenated along the sample axis
+    """
+
+    if model_axis:
+        kwargs["model_axis"] = True
+
+    if chunk_size is None:
+        return func(z, a, **kwargs)
+
+    assert chunk_size >= 1, "`chunk_size` must be a positive integer"
+
+    n_samples = a.shape[int(model_axis)]
+
+    # a shared interpolation grid is passed whole to every chunk
+    shared = _is_shared_grid(z[0], a[0]) if model_axis else _is_shared_grid(z, a)
+
+    def _chunk(x, start):
+        if model_axis:
+            return np.asarray(x[:, start : start + chunk_size])
+        return np.asarray(x[start : start + chunk_size])
+
+    outs = [
+        func(
+            np.asarray(z) if shared else _chunk(z, start),
+            _chunk(a, start),
+            **kwargs,
+        )
+        for start in range(0, n_samples, chunk_size)
+    ]
+
+    # the sample axis of the per-sample outputs is -2
+    if isinstance(outs[0], tuple):
+        return tuple(np.concatenate(out, axis=-2) for out in zip(*outs))
+
+    return np.concatenate(outs, axis=-2)
+
+
+def _partition_quantiles(x: np.ndarray, qs: List[float]) -> np.ndarray:
+    """
+    Compute several quantiles along the last axis with a single selection pass.
+
+    The values at the ranks needed by all quantiles are selected with one call to `np.partition`, instead of sorting the axis once per quantile. The quantiles are linearly interpolated between ranks, as in the default method of `np.quantile`.
+
+    Parameters
+    ----------
+    x : np.ndarray, (..., n)
+        input array
+    qs : List[float]
+        quantiles to compute, each in [0.0, 1.0]
+
+    Returns
+    -------
+    np.ndarray, (len(qs), ...)
+        quantiles of `x` along the last axis. Slices containing NaN have NaN quantiles.
+    """
+
+    n = x.shape[-1]
+    pos = np.asarray(qs, dtype=float) * (n - 1)
+    lo = np.floor(pos).astype(int)
+    hi = np.minimum(lo + 1, n - 1)
+    frac = pos - lo
+
+    part = np.partition(x, np.unique(np.concatenate([lo, hi])), axis=-1)
+
+    xlo = np.moveaxis(part[..., lo], -1, 0)
+    xhi = np.moveaxis(part[..., hi], -1, 0)
+    out = xlo + frac.reshape((-1,) + (1,) * (x.ndim - 1)) * (xhi - xlo)
+
+    # np.partition places NaN last instead of propagating it
+    isnan = np.isnan(x).any(axis=-1)
+    if np.any(isnan):
+        out[:, isnan] = np.nan
+
+    return out
+
+
 def _lehmer_mean(x: np.ndarray, p: float) -> np.ndarray:
 
     if p == 1.0:
@@ -117,3 +512,367 @@ def _lehmer_mean(x: np.ndarray, p: float) -> np.ndarray:
     # catch constant array, particularly all-zero axes
     out[np.all(x == x[..., [0]], axis=-1)] = x[np.all(x == x[..., [0]], axis=-1), 0]
     return out
+
+
+def _validate_ragged_za_shape(
+    z: np.ndarray,
+    a: np.ndarray,
+    offsets: np.ndarray,
+    reg_dim: Optional[List[int]] = None,
+    min_size: int = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Validate and reshape ragged interpolation points and attributes.
+
+    The interpolation points of all samples are concatenated along the first axis, and sample `i` spans the rows `offsets[i]:offsets[i + 1]`, as in the row pointers of a CSR matrix.
+
+    Parameters
+    ----------
+    z : np.ndarray, (n_values,) or (n_values, n_features or n_attributes)
+        concatenated latent vectors. If 1D, the same latent values are used for all attributes.
+    a : np.ndarray, (n_values,) or (n_values, n_attributes)
+        concatenated attributes
+    offsets : np.ndarray, (n_samples + 1,)
+        start of each sample in the concatenated arrays, followed by `n_values`
+    reg_dim : Optional[List[int]], optional
+        regularized dimensions, by default None
+    min_size : int, optional
+        minimum number of interpolation points per sample, by default None
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray, np.ndarray]
+        latent values of shape (n_values, n_attributes) or (n_values, 1), attributes of shape (n_values, n_attributes), and the offsets as integers
+    """
+
+    check = _get_validation_level() != "off"
+
+    offsets = np.asarray(offsets).astype(np.int64)
+
+    if a.ndim == 1:
+        a = a[:, None]
+
+    if z.ndim == 1:
+        z = z[:, None]
+
+    n_values, n_attr = a.shape
+    n_features = z.shape[1]
+
+    if check:
+        assert offsets.ndim == 1 and offsets.shape[0] >= 2
+        assert offsets[0] == 0, "`offsets` must start at 0"
+        assert offsets[-1] == n_values, "`offsets` must end at the number of values"
+        assert z.ndim == 2 and a.ndim == 2
+        assert z.shape[0] == n_values
+        assert n_attr <= n_features or n_features == 1
+
+        sizes = np.diff(offsets)
+        assert np.all(sizes >= (1 if min_size is None else min_size))
+
+    if n_features == 1 and n_attr > 1:
+        # the same interpolation points are shared by all attributes
+        return z, a, offsets
+
+    if reg_dim is not None:
+        if check:
+            assert len(reg_dim) == n_attr
+            assert min(reg_dim) >= 0
+            assert max(reg_dim) < n_features
+
+        z = z[:, reg_dim]
+    else:
+        if n_attr < n_features:
+            z = z[:, :n_attr]
+
+    return z, a, offsets
+
+
+def _ragged_interior(x: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    # drop the differences across the boundaries of adjacent samples
+    keep = np.ones(x.shape[0] - 1, dtype=bool)
+    keep[offsets[1:-1] - 1] = False
+    return keep
+
+
+def _validate_ragged_interp(z: np.ndarray, offsets: np.ndarray, strict: bool = True):
+    if _get_validation_level() != "full":
+        return
+
+    keep = _ragged_interior(z, offsets)
+    dz = np.diff(z, n=1, axis=0)[keep]
+    doffsets = offsets - np.arange(offsets.shape[0])
+    n_diff = np.diff(doffsets)[:, None]
+
+    n_pos = _segment_reduce(np.add, (dz > 0).astype(int), doffsets)
+    n_neg = _segment_reduce(np.add, (dz < 0).astype(int), doffsets)
+
+    if strict:
+        if not np.all((n_pos == n_diff) | (n_neg == n_diff)):
+            raise ValueError(
+                "`z` must be strictly monotonic along the interpolation axis."
+            )
+    elif np.any((n_pos == 0) & (n_neg == 0)):
+        raise ValueError("`z` must not be constant along the interpolation axis.")
+
+
+def _ragged_forward_diff(
+    z: np.ndarray, a: np.ndarray, offsets: np.ndarray, order: int = 1
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Calculate forward finite differences of ragged interpolation points.
+
+    The differences of all samples are computed at once on the concatenated arrays, and the differences across the boundaries of adjacent samples are dropped, so that each order stays in the ragged layout with one fewer value per sample.
+
+    Parameters
+    ----------
+    z : np.ndarray, (n_values, n_attributes) or (n_values, 1)
+        concatenated latent values
+    a : np.ndarray, (n_values, n_attributes)
+        concatenated attributes
+    offsets : np.ndarray, (n_samples + 1,)
+        start of each sample in the concatenated arrays, followed by `n_values`
+    order : int, optional
+        highest order of difference, by default 1
+
+    Returns
+    -------
+    List[Tuple[np.ndarray, np.ndarray]]
+        finite differences of each order, from 1 to `order`, with their offsets
+    """
+    rets = []
+
+    for _ in range(order):
+        keep = _ragged_interior(a, offsets)
+
+        da = np.diff(a, n=1, axis=0)[keep]
+        dz = np.diff(z, n=1, axis=0)[keep]
+
+        a = da / dz
+        z = 0.5 * (z[:-1] + z[1:])[keep]
+        offsets = offsets - np.arange(offsets.shape[0])
+
+        rets.append((a, offsets))
+
+    return rets
+
+
+def _segment_reduce(ufunc: np.ufunc, x: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    # segments must be non-empty, `reduceat` returns the next element for empty ones
+    return ufunc.reduceat(x, offsets[:-1], axis=0)
+
+
+def _segment_lehmer_mean(x: np.ndarray, offsets: np.ndarray, p: float) -> np.ndarray:
+
+    if p == 1.0:
+        den = np.ones_like(x)
+    else:
+        den = np.power(x, p - 1.0)
+    num = x * den
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = _segment_reduce(np.add, num, offsets) / _segment_reduce(
+            np.add, den, offsets
+        )
+
+    # catch constant segments, particularly all-zero segments
+    xmax = _segment_reduce(np.maximum, x, offsets)
+    const = xmax == _segment_reduce(np.minimum, x, offsets)
+    out[const] = xmax[const]
+    return out
+
+
+def _segment_quantiles(
+    x: np.ndarray, offsets: np.ndarray, qs: List[float]
+) -> np.ndarray:
+    """
+    Compute several quantiles of each segment of a ragged array.
+
+    The values are sorted within each segment with two stable sorts, and the quantiles are linearly interpolated between ranks, as in the default method of `np.quantile`.
+
+    Parameters
+    ----------
+    x : np.ndarray, (n_values, n_attributes)
+        concatenated values
+    offsets : np.ndarray, (n_samples + 1,)
+        start of each segment, followed by `n_values`
+    qs : List[float]
+        quantiles to compute, each in [0.0, 1.0]
+
+    Returns
+    -------
+    np.ndarray, (len(qs), n_samples, n_attributes)
+        quantiles of each segment. Segments containing NaN have NaN quantiles.
+    """
+
+    sizes = np.diff(offsets)
+    seg = np.repeat(np.arange(sizes.shape[0]), sizes)
+
+    order = np.argsort(x, axis=0, kind="stable")
+    order = np.take_along_axis(
+        order, np.argsort(seg[order], axis=0, kind="stable"), axis=0
+    )
+    xs = np.take_along_axis(x, order, axis=0)
+
+    pos = np.asarray(qs, dtype=float)[:, None] * (sizes - 1)
+    lo = np.floor(pos).astype(int)
+    hi = np.minimum(lo + 1, sizes - 1)
+    frac = (pos - lo)[..., None]
+
+    xlo = xs[offsets[:-1] + lo]
+    xhi = xs[offsets[:-1] + hi]
+    out = xlo + frac * (xhi - xlo)
+
+    isnan = _segment_reduce(np.add, np.isnan(x).astype(int), offsets) > 0
+    if np.any(isnan):
+        out[:, isnan] = np.nan
+
+    return out
+
+
+def _reduce_samples(
+    values: np.ndarray, reduce_mode: str, nanmean: bool = False
+) -> np.ndarray:
+
+    # the sample axis is -2 and the attribute axis is -1
+    meanfunc = np.nanmean if nanmean else np.mean
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        if reduce_mode == "attribute":
+            return meanfunc(values, axis=-2)
+        elif reduce_mode == "sample":
+            return meanfunc(values, axis=-1)
+        elif reduce_mode == "all":
+            return meanfunc(values, axis=(-2, -1))
+        else:
+            return values
+
+
+def _accumulate_samples(
+    sums: np.ndarray,
+    counts: np.ndarray,
+    values: List[np.ndarray],
+    batch: np.ndarray,
+    reduce_mode: str,
+    nanmean: bool = False,
+) -> Tuple[np.ndarray, np.ndarray, List[np.ndarray]]:
+    """
+    Accumulate the per-sample metric values of a batch into a running reduction.
+
+    If `reduce_mode` is "attribute" or "all", only the per-attribute sums and counts of the values are kept. Otherwise, the per-sample values are kept.
+
+    Parameters
+    ----------
+    sums : np.ndarray
+        running per-attribute sums, or a scalar zero before the first batch
+    counts : np.ndarray
+        running per-attribute counts, or a scalar zero before the first batch
+    values : List[np.ndarray]
+        per-sample values of the previous batches
+    batch : np.ndarray, (..., n_samples, n_attributes)
+        per-sample values of the batch
+    reduce_mode : str
+        reduction mode of the metric
+    nanmean : bool, optional
+        whether NaN values are ignored, by default False
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray, List[np.ndarray]]
+        The updated sums, counts and per-sample values. The inputs are not modified.
+    """
+
+    if reduce_mode in ["sample", "none"]:
+        return sums, counts, values + [batch]
+
+    if nanmean:
+        return (
+            sums + np.nansum(batch, axis=-2),
+            counts + np.sum(~np.isnan(batch), axis=-2),
+            values,
+        )
+
+    return (
+        sums + np.sum(batch, axis=-2),
+        counts + np.full(batch.shape[:-2] + batch.shape[-1:], batch.shape[-2]),
+        values,
+    )
+
+
+def _reduce_accumulated(
+    sums: np.ndarray, counts: np.ndarray, reduce_mode: str
+) -> np.ndarray:
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if reduce_mode == "attribute":
+            return sums / counts
+        elif reduce_mode == "all":
+            return np.sum(sums, axis=-1) / np.sum(counts, axis=-1)
+        else:
+            raise NotImplementedError
+
+
+def _update_worst_samples(
+    scores: np.ndarray,
+    indices: np.ndarray,
+    batch: np.ndarray,
+    offset: int,
+    k: int,
+    absolute: bool = False,
+    exclude: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Merge the per-sample metric values of a batch into the running `k` worst samples of each attribute.
+
+    Parameters
+    ----------
+    scores : np.ndarray, (..., k, n_attributes)
+        metric values of the current worst samples, sorted from the worst. Empty before the first batch.
+    indices : np.ndarray, (..., k, n_attributes)
+        indices of the current worst samples
+    batch : np.ndarray, (..., n_samples, n_attributes)
+        per-sample metric values of the batch
+    offset : int
+        index of the first sample of the batch
+    k : int
+        number of worst samples to keep
+    absolute : bool, optional
+        whether the worst samples are those with the smallest absolute values rather than the smallest values, by default False
+    exclude : Optional[np.ndarray], (..., n_samples, n_attributes), optional
+        boolean mask of the samples of the batch that must never be considered worse than a number, by default None. Their scores are replaced by NaN.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        The updated scores and indices, of shape `(..., min(k, n_seen), n_attributes)` and sorted from the worst. NaN values are never considered worse than a number. The inputs are not modified.
+    """
+
+    if exclude is not None:
+        batch = np.where(exclude, np.nan, batch)
+
+    batch_indices = np.broadcast_to(
+        offset + np.arange(batch.shape[-2])[:, None], batch.shape
+    )
+
+    if scores.ndim == batch.ndim:
+        scores = np.concatenate([scores, batch], axis=-2)
+        indices = np.concatenate([indices, batch_indices], axis=-2)
+    else:
+        scores = batch
+        indices = batch_indices
+
+    key = np.abs(scores) if absolute else scores
+    key = np.where(np.isnan(key), np.inf, key)
+
+    if key.shape[-2] > k:
+        part = np.argpartition(key, k - 1, axis=-2)[..., :k, :]
+        scores = np.take_along_axis(scores, part, axis=-2)
+        indices = np.take_along_axis(indices, part, axis=-2)
+        key = np.take_along_axis(key, part, axis=-2)
+
+    order = np.argsort(key, axis=-2, kind="stable")
+
+    return (
+        np.take_along_axis(scores, order, axis=-2),
+        np.take_along_axis(indices, order, axis=-2),
+    )
@@ -1,9 +1,10 @@
 from ctypes import cast
 import warnings
-from typing import Any, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 
+from .._utils import _sort_by_group
 from . import _utils
 
 
@@ -20,13 +21,109 @@ def _validate_monotonicity_args(
         )
 
 
-def _get_monotonicity_from_liad(
+def _get_sample_monotonicity_curve_from_liad(
     liad1: np.ndarray,
-    reduce_mode: str = "attribute",
-    liad_thresh: float = 1e-3,
+    liad_thresh: np.ndarray,
     degenerate_val: float = np.nan,
-    nanmean: bool = True,
-) -> np.ndarray:
+    return_degenerate: bool = False,
+) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Calculate monotonicity for an array of LIAD thresholds in a single pass.
+
+    Each LIAD is assigned to the bucket of thresholds below its absolute value with a binary search over the sorted thresholds. The per-bucket nonzero and sign counts of each (sample, attribute) are then accumulated from the largest threshold down, so that the counts above every threshold are obtained at once, in O(n log T + T) per (sample, attribute) instead of O(nT).
+
+    Parameters
+    ----------
+    liad1 : np.ndarray, (..., n_samples, n_attributes, n_liad)
+        first-order LIAD
+    liad_thresh : np.ndarray, (n_thresholds,)
+        thresholds for ignoring noisy LIAD, in any order
+    degenerate_val : float, optional
+        fill value for samples with all noisy LIAD, by default np.nan
+    return_degenerate : bool, optional
+        whether to also return which samples have all noisy LIAD, by default False
+
+    Returns
+    -------
+    Union[np.ndarray, Tuple[np.ndarray, np.ndarray]], (n_thresholds, ..., n_samples, n_attributes)
+        monotonicity for each threshold. If `return_degenerate` is True, a tuple of the monotonicity and a boolean mask of the degenerate samples, of the same shape, is returned instead.
+    """
+
+    batch_shape = liad1.shape[:-1]
+    liad1 = liad1.reshape(-1, liad1.shape[-1])
+    n_rows = liad1.shape[0]
+
+    rows = np.broadcast_to(np.arange(n_rows)[:, None], liad1.shape)
+    mntc, degenerate = _get_monotonicity_curve_from_rows(
+        liad1.ravel(), rows.ravel(), n_rows, liad_thresh, degenerate_val
+    )
+
+    shape = (np.size(liad_thresh),) + batch_shape
+    mntc = np.moveaxis(mntc, -1, 0).reshape(shape)
+
+    if return_degenerate:
+        return mntc, np.moveaxis(degenerate, -1, 0).reshape(shape)
+
+    return mntc
+
+
+def _get_monotonicity_curve_from_rows(
+    liad1: np.ndarray,
+    rows: np.ndarray,
+    n_rows: int,
+    liad_thresh: np.ndarray,
+    degenerate_val: float = np.nan,
+) -> Tuple[np.ndarray, np.ndarray]:
+    # `liad1` is flat, and `rows` holds the (sample, attribute) row of each LIAD
+    # returns the monotonicity and the degenerate mask, both of shape (n_rows, n_thresh)
+    liad_thresh = np.asarray(liad_thresh, dtype=float)
+    assert liad_thresh.ndim == 1, "`liad_thresh` must be a scalar or a 1D array"
+
+    order = np.argsort(liad_thresh)
+    n_thresh = liad_thresh.shape[0]
+
+    # number of thresholds strictly below the absolute value of each LIAD
+    bucket = np.searchsorted(liad_thresh[order], np.abs(liad1), side="left")
+    idx = rows * (n_thresh + 1) + bucket
+
+    def _counts_above(weights):
+        hist = np.bincount(
+            idx, weights=weights, minlength=n_rows * (n_thresh + 1)
+        ).reshape(n_rows, n_thresh + 1)
+        # a LIAD is above the k-th sorted threshold iff its bucket is above k
+        return np.cumsum(hist[:, ::-1], axis=-1)[:, ::-1][:, 1:]
+
+    nz = _counts_above((liad1 != 0).astype(float))
+    ssgn = _counts_above(np.sign(liad1))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        curve = ssgn / nz
+    curve[nz == 0] = degenerate_val
+
+    mntc = np.empty_like(curve)
+    mntc[:, order] = curve
+
+    degenerate = np.empty_like(nz, dtype=bool)
+    degenerate[:, order] = nz == 0
+
+    return mntc, degenerate
+
+
+def _get_sample_monotonicity_from_liad(
+    liad1: np.ndarray,
+    liad_thresh: Union[float, np.ndarray] = 1e-3,
+    degenerate_val: float = np.nan,
+    return_degenerate: bool = False,
+) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+    # if `return_degenerate` is True, the mask of samples with all noisy LIAD is also returned
+    if np.ndim(liad_thresh) > 0:
+        return _get_sample_monotonicity_curve_from_liad(
+            liad1,
+            liad_thresh=liad_thresh,
+            degenerate_val=degenerate_val,
+            return_degenerate=return_degenerate,
+        )
+
     liad1 = liad1 * (np.abs(liad1) > liad_thresh)
 
     sgn = np.sign(liad1)
@@ -37,30 +134,128 @@ def _get_monotonicity_from_liad(
         mntc = ssgn / nz
     mntc[nz == 0] = degenerate_val
 
-    meanfunc = np.nanmean if nanmean else np.mean
+    if return_degenerate:
+        return mntc, nz == 0
 
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore", RuntimeWarning)
-        if reduce_mode == "attribute":
-            return meanfunc(mntc, axis=0)
-        elif reduce_mode == "sample":
-            return meanfunc(mntc, axis=-1)
-        elif reduce_mode == "all":
-            return meanfunc(mntc)
-        else:
-            return mntc
+    return mntc
 
 
-def monotonicity(
+def _get_sample_monotonicity(
+    z: np.ndarray,
+    a: np.ndarray,
+    reg_dim: Optional[List[int]] = None,
+    liad_mode: str = "forward",
+    liad_thresh: Union[float, np.ndarray] = 1e-3,
+    degenerate_val: float = np.nan,
+    model_axis: bool = False,
+    pool: Optional[_utils._LiadBufferPool] = None,
+    return_degenerate: bool = False,
+) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+
+    # central differences are only defined at the interior interpolation points
+    min_size = 3 if liad_mode == "central" else 2
+
+    z, a = _utils._validate_za_shape(
+        z, a, reg_dim=reg_dim, min_size=min_size, model_axis=model_axis
+    )
+    _utils._validate_non_constant_interp(z)
+
+    out = pool.get(z, a, order=1, mode=liad_mode) if pool is not None else None
+    liad1, _ = _utils._liad(
+        z, a, order=1, mode=liad_mode, return_list=False, return_z=False, out=out
+    )
+    liad1 = np.asarray(liad1)  # make type checker happy
+
+    return _get_sample_monotonicity_from_liad(
+        liad1=liad1,
+        liad_thresh=liad_thresh,
+        degenerate_val=degenerate_val,
+        return_degenerate=return_degenerate,
+    )
+
+
+def _get_sample_monotonicity_from_ragged_liad(
+    liad1: np.ndarray,
+    offsets1: np.ndarray,
+    liad_thresh: Union[float, np.ndarray] = 1e-3,
+    degenerate_val: float = np.nan,
+) -> np.ndarray:
+    n_samples = offsets1.shape[0] - 1
+    n_attr = liad1.shape[-1]
+
+    if np.ndim(liad_thresh) > 0:
+        # each (sample, attribute) pair is a row of the flattened LIAD
+        seg = np.repeat(np.arange(n_samples), np.diff(offsets1))
+        rows = seg[:, None] * n_attr + np.arange(n_attr)
+        mntc, _ = _get_monotonicity_curve_from_rows(
+            liad1.ravel(), rows.ravel(), n_samples * n_attr, liad_thresh, degenerate_val
+        )
+        return np.moveaxis(mntc, -1, 0).reshape(-1, n_samples, n_attr)
+
+    liad1 = liad1 * (np.abs(liad1) > liad_thresh)
+
+    sgn = np.sign(liad1)
+    nz = _utils._segment_reduce(np.add, (sgn != 0).astype(int), offsets1)
+    ssgn = _utils._segment_reduce(np.add, sgn, offsets1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mntc = ssgn / nz
+    mntc[nz == 0] = degenerate_val
+
+    return mntc
+
+
+def _get_sample_monotonicity_ragged(
     z: np.ndarray,
     a: np.ndarray,
+    offsets: np.ndarray,
     reg_dim: Optional[List[int]] = None,
     liad_mode: str = "forward",
+    liad_thresh: Union[float, np.ndarray] = 1e-3,
+    degenerate_val: float = np.nan,
+) -> np.ndarray:
+    assert liad_mode == "forward", "ragged inputs only support `liad_mode='forward'`"
+
+    z, a, offsets = _utils._validate_ragged_za_shape(
+        z, a, offsets, reg_dim=reg_dim, min_size=2
+    )
+    _utils._validate_ragged_interp(z, offsets, strict=False)
+
+    ((liad1, offsets1),) = _utils._ragged_forward_diff(z, a, offsets, order=1)
+
+    return _get_sample_monotonicity_from_ragged_liad(
+        liad1, offsets1, liad_thresh=liad_thresh, degenerate_val=degenerate_val
+    )
+
+
+def _get_monotonicity_from_liad(
+    liad1: np.ndarray,
     reduce_mode: str = "attribute",
-    liad_thresh: float = 1e-3,
+    liad_thresh: Union[float, np.ndarray] = 1e-3,
     degenerate_val: float = np.nan,
     nanmean: bool = True,
 ) -> np.ndarray:
+    mntc = _get_sample_monotonicity_from_liad(
+        liad1=liad1, liad_thresh=liad_thresh, degenerate_val=degenerate_val
+    )
+
+    return _utils._reduce_samples(mntc, reduce_mode, nanmean=nanmean)
+
+
+def monotonicity(
+    z: np.ndarray,
+    a: np.ndarray,
+    reg_dim: Optional[List[int]] = None,
+    liad_mode: str = "forward",
+    reduce_mode: str = "attribute",
+    liad_thresh: Union[float, np.ndarray] = 1e-3,
+    degenerate_val: float = np.nan,
+    nanmean: bool = True,
+    groups: Optional[np.ndarray] = None,
+    chunk_size: Optional[int] = None,
+    model_axis: bool = False,
+    offsets: Optional[np.ndarray] = None,
+) -> Union[np.ndarray, Dict[Any, np.ndarray]]:
     """
     Calculate latent monotonicity.
 
@@ -79,28 +274,37 @@ def monotonicity(
     
     Parameters
     ----------
-    z : np.ndarray, (n_samples, n_interp) or (n_samples, n_features or n_attributes, n_interp)
-        a batch of latent vectors
+    z : np.ndarray, (n_samples, n_interp), (n_samples, n_features or n_attributes, n_interp), (n_interp,), or (n_features or n_attributes, n_interp)
+        a batch of latent vectors, or interpolation points shared by all samples. A 1D `z` is shared by all samples and attributes. A 2D `z` is shared by all samples if `a` is 3D, unless `a` has a single attribute and `z` has one row per sample.
     a : np.ndarray, (n_samples, n_interp) or (n_samples, n_attributes, n_interp)
         a batch of attribute(s)
     reg_dim : Optional[List], optional
         regularized dimensions, by default None
         Attribute `a[:, i]` is regularized by `z[:, reg_dim[i]]`. If `None`, `a[:, i]` is assumed to be regularized by `z[:, i]`.
     liad_mode : str, optional
-        options for calculating LIAD, by default "forward". Only "forward" is currently supported.
+        options for calculating LIAD, by default "forward". Must be one of {"forward", "central", "spline"}. If "forward", forward differences are used. If "central", second-order accurate central differences at the interior interpolation points are used. If "spline", the derivatives of the natural cubic spline through the interpolation points are used.
     reduce_mode : str, optional
         options for reduction of the return array, by default "attribute". Must be one of {"attribute", "samples", "all", "none"}. If "all", returns a scalar. If "attribute", an average is taken along the sample axis and the return array is of shape `(n_attributes,)`. If "samples", an average is taken along the attribute axis and the return array is of shape `(n_samples,)`. If "none", returns a smoothness matrix of shape `(n_samples, n_attributes,)`.
-    liad_thresh : float, optional
-        threshold for ignoring noisy 1st order LIAD, by default 1e-3
+    liad_thresh : Union[float, np.ndarray], optional
+        threshold for ignoring noisy 1st order LIAD, by default 1e-3. If a 1D array of thresholds is provided, a monotonicity curve is computed in a single pass over the LIADs, and the return array has an additional leading axis of size `n_thresholds`.
     degenerate_val : float, optional
         fill value for samples with all noisy LIAD (i.e., absolute value below `liad_thresh`), by default np.nan. Another possible option is to set this to 0.0.
     nanmean : bool, optional
         whether to ignore the NaN values in calculating the return array, by default True. Ignored if `reduce_mode` is "none". If all LIAD in an axis are NaNs, the return array in that axis is filled with NaNs.
+    groups : Optional[np.ndarray], (n_samples,), optional
+        group id of each sample, by default None. If provided, the metric is evaluated separately on each group of samples. The LIADs are computed only once for all groups.
+    chunk_size : Optional[int], optional
+        number of samples to process at a time, by default None. If provided, `z` and `a` can be any arrays supporting slicing along the sample axis, such as `np.memmap`, and only one chunk of them is loaded into memory at a time. If None, all samples are processed at once.
+    model_axis : bool, optional
+        whether `z` and `a` have a leading model axis, by default False. If True, `z` and `a` are of shape `(n_models, ...)`, where `...` is one of the shapes above, and all models are evaluated at once. The return array(s) then have an additional leading axis of size `n_models`.
+    offsets : Optional[np.ndarray], (n_samples + 1,), optional
+        start of each sample in `z` and `a`, followed by their length, by default None. If provided, `z` and `a` are ragged: the interpolation points of all samples, whose number may differ between samples, are concatenated along the first axis without padding, and sample `i` spans `z[offsets[i]:offsets[i + 1]]` and `a[offsets[i]:offsets[i + 1]]`. `z` is then of shape `(n_values,)` or `(n_values, n_features or n_attributes)` and `a` of shape `(n_values,)` or `(n_values, n_attributes)`. The per-sample results are obtained with segment reductions over the concatenated LIADs. Only `liad_mode="forward"` is supported, and `chunk_size` and `model_axis` cannot be used.
 
     Returns
     -------
     np.ndarray
-        monotonicity array. See `reduce mode` for return shape.
+        monotonicity array. See `reduce mode` for return shape. If `liad_thresh` is an array, the return array has an additional leading axis of size `n_thresholds`.
+        If `groups` is provided, a dictionary mapping each group id to the above is returned instead.
 
     References
     ----------
@@ -114,16 +318,41 @@ def monotonicity(
         nanmean=nanmean,
     )
 
-    z, a = _utils._validate_za_shape(z, a, reg_dim=reg_dim, min_size=2)
-    _utils._validate_non_constant_interp(z)
+    if offsets is not None:
+        assert (
+            chunk_size is None and not model_axis
+        ), "`chunk_size` and `model_axis` cannot be used with ragged inputs"
+        mntc = _get_sample_monotonicity_ragged(
+            z,
+            a,
+            offsets,
+            reg_dim=reg_dim,
+            liad_mode=liad_mode,
+            liad_thresh=liad_thresh,
+            degenerate_val=degenerate_val,
+        )
+    else:
+        mntc = _utils._apply_chunked(
+            _get_sample_monotonicity,
+            z,
+            a,
+            chunk_size=chunk_size,
+            model_axis=model_axis,
+            reg_dim=reg_dim,
+            liad_mode=liad_mode,
+            liad_thresh=liad_thresh,
+            degenerate_val=degenerate_val,
+            pool=_utils._LiadBufferPool(),
+        )
 
-    liad1, _ = _utils._liad(z, a, order=1, mode=liad_mode, return_list=False)
-    liad1 = np.array(liad1)  # make type checker happy
+    if groups is not None:
+        # the sample axis is moved to the front for grouping
+        keys, slices, (mntc,) = _sort_by_group(groups, np.moveaxis(mntc, -2, 0))
+        return {
+            key: _utils._reduce_samples(
+                np.moveaxis(mntc[sl], 0, -2), reduce_mode, nanmean=nanmean
+            )
+            for key, sl in zip(keys, slices)
+        }
 
-    return _get_monotonicity_from_liad(
-        liad1=liad1,
-        reduce_mode=reduce_mode,
-        liad_thresh=liad_thresh,
-        degenerate_val=degenerate_val,
-        nanmean=nanmean,
-    )
+    return _utils._reduce_samples(mntc, reduce_mode, nanmean=nanmean)
@@ -0,0 +1,165 @@
+from typing import List, Union
+
+import numpy as np
+
+from ._utils import _partition_quantiles
+
+
+class QuantileSketch:
+    """
+    Bounded-memory streaming quantile sketch along the last axis of an array.
+
+    The sketch follows the compactor hierarchy of KLL sketches. Values are appended to the level-0 buffer. When the buffer of a level holds more than `k` values, they are sorted and every other value is promoted to the next level, where it stands for twice as many input values. The offset of the promoted values alternates between compactions of the same level, so that the rank errors of successive compactions cancel out. Each level holds at most `k` values, so the memory grows only logarithmically with the number of streamed values.
+
+    All slices of the leading axes receive the same number of values, so the sketch of every slice is kept in the same arrays. The quantiles are exact, and identical to the default method of `np.quantile`, as long as no compaction has happened, i.e. while at most `k` values have been streamed.
+
+    Parameters
+    ----------
+    k : int, optional
+        capacity of each level, by default 256. Must be even and at least 2. Larger values give more accurate quantiles at the cost of more memory.
+
+    Examples
+    --------
+    >>> sketch = QuantileSketch()
+    >>> for zc, ac in chunks_along_interp_axis:
+    ...     liad1 = np.diff(ac, axis=-1) / np.diff(zc, axis=-1)
+    ...     sketch.update(liad1)
+    >>> sketch.ptp(0.9)
+    """
+
+    def __init__(self, k: int = 256):
+        assert k >= 2 and k % 2 == 0, "`k` must be an even integer of at least 2"
+
+        self.k = k
+        self.n_seen = 0
+        self._levels: List[np.ndarray] = []
+        self._offsets: List[int] = []
+
+    def update(self, x: np.ndarray):
+        """
+        Stream new values into the sketch.
+
+        Parameters
+        ----------
+        x : np.ndarray, (..., n)
+            new values along the last axis. The leading axes must be the same for all updates.
+        """
+        x = np.asarray(x, dtype=float)
+
+        if len(self._levels) == 0:
+            self._levels.append(x[..., :0])
+            self._offsets.append(0)
+            self._isnan = np.zeros(x.shape[:-1], dtype=bool)
+
+        assert (
+            x.shape[:-1] == self._levels[0].shape[:-1]
+        ), "the leading axes of `x` must be the same for all updates"
+
+        self._levels[0] = np.concatenate([self._levels[0], x], axis=-1)
+        self.n_seen += x.shape[-1]
+
+        # NaN may be dropped by compactions, so it is tracked separately
+        self._isnan = self._isnan | np.isnan(x).any(axis=-1)
+
+        self._compact()
+
+    def _compact(self):
+        level = 0
+        while level < len(self._levels):
+            buf = self._levels[level]
+            if buf.shape[-1] <= self.k:
+                level += 1
+                continue
+
+            # compact an even number of values and keep the leftover one at this level
+            n_even = buf.shape[-1] - buf.shape[-1] % 2
+            buf = np.sort(buf, axis=-1)
+            promoted = buf[..., self._offsets[level] : n_even : 2]
+            self._levels[level] = buf[..., n_even:]
+            self._offsets[level] = 1 - self._offsets[level]
+
+            if level + 1 == len(self._levels):
+                self._levels.append(promoted[..., :0])
+                self._offsets.append(0)
+            self._levels[level + 1] = np.concatenate(
+                [self._levels[level + 1], promoted], axis=-1
+            )
+            level += 1
+
+    def quantile(self, q: Union[float, List[float]]) -> np.ndarray:
+        """
+        Estimate quantiles of the streamed values.
+
+        Parameters
+        ----------
+        q : Union[float, List[float]]
+            quantile or list of quantiles, each in [0.0, 1.0]
+
+        Returns
+        -------
+        np.ndarray, (...) or (len(q), ...)
+            estimated quantiles of each slice of the leading axes. Slices containing NaN have NaN quantiles.
+        """
+        assert self.n_seen > 0, "no values have been streamed into the sketch"
+
+        qs = np.atleast_1d(np.asarray(q, dtype=float))
+
+        if len(self._levels) == 1:
+            out = _partition_quantiles(self._levels[0], qs)
+        else:
+            out = self._weighted_quantiles(qs)
+
+        if np.any(self._isnan):
+            out[:, self._isnan] = np.nan
+
+        return out if np.ndim(q) > 0 else out[0]
+
+    def _weighted_quantiles(self, qs: np.ndarray) -> np.ndarray:
+        values = np.concatenate(self._levels, axis=-1)
+        weights = np.concatenate(
+            [
+                np.full(buf.shape[-1], 2 ** level, dtype=np.int64)
+                for level, buf in enumerate(self._levels)
+            ]
+        )
+
+        order = np.argsort(values, axis=-1)
+        values = np.take_along_axis(values, order, axis=-1)
+        # exclusive upper bound of the ranks represented by each value
+        cumw = np.cumsum(weights[order], axis=-1)
+        total = cumw[..., -1:]
+
+        out = []
+        for q in qs:
+            pos = q * (total - 1)
+            lo = np.floor(pos)
+            hi = np.minimum(lo + 1, total - 1)
+
+            ilo = np.sum(cumw <= lo, axis=-1, keepdims=True)
+            ihi = np.sum(cumw <= hi, axis=-1, keepdims=True)
+            xlo = np.take_along_axis(values, ilo, axis=-1)
+            xhi = np.take_along_axis(values, ihi, axis=-1)
+
+            out.append((xlo + (pos - lo) * (xhi - xlo))[..., 0])
+
+        return np.stack(out, axis=0)
+
+    def ptp(self, ptp_mode: float) -> np.ndarray:
+        """
+        Estimate the robust range of the streamed values, as used by smoothness with a float `ptp_mode`.
+
+        Parameters
+        ----------
+        ptp_mode : float
+            the range is taken between quantile `0.5-0.5*ptp_mode` and quantile `0.5+0.5*ptp_mode`. Must be in (0.0, 1.0].
+
+        Returns
+        -------
+        np.ndarray, (...)
+            estimated robust range of each slice of the leading axes
+        """
+        if not (0.0 < ptp_mode <= 1.0):
+            raise ValueError("`ptp_mode` must be in (0.0, 1.0].")
+
+        qlo, qhi = self.quantile([0.5 - 0.5 * ptp_mode, 0.5 + 0.5 * ptp_mode])
+        return qhi - qlo
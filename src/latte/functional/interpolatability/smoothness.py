@@ -1,7 +1,8 @@
-from typing import List, Optional, Tuple, Union, cast
+from typing import Any, Dict, List, Optional, Tuple, Union, cast
 
 import numpy as np
 
+from .._utils import _sort_by_group
 from . import _utils
 
 
@@ -28,14 +29,89 @@ def _validate_smoothness_args(
 
 
 def _get_2nd_order_liad(
-    z: np.ndarray, a: np.ndarray, liad_mode: str
+    z: np.ndarray,
+    a: np.ndarray,
+    liad_mode: str,
+    out: Optional[List[np.ndarray]] = None,
 ) -> List[Tuple[np.ndarray, np.ndarray]]:
+    # the midpoints of the interpolation points are not needed by any caller
     return cast(
         List[Tuple[np.ndarray, np.ndarray]],
-        _utils._liad(z, a, order=2, mode=liad_mode, return_list=True),
+        _utils._liad(
+            z,
+            a,
+            order=2,
+            mode=liad_mode,
+            return_list=True,
+            return_z=False,
+            out=out,
+        ),
     )
 
 
+def _get_smoothness_numerator(
+    liad2abs: np.ndarray, max_mode: str = "lehmer", p: float = 2.0
+) -> np.ndarray:
+    if max_mode == "naive":
+        return np.max(liad2abs, axis=-1)
+    elif max_mode == "lehmer":
+        return _utils._lehmer_mean(liad2abs, p=p)
+    else:
+        raise NotImplementedError
+
+
+def _get_smoothness_denominator(
+    liad1: np.ndarray, z_interval: np.ndarray, ptp_mode: Union[float, str] = "naive"
+) -> np.ndarray:
+    if ptp_mode == "naive":
+        den = np.ptp(liad1, axis=-1)
+    elif isinstance(ptp_mode, float):
+        qlo, qhi = _utils._partition_quantiles(
+            liad1, [0.5 - 0.5 * ptp_mode, 0.5 + 0.5 * ptp_mode]
+        )
+        den = qhi - qlo
+    else:
+        raise NotImplementedError
+
+    return den / z_interval
+
+
+def _get_sample_smoothness_from_ratio(
+    num: np.ndarray, den: np.ndarray, clamp: bool = False
+) -> Tuple[np.ndarray, np.ndarray]:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        smth = 1.0 - num / den
+
+    if clamp:
+        smth = np.clip(smth, 0.0, 1.0)
+
+    # the smoothness of an attribute without any curvature in all samples is set to 1.0 during the reduction
+    return smth, num == 0
+
+
+def _get_sample_smoothness_from_liads(
+    liad1: np.ndarray,
+    liad2: np.ndarray,
+    z_interval: np.ndarray,
+    max_mode: str = "lehmer",
+    ptp_mode: Union[float, str] = "naive",
+    clamp: bool = False,
+    p: float = 2.0,
+) -> Tuple[np.ndarray, np.ndarray]:
+    num = _get_smoothness_numerator(np.abs(liad2), max_mode=max_mode, p=p)
+    den = _get_smoothness_denominator(liad1, z_interval, ptp_mode=ptp_mode)
+
+    return _get_sample_smoothness_from_ratio(num, den, clamp=clamp)
+
+
+def _reduce_smoothness(
+    smth: np.ndarray, flat: np.ndarray, reduce_mode: str = "attribute"
+) -> np.ndarray:
+    smth = np.where(np.all(flat, axis=-2, keepdims=True), 1.0, smth)
+
+    return _utils._reduce_samples(smth, reduce_mode)
+
+
 def _get_smoothness_from_liads(
     liad1: np.ndarray,
     liad2: np.ndarray,
@@ -46,40 +122,142 @@ def _get_smoothness_from_liads(
     clamp: bool = False,
     p: float = 2.0,
 ) -> np.ndarray:
+    smth, flat = _get_sample_smoothness_from_liads(
+        liad1=liad1,
+        liad2=liad2,
+        z_interval=z_interval,
+        max_mode=max_mode,
+        ptp_mode=ptp_mode,
+        clamp=clamp,
+        p=p,
+    )
+
+    return _reduce_smoothness(smth, flat, reduce_mode)
+
+
+def _get_sample_smoothness(
+    z: np.ndarray,
+    a: np.ndarray,
+    reg_dim: Optional[List[int]] = None,
+    liad_mode: str = "forward",
+    max_mode: str = "lehmer",
+    ptp_mode: Union[float, str] = "naive",
+    clamp: bool = False,
+    p: float = 2.0,
+    model_axis: bool = False,
+    pool: Optional[_utils._LiadBufferPool] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+
+    z, a = _utils._validate_za_shape(
+        z, a, reg_dim=reg_dim, min_size=3, model_axis=model_axis
+    )
+    _utils._validate_non_constant_interp(z)
+    _utils._validate_monotonic_interp(z)
+
+    out = pool.get(z, a, order=2, mode=liad_mode) if pool is not None else None
+    liads = _get_2nd_order_liad(z, a, liad_mode=liad_mode, out=out)
+
+    liad1, _ = liads[0]
+    liad2, _ = liads[1]
+    # mean spacing of the interpolation points, which may be unequal
+    z_interval = (z[..., -1] - z[..., 0]) / (z.shape[-1] - 1)
+
+    return _get_sample_smoothness_from_liads(
+        liad1=liad1,
+        liad2=liad2,
+        z_interval=z_interval,
+        max_mode=max_mode,
+        ptp_mode=ptp_mode,
+        clamp=clamp,
+        p=p,
+    )
+
+
+def _get_sample_smoothness_from_ragged_liads(
+    liad1: np.ndarray,
+    offsets1: np.ndarray,
+    liad2: np.ndarray,
+    offsets2: np.ndarray,
+    z_interval: np.ndarray,
+    max_mode: str = "lehmer",
+    ptp_mode: Union[float, str] = "naive",
+    clamp: bool = False,
+    p: float = 2.0,
+) -> Tuple[np.ndarray, np.ndarray]:
     liad2abs = np.abs(liad2)
 
     if max_mode == "naive":
-        num = np.max(liad2abs, axis=-1)
+        num = _utils._segment_reduce(np.maximum, liad2abs, offsets2)
     elif max_mode == "lehmer":
-        num = _utils._lehmer_mean(liad2abs, p=p)
+        num = _utils._segment_lehmer_mean(liad2abs, offsets2, p=p)
     else:
         raise NotImplementedError
 
     if ptp_mode == "naive":
-        den = np.ptp(liad1, axis=-1)
+        den = _utils._segment_reduce(
+            np.maximum, liad1, offsets1
+        ) - _utils._segment_reduce(np.minimum, liad1, offsets1)
     elif isinstance(ptp_mode, float):
-        den = np.quantile(liad1, q=0.5 + 0.5 * ptp_mode, axis=-1) - np.quantile(
-            liad1, q=0.5 - 0.5 * ptp_mode, axis=-1
+        qlo, qhi = _utils._segment_quantiles(
+            liad1, offsets1, [0.5 - 0.5 * ptp_mode, 0.5 + 0.5 * ptp_mode]
         )
+        den = qhi - qlo
     else:
         raise NotImplementedError
 
-    den = den / z_interval
-    with np.errstate(divide="ignore", invalid="ignore"):
-        smth = 1.0 - num / den
-    smth[:, np.all(num == 0, axis=0)] = 1.0
+    return _get_sample_smoothness_from_ratio(num, den / z_interval, clamp=clamp)
 
-    if clamp:
-        smth = np.clip(smth, 0.0, 1.0)
 
-    if reduce_mode == "attribute":
-        return np.mean(smth, axis=0)
-    elif reduce_mode == "sample":
-        return np.mean(smth, axis=-1)
-    elif reduce_mode == "all":
-        return np.mean(smth)
-    else:
-        return smth
+def _get_ragged_2nd_order_liad(
+    z: np.ndarray,
+    a: np.ndarray,
+    offsets: np.ndarray,
+    reg_dim: Optional[List[int]] = None,
+    liad_mode: str = "forward",
+) -> Tuple[List[Tuple[np.ndarray, np.ndarray]], np.ndarray]:
+    assert liad_mode == "forward", "ragged inputs only support `liad_mode='forward'`"
+
+    z, a, offsets = _utils._validate_ragged_za_shape(
+        z, a, offsets, reg_dim=reg_dim, min_size=3
+    )
+    _utils._validate_ragged_interp(z, offsets)
+
+    liads = _utils._ragged_forward_diff(z, a, offsets, order=2)
+
+    # mean spacing of the interpolation points of each sample
+    sizes = np.diff(offsets)[:, None]
+    z_interval = (z[offsets[1:] - 1] - z[offsets[:-1]]) / (sizes - 1)
+
+    return liads, z_interval
+
+
+def _get_sample_smoothness_ragged(
+    z: np.ndarray,
+    a: np.ndarray,
+    offsets: np.ndarray,
+    reg_dim: Optional[List[int]] = None,
+    liad_mode: str = "forward",
+    max_mode: str = "lehmer",
+    ptp_mode: Union[float, str] = "naive",
+    clamp: bool = False,
+    p: float = 2.0,
+) -> Tuple[np.ndarray, np.ndarray]:
+
+    ((liad1, offsets1), (liad2, offsets2)), z_interval = _get_ragged_2nd_order_liad(
+        z, a, offsets, reg_dim=reg_dim, liad_mode=liad_mode
+    )
+
+    return _get_sample_smoothness_from_ragged_liads(
+        liad1=liad1,
+        offsets1=offsets1,
+        liad2=liad2,
+        offsets2=offsets2,
+        z_interval=z_interval,
+        max_mode=max_mode,
+        ptp_mode=ptp_mode,
+        clamp=clamp,
+        p=p,
+    )
 
 
 def smoothness(
@@ -92,7 +270,11 @@ def smoothness(
     reduce_mode: str = "attribute",
     clamp: bool = False,
     p: float = 2.0,
-) -> np.ndarray:
+    groups: Optional[np.ndarray] = None,
+    chunk_size: Optional[int] = None,
+    model_axis: bool = False,
+    offsets: Optional[np.ndarray] = None,
+) -> Union[np.ndarray, Dict[Any, np.ndarray]]:
     """
     Calculate latent smoothness.
 
@@ -112,17 +294,19 @@ def smoothness(
     
     .. math:: \mathcal{D}^{(n)}_{i, d}(\mathbf{z}; \delta) =\dfrac{{\mathcal{D}^{(n-1)}_i(\mathbf{z}+\delta \mathbf{e}_d) - \mathcal{D}^{(n-1)}_i(\mathbf{z})}}{\delta}.
 
+    The interpolation points need not be equally spaced, as long as they are strictly monotonic. With unequal spacing, the LIADs are computed as non-uniform divided differences, and :math:`\delta` in the normalization of smoothness is taken to be the mean spacing of the interpolation points.
+
     Parameters
     ----------
-    z : np.ndarray, (n_samples, n_interp) or (n_samples, n_features or n_attributes, n_interp)
-        a batch of latent vectors
+    z : np.ndarray, (n_samples, n_interp), (n_samples, n_features or n_attributes, n_interp), (n_interp,), or (n_features or n_attributes, n_interp)
+        a batch of latent vectors, or interpolation points shared by all samples. A 1D `z` is shared by all samples and attributes. A 2D `z` is shared by all samples if `a` is 3D, unless `a` has a single attribute and `z` has one row per sample.
     a : np.ndarray, (n_samples, n_interp) or (n_samples, n_attributes, n_interp)
         a batch of attribute(s)
     reg_dim : Optional[List], optional
         regularized dimensions, by default None
         Attribute `a[:, i]` is regularized by `z[:, reg_dim[i]]`. If `None`, `a[:, i]` is assumed to be regularized by `z[:, i]`.
     liad_mode : str, optional
-        options for calculating LIAD, by default "forward". Only "forward" is currently supported.
+        options for calculating LIAD, by default "forward". Must be one of {"forward", "central", "spline"}. If "forward", forward differences are used. If "central", second-order accurate central differences at the interior interpolation points are used. If "spline", the derivatives of the natural cubic spline through the interpolation points are used.
     max_mode : str, optional
         options for calculating array maximum of 2nd order LIAD, by default "lehmer". Must be one of {"lehmer", "naive"}. If "lehmer", the maximum is calculated using the Lehmer mean with power `p`. If "naive", the maximum is calculated using the naive array maximum.
     ptp_mode : str, optional
@@ -133,11 +317,20 @@ def smoothness(
         Whether to clamp smoothness to [0, 1], by default False
     p : float, optional
         Lehmer mean power, by default 2.0 (i.e., contraharmonic mean). Only used if `max_mode == "lehmer"`. Must be greater than 1.0. 
+    groups : Optional[np.ndarray], (n_samples,), optional
+        group id of each sample, by default None. If provided, the metric is evaluated separately on each group of samples. The LIADs are computed only once for all groups.
+    chunk_size : Optional[int], optional
+        number of samples to process at a time, by default None. If provided, `z` and `a` can be any arrays supporting slicing along the sample axis, such as `np.memmap`, and only one chunk of them is loaded into memory at a time. If None, all samples are processed at once.
+    model_axis : bool, optional
+        whether `z` and `a` have a leading model axis, by default False. If True, `z` and `a` are of shape `(n_models, ...)`, where `...` is one of the shapes above, and all models are evaluated at once. The return array(s) then have an additional leading axis of size `n_models`.
+    offsets : Optional[np.ndarray], (n_samples + 1,), optional
+        start of each sample in `z` and `a`, followed by their length, by default None. If provided, `z` and `a` are ragged: the interpolation points of all samples, whose number may differ between samples, are concatenated along the first axis without padding, and sample `i` spans `z[offsets[i]:offsets[i + 1]]` and `a[offsets[i]:offsets[i + 1]]`. `z` is then of shape `(n_values,)` or `(n_values, n_features or n_attributes)` and `a` of shape `(n_values,)` or `(n_values, n_attributes)`. The per-sample results are obtained with segment reductions over the concatenated LIADs. Only `liad_mode="forward"` is supported, and `chunk_size` and `model_axis` cannot be used.
 
     Returns
     -------
     np.ndarray
         smoothness array. See `reduce mode` for return shape.
+        If `groups` is provided, a dictionary mapping each group id to the above is returned instead.
 
     References
     ----------
@@ -152,23 +345,47 @@ def smoothness(
         p=p,
     )
 
-    z, a = _utils._validate_za_shape(z, a, reg_dim=reg_dim, min_size=3)
-    _utils._validate_non_constant_interp(z)
-    _utils._validate_equal_interp_deltas(z)
-
-    liads = _get_2nd_order_liad(z, a, liad_mode=liad_mode)
+    if offsets is not None:
+        assert (
+            chunk_size is None and not model_axis
+        ), "`chunk_size` and `model_axis` cannot be used with ragged inputs"
+        smth, flat = _get_sample_smoothness_ragged(
+            z,
+            a,
+            offsets,
+            reg_dim=reg_dim,
+            liad_mode=liad_mode,
+            max_mode=max_mode,
+            ptp_mode=ptp_mode,
+            clamp=clamp,
+            p=p,
+        )
+    else:
+        smth, flat = _utils._apply_chunked(
+            _get_sample_smoothness,
+            z,
+            a,
+            chunk_size=chunk_size,
+            model_axis=model_axis,
+            reg_dim=reg_dim,
+            liad_mode=liad_mode,
+            max_mode=max_mode,
+            ptp_mode=ptp_mode,
+            clamp=clamp,
+            p=p,
+            pool=_utils._LiadBufferPool(),
+        )
 
-    liad1, _ = liads[0]
-    liad2, _ = liads[1]
-    z_interval = z[..., 1] - z[..., 0]
+    if groups is not None:
+        # the sample axis is moved to the front for grouping
+        keys, slices, (smth, flat) = _sort_by_group(
+            groups, np.moveaxis(smth, -2, 0), np.moveaxis(flat, -2, 0)
+        )
+        return {
+            key: _reduce_smoothness(
+                np.moveaxis(smth[sl], 0, -2), np.moveaxis(flat[sl], 0, -2), reduce_mode
+            )
+            for key, sl in zip(keys, slices)
+        }
 
-    return _get_smoothness_from_liads(
-        liad1=liad1,
-        liad2=liad2,
-        z_interval=z_interval,
-        max_mode=max_mode,
-        ptp_mode=ptp_mode,
-        reduce_mode=reduce_mode,
-        clamp=clamp,
-        p=p,
-    )
+    return _reduce_smoothness(smth, flat, reduce_mode)
@@ -0,0 +1,566 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from ._utils import _finite_diff
+
+
+def _get_traversal_offsets(step: float, n_interp: int) -> np.ndarray:
+    # offsets are centered around the base latent vectors
+    return step * (np.arange(n_interp) - 0.5 * (n_interp - 1))
+
+
+def _get_sweep_latents(
+    z: np.ndarray, reg_dim: List[int], offsets: np.ndarray
+) -> np.ndarray:
+    """
+    Build the latent vectors of the sweeps of a chunk of base latent vectors.
+
+    Parameters
+    ----------
+    z : np.ndarray, (n_samples, n_features)
+        base latent vectors
+    reg_dim : List[int]
+        latent dimension to sweep for each attribute
+    offsets : np.ndarray, (n_interp,)
+        offsets added to the swept dimension
+
+    Returns
+    -------
+    np.ndarray, (n_samples, n_attributes, n_interp, n_features)
+        latent vectors of the sweeps
+    """
+    n_samples, n_features = z.shape
+    n_attr = len(reg_dim)
+    n_interp = offsets.shape[0]
+
+    zs = np.broadcast_to(
+        z[:, None, None, :], (n_samples, n_attr, n_interp, n_features)
+    ).copy()
+    zs[:, np.arange(n_attr), :, reg_dim] += offsets[None, None, :]
+
+    return zs
+
+
+class AttributeCache:
+    """
+    Least-recently-used cache of attribute measurements, keyed by quantised latent vectors.
+
+    Latent vectors are quantised to a grid of spacing `resolution` before lookup, so that points which coincide up to round-off, such as the base point shared by the sweeps of all attributes, or the points of a grid reused across epochs, are decoded and measured only once. A cache must only be shared between calls with the same `decode` and `measure` functions.
+
+    Parameters
+    ----------
+    max_size : int, optional
+        maximum number of cached latent vectors, by default 65536. The least recently used entries are evicted first.
+    resolution : float, optional
+        quantisation step of the latent vectors, by default 1e-6
+
+    Attributes
+    ----------
+    hits : int
+        number of latent vectors served from the cache
+    misses : int
+        number of latent vectors which had to be decoded and measured
+    """
+
+    def __init__(self, max_size: int = 65536, resolution: float = 1e-6):
+        assert max_size >= 1
+        assert resolution > 0.0
+
+        self.max_size = max_size
+        self.resolution = resolution
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Fraction of the looked-up latent vectors served from the cache, or 0 if nothing has been looked up yet.
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def clear(self):
+        """
+        Remove all entries and reset the hit and miss counts.
+        """
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def _keys(self, zs: np.ndarray) -> List[bytes]:
+        q = np.round(zs / self.resolution).astype(np.int64)
+        return [row.tobytes() for row in q]
+
+    def _lookup(self, keys: List[bytes]) -> List[Optional[np.ndarray]]:
+        values = []
+        for key in keys:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            values.append(value)
+        return values
+
+    def _insert(self, keys: List[bytes], values: np.ndarray):
+        for key, value in zip(keys, values):
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get_or_measure(
+        self, zs: np.ndarray, evaluate: Callable[[np.ndarray], np.ndarray]
+    ) -> np.ndarray:
+        """
+        Look up the attributes of a flat array of latent vectors, evaluating only the missing ones.
+
+        Parameters
+        ----------
+        zs : np.ndarray, (n, n_features)
+            latent vectors
+        evaluate : Callable[[np.ndarray], np.ndarray]
+            function mapping the missing latent vectors of shape `(n_missing, n_features)` to their attributes of shape `(n_missing, n_attributes)`. Duplicated latent vectors are only passed once.
+
+        Returns
+        -------
+        np.ndarray, (n, n_attributes)
+            attributes of the latent vectors
+        """
+        keys = self._keys(zs)
+        values = self._lookup(keys)
+
+        missing = {}
+        for i, (key, value) in enumerate(zip(keys, values)):
+            if value is None and key not in missing:
+                missing[key] = i
+
+        self.misses += len(missing)
+        self.hits += len(keys) - len(missing)
+
+        if len(missing) > 0:
+            new_keys = list(missing.keys())
+            new_values = np.asarray(evaluate(zs[list(missing.values())]))
+            self._insert(new_keys, new_values)
+            new = dict(zip(new_keys, new_values))
+            values = [
+                new[key] if value is None else value
+                for key, value in zip(keys, values)
+            ]
+
+        return np.stack(values, axis=0)
+
+
+def _decode_and_measure(
+    zs: np.ndarray,
+    decode: Optional[Callable[[Any], Any]],
+    measure: Callable[[Any], Any],
+    batch_size: int,
+    executor: Optional[ThreadPoolExecutor] = None,
+    cache: Optional[AttributeCache] = None,
+) -> np.ndarray:
+    """
+    Decode and measure a flat array of latent vectors in batches.
+
+    Parameters
+    ----------
+    zs : np.ndarray, (n, n_features)
+        latent vectors
+    decode : Optional[Callable[[Any], Any]]
+        decoder. If None, `measure` is applied to the latent vectors directly.
+    measure : Callable[[Any], Any]
+        attribute measurement function, returning an array of shape (batch, n_attributes)
+    batch_size : int
+        maximum number of latent vectors per call to `decode` and `measure`
+    executor : Optional[ThreadPoolExecutor], optional
+        worker pool to evaluate the batches on, by default None
+    cache : Optional[AttributeCache], optional
+        attribute cache, by default None. If given, only the latent vectors missing from the cache are decoded and measured.
+
+    Returns
+    -------
+    np.ndarray, (n, n_attributes)
+        measured attributes
+    """
+
+    if cache is not None:
+        return cache.get_or_measure(
+            zs,
+            lambda zm: _decode_and_measure(zm, decode, measure, batch_size, executor),
+        )
+
+    def _run(zb):
+        x = decode(zb) if decode is not None else zb
+        return np.asarray(measure(x))
+
+    batches = [zs[i : i + batch_size] for i in range(0, zs.shape[0], batch_size)]
+
+    if executor is None:
+        outputs = [_run(zb) for zb in batches]
+    else:
+        outputs = list(executor.map(_run, batches))
+
+    return np.concatenate(outputs, axis=0)
+
+
+def _measure_sweeps(
+    z: np.ndarray,
+    decode: Optional[Callable[[Any], Any]],
+    measure: Callable[[Any], Any],
+    reg_dim: List[int],
+    offsets: np.ndarray,
+    batch_size: int,
+    executor: Optional[ThreadPoolExecutor] = None,
+    cache: Optional[AttributeCache] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sweep a chunk of base latent vectors and measure the attributes along the sweeps.
+
+    Parameters
+    ----------
+    z : np.ndarray, (n_samples, n_features)
+        base latent vectors
+    decode : Optional[Callable[[Any], Any]]
+        decoder. If None, `measure` is applied to the latent vectors directly.
+    measure : Callable[[Any], Any]
+        attribute measurement function, returning an array of shape (batch, n_attributes)
+    reg_dim : List[int]
+        latent dimension to sweep for each attribute
+    offsets : np.ndarray, (n_interp,)
+        offsets added to the swept dimension
+    batch_size : int
+        maximum number of latent vectors per call to `decode` and `measure`
+    executor : Optional[ThreadPoolExecutor], optional
+        worker pool to evaluate the batches on, by default None
+    cache : Optional[AttributeCache], optional
+        attribute cache, by default None
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        swept latent values and measured attributes, both of shape (n_samples, n_attributes, n_interp)
+    """
+    n_features = z.shape[1]
+    n_attr = len(reg_dim)
+    n_interp = offsets.shape[0]
+
+    zs = _get_sweep_latents(z, reg_dim, offsets)
+    m = zs.shape[0]
+
+    a = _decode_and_measure(
+        zs.reshape(-1, n_features), decode, measure, batch_size, executor, cache
+    )
+
+    assert a.shape == (
+        m * n_attr * n_interp,
+        n_attr,
+    ), "`measure` must return an array of shape (batch, n_attributes)"
+
+    # keep the attribute regularized by the swept dimension of each sweep
+    a = a.reshape(m, n_attr, n_interp, n_attr)
+    a = np.diagonal(a, axis1=1, axis2=3).transpose(0, 2, 1)
+
+    return zs[:, np.arange(n_attr), :, reg_dim].transpose(1, 0, 2), a
+
+
+def traverse(
+    z: np.ndarray,
+    decode: Optional[Callable[[Any], Any]],
+    measure: Callable[[Any], Any],
+    reg_dim: Optional[List[int]] = None,
+    step: float = 0.1,
+    n_interp: int = 16,
+    chunk_size: int = 64,
+    batch_size: int = 1024,
+    n_workers: Optional[int] = None,
+    cache: Optional[AttributeCache] = None,
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Generate latent traversals and measure the attributes along them, in memory-bounded chunks.
+
+    For each base latent vector and each attribute `a[:, i]`, the latent dimension `reg_dim[i]` is swept over `n_interp` equally spaced points centered around its base value, with a spacing of `step`. The latent vectors of the sweeps are decoded and measured in batches, and the outputs are yielded one chunk of base latent vectors at a time, so that the full `(n_samples, n_attributes, n_interp)` tensors are never materialized.
+
+    The yielded arrays are in the format expected by the interpolatability metrics, with the swept values of `z[:, reg_dim[i]]` in `z[:, i]`. The metrics should therefore be used with `reg_dim=None`.
+
+    Parameters
+    ----------
+    z : np.ndarray, (n_samples, n_features)
+        base latent vectors
+    decode : Optional[Callable[[Any], Any]]
+        decoder mapping a batch of latent vectors of shape `(batch, n_features)` to a batch of generated samples. If None, `measure` is applied to the latent vectors directly.
+    measure : Callable[[Any], Any]
+        attribute measurement function mapping a batch of generated samples to an array of attributes of shape `(batch, n_attributes)`
+    reg_dim : Optional[List], optional
+        regularized dimensions, by default None
+        Attribute `a[:, i]` is regularized by `z[:, reg_dim[i]]`. If `None`, `a[:, i]` is assumed to be regularized by `z[:, i]` for all latent dimensions.
+    step : float, optional
+        spacing between the interpolation points, by default 0.1
+    n_interp : int, optional
+        number of interpolation points per sweep, by default 16
+    chunk_size : int, optional
+        number of base latent vectors per yielded chunk, by default 64. Each chunk requires `chunk_size * n_attributes * n_interp` decoded samples.
+    batch_size : int, optional
+        maximum number of latent vectors per call to `decode` and `measure`, by default 1024
+    n_workers : Optional[int], optional
+        number of worker threads to run `decode` and `measure` on, by default None. If None, the batches are evaluated sequentially in the calling thread.
+    cache : Optional[AttributeCache], optional
+        attribute cache, by default None. If given, the latent vectors already in the cache, such as the base points shared by the sweeps of all attributes when `n_interp` is odd, are not decoded and measured again. The same cache can be reused across traversals with the same `decode` and `measure`.
+
+    Yields
+    ------
+    Iterator[Tuple[np.ndarray, np.ndarray]]
+        tuples of
+        - the swept latent values, of shape `(chunk_size, n_attributes, n_interp)`
+        - the measured attributes, of shape `(chunk_size, n_attributes, n_interp)`
+        The last chunk may contain fewer samples.
+
+    Examples
+    --------
+    >>> smth = Smoothness()
+    >>> for zc, ac in traverse(z, model.decode, measure, reg_dim=[0, 3]):
+    ...     smth.update_state(zc, ac)
+    >>> smth.compute()
+    """
+
+    assert z.ndim == 2, "`z` must be of shape (n_samples, n_features)"
+    assert step > 0.0
+    assert n_interp >= 2
+    assert chunk_size >= 1
+    assert batch_size >= 1
+
+    n_samples, n_features = z.shape
+
+    if reg_dim is None:
+        reg_dim = list(range(n_features))
+
+    assert min(reg_dim) >= 0
+    assert max(reg_dim) < n_features
+
+    n_attr = len(reg_dim)
+    offsets = _get_traversal_offsets(step, n_interp)
+
+    executor = ThreadPoolExecutor(n_workers) if n_workers is not None else None
+
+    try:
+        for start in range(0, n_samples, chunk_size):
+            yield _measure_sweeps(
+                z[start : start + chunk_size],
+                decode,
+                measure,
+                reg_dim,
+                offsets,
+                batch_size,
+                executor,
+                cache,
+            )
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def _get_refinement_scores(
+    offsets: np.ndarray, a: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Score the intervals between adjacent interpolation points for refinement.
+
+    The curvature score of an interval of width `h` is the interpolation error bound `h^2 |liad2| / 8` of a linear interpolant, using the largest magnitude of the second-order LIAD of the two stencils overlapping the interval, and normalized by the peak-to-peak range of the attribute along the sweep. An interval is also flagged if the sign of its first-order LIAD differs from that of an adjacent interval, i.e. if it is next to a local extremum of the attribute.
+
+    Parameters
+    ----------
+    offsets : np.ndarray, (n_interp,)
+        sorted offsets of the interpolation points, with `n_interp >= 3`
+    a : np.ndarray, (n_samples, n_attributes, n_interp)
+        measured attributes
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        A tuple of
+        - the largest curvature score of each interval over all sweeps, of shape (n_interp - 1,)
+        - whether each interval is next to a sign change of the first-order LIAD in any sweep, of shape (n_interp - 1,)
+    """
+    (liad1, _), (liad2, _) = _finite_diff(
+        offsets, a, order=2, mode="forward", return_list=True, return_z=False
+    )
+
+    # each interior interval is covered by two second-order stencils
+    liad2 = np.abs(liad2)
+    liad2 = np.concatenate([liad2[..., :1], liad2, liad2[..., -1:]], axis=-1)
+    curv = np.maximum(liad2[..., :-1], liad2[..., 1:])
+
+    ptp = np.ptp(a, axis=-1, keepdims=True)
+    err = np.divide(
+        np.square(np.diff(offsets)) * curv,
+        8.0 * ptp,
+        out=np.zeros_like(curv),
+        where=ptp > 0.0,
+    )
+
+    sign = np.sign(liad1)
+    change = sign[..., 1:] != sign[..., :-1]
+    flip = np.zeros(sign.shape, dtype=bool)
+    flip[..., 1:] |= change
+    flip[..., :-1] |= change
+
+    agg_axes = tuple(range(a.ndim - 1))
+    return np.max(err, axis=agg_axes), np.any(flip, axis=agg_axes)
+
+
+def adaptive_traverse(
+    z: np.ndarray,
+    decode: Optional[Callable[[Any], Any]],
+    measure: Callable[[Any], Any],
+    reg_dim: Optional[List[int]] = None,
+    step: float = 0.1,
+    n_interp: int = 5,
+    max_interp: int = 33,
+    tol: float = 1e-3,
+    min_step: Optional[float] = None,
+    chunk_size: int = 64,
+    batch_size: int = 1024,
+    n_workers: Optional[int] = None,
+    cache: Optional[AttributeCache] = None,
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Generate adaptively refined latent traversals and measure the attributes along them, in memory-bounded chunks.
+
+    Each chunk of sweeps starts from a coarse grid of `n_interp` equally spaced points with a spacing of `step`, as in `traverse`. The grid is then refined by bisection, one round at a time, only in the intervals where the attribute bends or turns: an interval is bisected if its curvature score, obtained from the second-order LIAD, exceeds `tol` in any sweep of the chunk, or if the first-order LIAD changes sign next to it. The attributes are measured only at the new points of each round. The refinement stops when no interval needs to be refined, when the grid reaches `max_interp` points, or when the intervals to refine are narrower than `2 * min_step`. If the budget does not allow all flagged intervals to be bisected, the intervals next to a sign change are refined first, then the ones with the largest curvature scores.
+
+    All sweeps of a chunk share the same non-uniform grid, so the yielded arrays can be passed directly to the interpolatability metrics, which should be used with `reg_dim=None`. Different chunks may have grids of different sizes.
+
+    Parameters
+    ----------
+    z : np.ndarray, (n_samples, n_features)
+        base latent vectors
+    decode : Optional[Callable[[Any], Any]]
+        decoder mapping a batch of latent vectors of shape `(batch, n_features)` to a batch of generated samples. If None, `measure` is applied to the latent vectors directly.
+    measure : Callable[[Any], Any]
+        attribute measurement function mapping a batch of generated samples to an array of attributes of shape `(batch, n_attributes)`
+    reg_dim : Optional[List], optional
+        regularized dimensions, by default None
+        Attribute `a[:, i]` is regularized by `z[:, reg_dim[i]]`. If `None`, `a[:, i]` is assumed to be regularized by `z[:, i]` for all latent dimensions.
+    step : float, optional
+        spacing between the points of the coarse grid, by default 0.1
+    n_interp : int, optional
+        number of points of the coarse grid, by default 5. Must be at least 3.
+    max_interp : int, optional
+        maximum number of interpolation points per sweep after refinement, by default 33
+    tol : float, optional
+        tolerance on the curvature score of each interval, by default 1e-3. The score estimates the error of a linear interpolation over the interval, relative to the peak-to-peak range of the attribute along the sweep.
+    min_step : Optional[float], optional
+        smallest spacing between interpolation points, by default None. If None, `step / 16` is used.
+    chunk_size : int, optional
+        number of base latent vectors per yielded chunk, by default 64
+    batch_size : int, optional
+        maximum number of latent vectors per call to `decode` and `measure`, by default 1024
+    n_workers : Optional[int], optional
+        number of worker threads to run `decode` and `measure` on, by default None. If None, the batches are evaluated sequentially in the calling thread.
+    cache : Optional[AttributeCache], optional
+        attribute cache, by default None. If given, the latent vectors already in the cache, such as the base points shared by the sweeps of all attributes, are not decoded and measured again. The same cache can be reused across traversals with the same `decode` and `measure`.
+
+    Yields
+    ------
+    Iterator[Tuple[np.ndarray, np.ndarray]]
+        tuples of
+        - the swept latent values, of shape `(chunk_size, n_attributes, n_refined)`
+        - the measured attributes, of shape `(chunk_size, n_attributes, n_refined)`
+        where `n_interp <= n_refined <= max_interp`. The last chunk may contain fewer samples.
+
+    Examples
+    --------
+    >>> bundle = LiadInterpolatabilityBundle()
+    >>> update_from_traversal(bundle, adaptive_traverse(z, model.decode, measure))
+    >>> bundle.compute()
+    """
+
+    assert z.ndim == 2, "`z` must be of shape (n_samples, n_features)"
+    assert step > 0.0
+    assert n_interp >= 3
+    assert max_interp >= n_interp
+    assert tol >= 0.0
+    assert chunk_size >= 1
+    assert batch_size >= 1
+
+    if min_step is None:
+        min_step = step / 16
+
+    assert min_step > 0.0
+
+    n_samples, n_features = z.shape
+
+    if reg_dim is None:
+        reg_dim = list(range(n_features))
+
+    assert min(reg_dim) >= 0
+    assert max(reg_dim) < n_features
+
+    coarse = _get_traversal_offsets(step, n_interp)
+
+    executor = ThreadPoolExecutor(n_workers) if n_workers is not None else None
+
+    try:
+        for start in range(0, n_samples, chunk_size):
+            zc = z[start : start + chunk_size]
+            offsets = coarse
+            zr, ar = _measure_sweeps(
+                zc, decode, measure, reg_dim, offsets, batch_size, executor, cache
+            )
+
+            while offsets.shape[0] < max_interp:
+                err, flip = _get_refinement_scores(offsets, ar)
+
+                (cand,) = np.nonzero(
+                    ((err > tol) | flip) & (np.diff(offsets) >= 2.0 * min_step)
+                )
+                if cand.shape[0] == 0:
+                    break
+
+                # sign changes first, then the largest curvature scores
+                budget = max_interp - offsets.shape[0]
+                cand = cand[np.lexsort((-err[cand], ~flip[cand]))[:budget]]
+
+                new = 0.5 * (offsets[cand] + offsets[cand + 1])
+                zn, an = _measure_sweeps(
+                    zc, decode, measure, reg_dim, new, batch_size, executor, cache
+                )
+
+                offsets = np.concatenate([offsets, new])
+                order = np.argsort(offsets, kind="stable")
+                offsets = offsets[order]
+                zr = np.concatenate([zr, zn], axis=-1)[..., order]
+                ar = np.concatenate([ar, an], axis=-1)[..., order]
+
+            yield zr, ar
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def update_from_traversal(
+    metrics: Union[Any, List[Any]],
+    traversal: Iterator[Tuple[np.ndarray, np.ndarray]],
+):
+    """
+    Update the states of interpolatability metrics with the chunks of a traversal.
+
+    Parameters
+    ----------
+    metrics : Union[Any, List[Any]]
+        a metric or a list of metrics with an `update_state(z, a)` method, such as `Smoothness`, `Monotonicity`, or `LiadInterpolatabilityBundle`. The metrics should be created with `reg_dim=None`.
+    traversal : Iterator[Tuple[np.ndarray, np.ndarray]]
+        chunks of swept latent values and measured attributes, e.g. from `traverse` or `adaptive_traverse`
+    """
+
+    if not isinstance(metrics, (list, tuple)):
+        metrics = [metrics]
+
+    for zc, ac in traversal:
+        for metric in metrics:
+            metric.update_state(z=zc, a=ac)
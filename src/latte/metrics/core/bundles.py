@@ -3,12 +3,14 @@ from typing import Dict, List, Optional, Union
 import numpy as np
 
 from ...functional.bundles.liad_interpolatability import (
-    _optimized_liad_interpolatability_bundle,
+    _get_sample_liad_interpolatability,
+    _reduce_liad_interpolatability,
 )
 
 from ...functional.bundles.dependency_aware_mutual_info import (
     _optimized_dependency_aware_mutual_info_bundle,
 )
+from ...functional.interpolatability import _utils
 from ...functional.interpolatability.monotonicity import _validate_monotonicity_args
 from ...functional.interpolatability.smoothness import _validate_smoothness_args
 from ..base import OptimizedMetricBundle
@@ -84,15 +86,15 @@ class LiadInterpolatabilityBundle(OptimizedMetricBundle):
         regularized dimensions, by default None
         Attribute `a[:, i]` is regularized by `z[:, reg_dim[i]]`. If `None`, `a[:, i]` is assumed to be regularized by `z[:, i]`.
     liad_mode : str, optional
-        options for calculating LIAD, by default "forward". Only "forward" is currently supported.
+        options for calculating LIAD, by default "forward". Must be one of {"forward", "central", "spline"}. If "forward", forward differences are used. If "central", second-order accurate central differences at the interior interpolation points are used. If "spline", the derivatives of the natural cubic spline through the interpolation points are used.
     max_mode : str, optional
         options for calculating array maximum of 2nd order LIAD, by default "lehmer". Must be one of {"lehmer", "naive"}. If "lehmer", the maximum is calculated using the Lehmer mean with power `p`. If "naive", the maximum is calculated using the naive array maximum. Only affects smoothness.
     ptp_mode : str, optional
         options for calculating range of 1st order LIAD for normalization, by default "naive". Must be either "naive" or a float value in (0.0, 1.0]. If "naive", the range is calculated using the naive peak-to-peak range. If float, the range is taken to be the range between quantile `0.5-0.5*ptp_mode` and quantile `0.5+0.5*ptp_mode`. Only affects smoothness.
     reduce_mode : str, optional
         options for reduction of the return array, by default "attribute". Must be one of {"attribute", "samples", "all", "none"}. If "all", returns a scalar. If "attribute", an average is taken along the sample axis and the return array is of shape `(n_attributes,)`. If "samples", an average is taken along the attribute axis and the return array is of shape `(n_samples,)`. If "none", returns a smoothness matrix of shape `(n_samples, n_attributes,)`.
-    liad_thresh : float, optional
-        threshold for ignoring noisy 1st order LIAD, by default 1e-3. Only affects monotonicity.
+    liad_thresh : Union[float, np.ndarray], optional
+        threshold for ignoring noisy 1st order LIAD, by default 1e-3. If a 1D array of thresholds is provided, the metric is curve-valued, and the monotonicity output has an additional leading axis of size `n_thresholds`. Only affects monotonicity.
     degenerate_val : float, optional
         fill value for samples with all noisy LIAD (i.e., absolute value below `liad_thresh`), by default np.nan. Another possible option is to set this to 0.0. Only affects monotonicity.
     nanmean : bool, optional
@@ -101,6 +103,10 @@ class LiadInterpolatabilityBundle(OptimizedMetricBundle):
         Whether to clamp smoothness to [0, 1], by default False. Only affects smoothness.
     p : float, optional
         Lehmer mean power, by default 2.0 (i.e., contraharmonic mean). Only used if `max_mode == "lehmer"`. Must be greater than 1.0. Only affects smoothness.
+    interp_grid : Optional[np.ndarray], (n_interp,) or (n_features or n_attributes, n_interp), optional
+        interpolation points shared by all samples, by default None. If provided, `z` can be omitted from `update_state` and the grid is used for every batch instead.
+    top_k : Optional[int], optional
+        number of worst samples to track for each attribute and metric, by default None. If provided, the indices and values of the `top_k` samples with the lowest smoothness and the lowest absolute monotonicity since the last reset are kept with O(`top_k`) extra memory, and are returned by `compute` under the keys ['smoothness_worst_indices', 'smoothness_worst_scores', 'monotonicity_worst_indices', 'monotonicity_worst_scores']. The worst samples are sorted from the worst along axis -2, and the sample indices count from the first sample after the last reset. Samples with all LIAD below `liad_thresh` are never counted among the worst monotonicity, whatever `degenerate_val` is.
 
     References
     ----------
@@ -114,11 +120,13 @@ class LiadInterpolatabilityBundle(OptimizedMetricBundle):
         max_mode: str = "lehmer",
         ptp_mode: Union[float, str] = "naive",
         reduce_mode: str = "attribute",
-        liad_thresh: float = 1e-3,
+        liad_thresh: Union[float, np.ndarray] = 1e-3,
         degenerate_val: float = np.nan,
         nanmean: bool = True,
         clamp: bool = False,
         p: float = 2.0,
+        interp_grid: Optional[np.ndarray] = None,
+        top_k: Optional[int] = None,
     ):
 
         super().__init__()
@@ -138,8 +146,20 @@ class LiadInterpolatabilityBundle(OptimizedMetricBundle):
             p=p,
         )
 
-        self.add_state("z", [])
-        self.add_state("a", [])
+        self.add_state("smoothness_sums", np.zeros(()))
+        self.add_state("smoothness_counts", np.zeros(()))
+        self.add_state("smoothness_values", [])
+        self.add_state("all_flat", np.ones((), dtype=bool))
+        self.add_state("monotonicity_sums", np.zeros(()))
+        self.add_state("monotonicity_counts", np.zeros(()))
+        self.add_state("monotonicity_values", [])
+        if top_k is not None:
+            assert top_k >= 1, "`top_k` must be a positive integer"
+            self.add_state("smoothness_worst_scores", np.zeros((0,)))
+            self.add_state("smoothness_worst_indices", np.zeros((0,), dtype=int))
+            self.add_state("monotonicity_worst_scores", np.zeros((0,)))
+            self.add_state("monotonicity_worst_indices", np.zeros((0,), dtype=int))
+            self.add_state("n_seen", np.zeros((), dtype=int))
         self.reg_dim = reg_dim
         self.liad_mode = liad_mode
         self.max_mode = max_mode
@@ -150,46 +170,128 @@ class LiadInterpolatabilityBundle(OptimizedMetricBundle):
         self.liad_thresh = liad_thresh
         self.degenerate_val = degenerate_val
         self.nanmean = nanmean
+        self.interp_grid = interp_grid
+        self.top_k = top_k
 
-    def update_state(self, z: np.ndarray, a: np.ndarray):
+    def update_state(self, z: Optional[np.ndarray], a: np.ndarray):
         """
-        Update metric states. This function append the latent vectors and attributes to the internal state lists.
+        Update metric states. This function computes the smoothness and monotonicity of each sample in the batch from a single set of LIADs, and accumulates them into the internal states. If `reduce_mode` is "attribute" or "all", only the running per-attribute sums and counts are kept. Otherwise, the per-sample metric arrays are kept.
 
         Returns
         -------
-        z : np.ndarray, (n_samples, n_interp) or (n_samples, n_features or n_attributes, n_interp)
-            a batch of latent vectors
+        z : Optional[np.ndarray], (n_samples, n_interp), (n_samples, n_features or n_attributes, n_interp), (n_interp,), or (n_features or n_attributes, n_interp)
+            a batch of latent vectors, or interpolation points shared by all samples. If None, `interp_grid` is used.
         a : np.ndarray, (n_samples, n_interp) or (n_samples, n_attributes, n_interp)
             a batch of attribute(s)
         """
 
-        self.z.append(z)
-        self.a.append(a)
+        if z is None:
+            assert (
+                self.interp_grid is not None
+            ), "`z` must be provided if `interp_grid` is None"
+            z = self.interp_grid
+
+        smth, flat, mntc, degenerate = _get_sample_liad_interpolatability(
+            z,
+            a,
+            reg_dim=self.reg_dim,
+            liad_mode=self.liad_mode,
+            max_mode=self.max_mode,
+            ptp_mode=self.ptp_mode,
+            liad_thresh=self.liad_thresh,
+            degenerate_val=self.degenerate_val,
+            clamp=self.clamp,
+            p=self.p,
+            return_degenerate=True,
+        )
+
+        self.all_flat = np.logical_and(self.all_flat, np.all(flat, axis=-2))
+        (
+            self.smoothness_sums,
+            self.smoothness_counts,
+            self.smoothness_values,
+        ) = _utils._accumulate_samples(
+            self.smoothness_sums,
+            self.smoothness_counts,
+            self.smoothness_values,
+            smth,
+            self.reduce_mode,
+        )
+        (
+            self.monotonicity_sums,
+            self.monotonicity_counts,
+            self.monotonicity_values,
+        ) = _utils._accumulate_samples(
+            self.monotonicity_sums,
+            self.monotonicity_counts,
+            self.monotonicity_values,
+            mntc,
+            self.reduce_mode,
+            self.nanmean,
+        )
+
+        if self.top_k is not None:
+            (
+                self.smoothness_worst_scores,
+                self.smoothness_worst_indices,
+            ) = _utils._update_worst_samples(
+                self.smoothness_worst_scores,
+                self.smoothness_worst_indices,
+                smth,
+                self.n_seen,
+                self.top_k,
+            )
+            (
+                self.monotonicity_worst_scores,
+                self.monotonicity_worst_indices,
+            ) = _utils._update_worst_samples(
+                self.monotonicity_worst_scores,
+                self.monotonicity_worst_indices,
+                mntc,
+                self.n_seen,
+                self.top_k,
+                absolute=True,
+                exclude=degenerate,
+            )
+            self.n_seen = self.n_seen + smth.shape[-2]
 
     def compute(self) -> Dict[str, np.ndarray]:
         """
-        Compute metric values from the current state. The latent vectors and attributes in the internal states are concatenated along the sample dimension and passed to the metric function to obtain the metric values.
+        Compute metric values from the current state. The running sums and counts, or the per-sample metric arrays, in the internal states are reduced to obtain the metric values.
 
         Returns
         -------
         Dict[str, np.ndarray]
-            A dictionary of LIAD-based interpolatability metrics with keys ['smoothness', 'monotonicity'] each mapping to a corresponding metric np.ndarray. See `reduce_mode` for details on the shape of the return arrays.
+            A dictionary of LIAD-based interpolatability metrics with keys ['smoothness', 'monotonicity'] each mapping to a corresponding metric np.ndarray. See `reduce_mode` for details on the shape of the return arrays. If `top_k` is provided, the worst samples of each metric are also included.
         """
 
-        z = np.concatenate(self.z, axis=0)
-        a = np.concatenate(self.a, axis=0)
+        if self.reduce_mode in ["sample", "none"]:
+            out = _reduce_liad_interpolatability(
+                np.concatenate(self.smoothness_values, axis=-2),
+                self.all_flat[..., None, :],
+                np.concatenate(self.monotonicity_values, axis=-2),
+                reduce_mode=self.reduce_mode,
+                nanmean=self.nanmean,
+            )
+        else:
+            # attributes without any curvature in all samples have a smoothness of 1.0
+            smoothness_sums = np.where(
+                self.all_flat, self.smoothness_counts, self.smoothness_sums
+            )
 
-        return _optimized_liad_interpolatability_bundle(
-            z=z,
-            a=a,
-            reg_dim=self.reg_dim,
-            liad_mode=self.liad_mode,
-            max_mode=self.max_mode,
-            ptp_mode=self.ptp_mode,
-            reduce_mode=self.reduce_mode,
-            clamp=self.clamp,
-            p=self.p,
-            liad_thresh=self.liad_thresh,
-            degenerate_val=self.degenerate_val,
-            nanmean=self.nanmean,
-        )
+            out = {
+                "smoothness": _utils._reduce_accumulated(
+                    smoothness_sums, self.smoothness_counts, self.reduce_mode
+                ),
+                "monotonicity": _utils._reduce_accumulated(
+                    self.monotonicity_sums, self.monotonicity_counts, self.reduce_mode
+                ),
+            }
+
+        if self.top_k is not None:
+            out["smoothness_worst_indices"] = self.smoothness_worst_indices
+            out["smoothness_worst_scores"] = self.smoothness_worst_scores
+            out["monotonicity_worst_indices"] = self.monotonicity_worst_indices
+            out["monotonicity_worst_scores"] = self.monotonicity_worst_scores
+
+        return out
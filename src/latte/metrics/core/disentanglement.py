@@ -1,10 +1,25 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 import numpy as np
 
 from ...functional.disentanglement.modularity import modularity
 from ...functional.disentanglement.mutual_info import dlig, dmig, mig, xmig
-from ...functional.disentanglement.sap import sap
+from ...functional.disentanglement._utils import (
+    _validate_attr_mask,
+    _validate_za_shape,
+)
+from ...functional.disentanglement.sap import (
+    _get_continuous_sap_moments,
+    _get_continuous_sap_score_from_moments,
+    _get_discrete_sap_score_from_histograms,
+    _get_histogram_range,
+    _get_sap_from_score,
+    _merge_continuous_sap_moments,
+    _merge_discrete_sap_histograms,
+    _update_discrete_sap_histograms,
+    _widen_discrete_sap_histograms,
+    sap,
+)
 from ..base import LatteMetric
 
 
@@ -320,6 +335,14 @@ class SeparateAttributePredictability(LatteMetric):
         regularization parameter for linear classifier, by default 1.0. Ignored if `discrete` is `False`. See `sklearn.svm.LinearSVC` for more details.
     thresh : float, optional
         threshold for latent vector variance, by default 1e-12. Latent dimensions with variance below `thresh` will have SAP contribution zeroed. Ignored if `discrete` is `True`.
+    streaming : bool, optional
+        Whether to keep running sufficient statistics instead of the latent vectors and attributes, by default False. If True, only the sample counts, means, sums of squared deviations, and latent-attribute sums of cross deviations are kept, merged batch by batch with a numerically stable pairwise update, so that the memory required is independent of the number of samples. Attribute values that are NaN are treated as unlabelled. If `discrete` is True, a histogram of each latent dimension is instead kept for each class of each attribute, and the classification accuracy is taken to be the best training accuracy of a 1-D ordered-interval classifier on the histogram bins (see `discrete_mode` "exact"), which may be slightly lower than that of the exact classifier on the samples. The class labels of each attribute are the sorted union of those seen so far. The states of different instances, e.g. from different workers, can be combined with `merge_state`.
+    discrete_mode : str, optional
+        options for calculating the classification accuracy of discrete attributes, by default "svc". Must be one of {"svc", "exact"}. See `latte.functional.disentanglement.sap.sap` for details. Ignored if `discrete` is `False` or `streaming` is True.
+    n_bins : int, optional
+        number of histogram bins of each latent dimension, by default 256. Only used if both `discrete` and `streaming` are True.
+    hist_range : Optional[Tuple[float, float]], optional
+        range of the histogram of each latent dimension, by default None. If None, the bins of each latent dimension have a power-of-two width and start at a multiple of their width, and the range is fitted to the first batch. Whenever a later batch has latent values outside of the range, the range is widened by merging adjacent bins, so that no value is clipped, and the states of different workers can always be merged. The bins are then at most about four times wider than needed to span the latent values seen so far. If provided, latent values outside of the range are counted in the outermost bins, with a warning, and only states with the same range can be merged. Only used if both `discrete` and `streaming` are True.
 
     See Also
     --------
@@ -336,19 +359,38 @@ class SeparateAttributePredictability(LatteMetric):
         discrete: bool = False,
         l2_reg: float = 1.0,
         thresh: float = 1e-12,
+        streaming: bool = False,
+        discrete_mode: str = "svc",
+        n_bins: int = 256,
+        hist_range: Optional[Tuple[float, float]] = None,
     ):
         super().__init__()
 
-        self.add_state("z", [])
-        self.add_state("a", [])
+        if streaming and discrete:
+            assert n_bins > 0, "`n_bins` must be positive"
+            self.add_state("hists", [])
+            self.add_state("classes", [])
+            self.add_state("hist_lo", np.zeros((0,)))
+            self.add_state("hist_hi", np.zeros((0,)))
+        elif streaming:
+            for name in ["n", "z_mean", "a_mean", "z_m2", "a_m2", "za_m2"]:
+                # scalar defaults are broadcast on the first update
+                self.add_state(name, np.zeros(()))
+        else:
+            self.add_state("z", [])
+            self.add_state("a", [])
         self.reg_dim = reg_dim
         self.discrete = discrete
         self.l2_reg = l2_reg
         self.thresh = thresh
+        self.streaming = streaming
+        self.discrete_mode = discrete_mode
+        self.n_bins = n_bins
+        self.hist_range = hist_range
 
     def update_state(self, z: np.ndarray, a: np.ndarray):
         """
-        Update metric states. This function append the latent vectors and attributes to the internal state lists.
+        Update metric states. This function append the latent vectors and attributes to the internal state lists. If `streaming` is True, the sufficient statistics (or histograms) of the batch are merged into the running ones instead.
 
         Parameters
         ----------
@@ -357,23 +399,115 @@ class SeparateAttributePredictability(LatteMetric):
         a : np.ndarray, (n_samples, n_attributes) or (n_samples,)
             a batch of attribute(s)
         """
+        if self.streaming and self.discrete:
+            z, a, _ = _validate_za_shape(z, a)
+            if self.hist_lo.size == 0:
+                self.hist_lo, self.hist_hi = _get_histogram_range(
+                    z, self.hist_range, self.n_bins
+                )
+            elif self.hist_range is None:
+                self.hists, self.hist_lo, self.hist_hi = _widen_discrete_sap_histograms(
+                    self.hists,
+                    self.hist_lo,
+                    self.hist_hi,
+                    np.min(z, axis=0),
+                    np.max(z, axis=0),
+                    self.n_bins,
+                )
+            self.hists, self.classes = _update_discrete_sap_histograms(
+                self.hists,
+                self.classes,
+                z,
+                a,
+                self.hist_lo,
+                self.hist_hi,
+                self.n_bins,
+                _validate_attr_mask(a),
+            )
+            return
+
+        if self.streaming:
+            z, a, _ = _validate_za_shape(z, a)
+            moments = _merge_continuous_sap_moments(
+                (self.n, self.z_mean, self.a_mean, self.z_m2, self.a_m2, self.za_m2),
+                _get_continuous_sap_moments(z, a, _validate_attr_mask(a)),
+            )
+            (
+                self.n,
+                self.z_mean,
+                self.a_mean,
+                self.z_m2,
+                self.a_m2,
+                self.za_m2,
+            ) = moments
+            return
+
         self.z.append(z)
         self.a.append(a)
 
+    def merge_state(self, other: "SeparateAttributePredictability"):
+        """
+        Merge the streaming state of another instance, e.g. from another worker, into this one. The state of `other` is not modified.
+
+        Parameters
+        ----------
+        other : SeparateAttributePredictability
+            another instance with the same `discrete` and `streaming` options. If `discrete` is True, the histograms must have the same number of bins and the same range.
+        """
+        assert self.streaming and other.streaming, "only streaming states can be merged"
+        assert self.discrete == other.discrete, "`discrete` must be the same"
+
+        if self.discrete:
+            (
+                self.hists,
+                self.classes,
+                self.hist_lo,
+                self.hist_hi,
+            ) = _merge_discrete_sap_histograms(
+                (self.hists, self.classes, self.hist_lo, self.hist_hi),
+                (other.hists, other.classes, other.hist_lo, other.hist_hi),
+                adaptive=self.hist_range is None and other.hist_range is None,
+            )
+            return
+
+        names = ["n", "z_mean", "a_mean", "z_m2", "a_m2", "za_m2"]
+        moments = _merge_continuous_sap_moments(
+            tuple(getattr(self, k) for k in names),
+            tuple(getattr(other, k) for k in names),
+        )
+        for name, value in zip(names, moments):
+            setattr(self, name, value)
+
     def compute(self) -> np.ndarray:
         """
-        Compute metric values from the current state. The latent vectors and attributes in the internal states are concatenated along the sample dimension and passed to the metric function to obtain the metric values.
+        Compute metric values from the current state. The latent vectors and attributes in the internal states are concatenated along the sample dimension and passed to the metric function to obtain the metric values. If `streaming` is True, the metric values are instead computed directly from the running sufficient statistics (or histograms).
 
         Returns
         -------
         np.ndarray, (n_attributes,)
             SAP for each attribute
         """
+        if self.streaming and self.discrete:
+            score = _get_discrete_sap_score_from_histograms(self.hists)
+            return _get_sap_from_score(score, self.reg_dim)
+
+        if self.streaming:
+            score = _get_continuous_sap_score_from_moments(
+                self.n, self.z_m2, self.a_m2, self.za_m2, thresh=self.thresh
+            )
+            return _get_sap_from_score(score, self.reg_dim)
+
         z = np.concatenate(self.z, axis=0)
         a = np.concatenate(self.a, axis=0)
 
         return sap(
-            z, a, self.reg_dim, self.discrete, l2_reg=self.l2_reg, thresh=self.thresh
+            z,
+            a,
+            self.reg_dim,
+            self.discrete,
+            l2_reg=self.l2_reg,
+            thresh=self.thresh,
+            discrete_mode=self.discrete_mode,
         )
 
 
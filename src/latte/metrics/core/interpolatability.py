@@ -1,14 +1,16 @@
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Union
 
 import numpy as np
 
+from ...functional.interpolatability import _utils
 from ...functional.interpolatability.monotonicity import (
+    _get_sample_monotonicity,
     _validate_monotonicity_args,
-    monotonicity,
 )
 from ...functional.interpolatability.smoothness import (
+    _get_sample_smoothness,
+    _reduce_smoothness,
     _validate_smoothness_args,
-    smoothness,
 )
 from ..base import LatteMetric
 
@@ -33,13 +35,15 @@ class Smoothness(LatteMetric):
     
     .. math:: \mathcal{D}^{(n)}_{i, d}(\mathbf{z}; \delta) =\dfrac{{\mathcal{D}^{(n-1)}_i(\mathbf{z}+\delta \mathbf{e}_d) - \mathcal{D}^{(n-1)}_i(\mathbf{z})}}{\delta}.
 
+    The interpolation points need not be equally spaced, as long as they are strictly monotonic. With unequal spacing, the LIADs are computed as non-uniform divided differences, and :math:`\delta` in the normalization of smoothness is taken to be the mean spacing of the interpolation points.
+
     Parameters
     ----------
     reg_dim : Optional[List], optional
         regularized dimensions, by default None
         Attribute `a[:, i]` is regularized by `z[:, reg_dim[i]]`. If `None`, `a[:, i]` is assumed to be regularized by `z[:, i]`.
     liad_mode : str, optional
-        options for calculating LIAD, by default "forward". Only "forward" is currently supported.
+        options for calculating LIAD, by default "forward". Must be one of {"forward", "central", "spline"}. If "forward", forward differences are used. If "central", second-order accurate central differences at the interior interpolation points are used. If "spline", the derivatives of the natural cubic spline through the interpolation points are used.
     max_mode : str, optional
         options for calculating array maximum of 2nd order LIAD, by default "lehmer". Must be one of {"lehmer", "naive"}. If "lehmer", the maximum is calculated using the Lehmer mean with power `p`. If "naive", the maximum is calculated using the naive array maximum.
     ptp_mode : str, optional
@@ -49,8 +53,12 @@ class Smoothness(LatteMetric):
     clamp : bool, optional
         Whether to clamp smoothness to [0, 1], by default False
     p : float, optional
-        Lehmer mean power, by default 2.0 (i.e., contraharmonic mean). Only used if `max_mode == "lehmer"`. Must be greater than 1.0. 
-        
+        Lehmer mean power, by default 2.0 (i.e., contraharmonic mean). Only used if `max_mode == "lehmer"`. Must be greater than 1.0.
+    interp_grid : Optional[np.ndarray], (n_interp,) or (n_features or n_attributes, n_interp), optional
+        interpolation points shared by all samples, by default None. If provided, `z` can be omitted from `update_state` and the grid is used for every batch instead.
+    top_k : Optional[int], optional
+        number of worst samples to track for each attribute, by default None. If provided, the indices and values of the `top_k` samples with the lowest smoothness since the last reset are kept with O(`top_k`) extra memory, and `compute` returns a dictionary with keys ['smoothness', 'smoothness_worst_indices', 'smoothness_worst_scores'] instead. The worst samples are sorted from the worst along axis -2, and the sample indices count from the first sample after the last reset.
+
     References
     ----------
     .. [1] K. N. Watcharasupat, “Controllable Music: Supervised Learning of Disentangled Representations for Music Generation”, 2021.
@@ -65,6 +73,8 @@ class Smoothness(LatteMetric):
         reduce_mode: str = "attribute",
         clamp: bool = False,
         p: float = 2.0,
+        interp_grid: Optional[np.ndarray] = None,
+        top_k: Optional[int] = None,
     ):
         super().__init__()
 
@@ -76,8 +86,15 @@ class Smoothness(LatteMetric):
             p=p,
         )
 
-        self.add_state("z", [])
-        self.add_state("a", [])
+        self.add_state("sums", np.zeros(()))
+        self.add_state("counts", np.zeros(()))
+        self.add_state("values", [])
+        if top_k is not None:
+            assert top_k >= 1, "`top_k` must be a positive integer"
+            self.add_state("worst_scores", np.zeros((0,)))
+            self.add_state("worst_indices", np.zeros((0,), dtype=int))
+            self.add_state("n_seen", np.zeros((), dtype=int))
+        self.add_state("all_flat", np.ones((), dtype=bool))
         self.reg_dim = reg_dim
         self.liad_mode = liad_mode
         self.max_mode = max_mode
@@ -85,47 +102,79 @@ class Smoothness(LatteMetric):
         self.reduce_mode = reduce_mode
         self.clamp = clamp
         self.p = p
+        self.interp_grid = interp_grid
+        self.top_k = top_k
 
-    def update_state(self, z: np.ndarray, a: np.ndarray):
+    def update_state(self, z: Optional[np.ndarray], a: np.ndarray):
         """
-        Update metric states. This function append the latent vectors and attributes to the internal state lists.
+        Update metric states. This function computes the smoothness of each sample in the batch and accumulates them into the internal states. If `reduce_mode` is "attribute" or "all", only the running per-attribute sums and counts are kept. Otherwise, the per-sample smoothness arrays are kept.
 
         Parameters
         ----------
-        z : np.ndarray, (n_samples, n_interp) or (n_samples, n_features or n_attributes, n_interp)
-            a batch of latent vectors
+        z : Optional[np.ndarray], (n_samples, n_interp), (n_samples, n_features or n_attributes, n_interp), (n_interp,), or (n_features or n_attributes, n_interp)
+            a batch of latent vectors, or interpolation points shared by all samples. If None, `interp_grid` is used.
         a : np.ndarray, (n_samples, n_interp) or (n_samples, n_attributes, n_interp)
             a batch of attribute(s)
         """
 
-        # TODO: compute intermediate values instead of storing the entire data in state
-        self.z.append(z)
-        self.a.append(a)
+        if z is None:
+            assert (
+                self.interp_grid is not None
+            ), "`z` must be provided if `interp_grid` is None"
+            z = self.interp_grid
+
+        smth, flat = _get_sample_smoothness(
+            z,
+            a,
+            reg_dim=self.reg_dim,
+            liad_mode=self.liad_mode,
+            max_mode=self.max_mode,
+            ptp_mode=self.ptp_mode,
+            clamp=self.clamp,
+            p=self.p,
+        )
+
+        self.all_flat = np.logical_and(self.all_flat, np.all(flat, axis=-2))
+        self.sums, self.counts, self.values = _utils._accumulate_samples(
+            self.sums, self.counts, self.values, smth, self.reduce_mode
+        )
+
+        if self.top_k is not None:
+            self.worst_scores, self.worst_indices = _utils._update_worst_samples(
+                self.worst_scores, self.worst_indices, smth, self.n_seen, self.top_k
+            )
+            self.n_seen = self.n_seen + smth.shape[-2]
 
-    def compute(self) -> np.ndarray:
+    def compute(self) -> Union[np.ndarray, Dict[str, np.ndarray]]:
         """
-        Compute metric values from the current state. The latent vectors and attributes in the internal states are concatenated along the sample dimension and passed to the metric function to obtain the metric values.
+        Compute metric values from the current state. The running sums and counts, or the per-sample smoothness arrays, in the internal states are reduced to obtain the metric values.
 
         Returns
         -------
-        np.ndarray
+        Union[np.ndarray, Dict[str, np.ndarray]]
             smoothness array. See `reduce mode` for return shape.
+            If `top_k` is provided, a dictionary of the smoothness array and the worst samples is returned instead.
         """
 
-        z = np.concatenate(self.z, axis=0)
-        a = np.concatenate(self.a, axis=0)
+        if self.reduce_mode in ["sample", "none"]:
+            smth = _reduce_smoothness(
+                np.concatenate(self.values, axis=-2),
+                self.all_flat[..., None, :],
+                self.reduce_mode,
+            )
+        else:
+            # attributes without any curvature in all samples have a smoothness of 1.0
+            sums = np.where(self.all_flat, self.counts, self.sums)
+            smth = _utils._reduce_accumulated(sums, self.counts, self.reduce_mode)
 
-        return smoothness(
-            z,
-            a,
-            self.reg_dim,
-            self.liad_mode,
-            self.max_mode,
-            self.ptp_mode,
-            self.reduce_mode,
-            self.clamp,
-            self.p,
-        )
+        if self.top_k is None:
+            return smth
+
+        return {
+            "smoothness": smth,
+            "smoothness_worst_indices": self.worst_indices,
+            "smoothness_worst_scores": self.worst_scores,
+        }
 
 
 class Monotonicity(LatteMetric):
@@ -151,15 +200,19 @@ class Monotonicity(LatteMetric):
         regularized dimensions, by default None
         Attribute `a[:, i]` is regularized by `z[:, reg_dim[i]]`. If `None`, `a[:, i]` is assumed to be regularized by `z[:, i]`.
     liad_mode : str, optional
-        options for calculating LIAD, by default "forward". Only "forward" is currently supported.
+        options for calculating LIAD, by default "forward". Must be one of {"forward", "central", "spline"}. If "forward", forward differences are used. If "central", second-order accurate central differences at the interior interpolation points are used. If "spline", the derivatives of the natural cubic spline through the interpolation points are used.
     reduce_mode : str, optional
         options for reduction of the return array, by default "attribute". Must be one of {"attribute", "samples", "all", "none"}. If "all", returns a scalar. If "attribute", an average is taken along the sample axis and the return array is of shape `(n_attributes,)`. If "samples", an average is taken along the attribute axis and the return array is of shape `(n_samples,)`. If "none", returns a smoothness matrix of shape `(n_samples, n_attributes,)`.
-    liad_thresh : float, optional
-        threshold for ignoring noisy 1st order LIAD, by default 1e-3
+    liad_thresh : Union[float, np.ndarray], optional
+        threshold for ignoring noisy 1st order LIAD, by default 1e-3. If a 1D array of thresholds is provided, the metric is curve-valued, and the output has an additional leading axis of size `n_thresholds`.
     degenerate_val : float, optional
         fill value for samples with all noisy LIAD (i.e., absolute value below `liad_thresh`), by default np.nan. Another possible option is to set this to 0.0.
     nanmean : bool, optional
         whether to ignore the NaN values in calculating the return array, by default True. Ignored if `reduce_mode` is "none". If all LIAD in an axis are NaNs, the return array in that axis is filled with NaNs.
+    interp_grid : Optional[np.ndarray], (n_interp,) or (n_features or n_attributes, n_interp), optional
+        interpolation points shared by all samples, by default None. If provided, `z` can be omitted from `update_state` and the grid is used for every batch instead.
+    top_k : Optional[int], optional
+        number of worst samples to track for each attribute, by default None. If provided, the indices and values of the `top_k` samples with the lowest absolute monotonicity since the last reset are kept with O(`top_k`) extra memory, and `compute` returns a dictionary with keys ['monotonicity', 'monotonicity_worst_indices', 'monotonicity_worst_scores'] instead. The worst samples are sorted from the worst along axis -2, and the sample indices count from the first sample after the last reset. Degenerate samples, with all LIAD below `liad_thresh`, are never counted as the worst, whatever `degenerate_val` is. If fewer than `top_k` samples are not degenerate, the remaining entries are degenerate samples with NaN scores.
 
     References
     ----------
@@ -171,9 +224,11 @@ class Monotonicity(LatteMetric):
         reg_dim: Optional[List[int]] = None,
         liad_mode: str = "forward",
         reduce_mode: str = "attribute",
-        liad_thresh: float = 1e-3,
+        liad_thresh: Union[float, np.ndarray] = 1e-3,
         degenerate_val: float = np.nan,
         nanmean: bool = True,
+        interp_grid: Optional[np.ndarray] = None,
+        top_k: Optional[int] = None,
     ):
         super().__init__()
 
@@ -184,51 +239,90 @@ class Monotonicity(LatteMetric):
             nanmean=nanmean,
         )
 
-        self.add_state("z", [])
-        self.add_state("a", [])
+        self.add_state("sums", np.zeros(()))
+        self.add_state("counts", np.zeros(()))
+        self.add_state("values", [])
+        if top_k is not None:
+            assert top_k >= 1, "`top_k` must be a positive integer"
+            self.add_state("worst_scores", np.zeros((0,)))
+            self.add_state("worst_indices", np.zeros((0,), dtype=int))
+            self.add_state("n_seen", np.zeros((), dtype=int))
         self.reg_dim = reg_dim
         self.liad_mode = liad_mode
         self.reduce_mode = reduce_mode
         self.liad_thresh = liad_thresh
         self.degenerate_val = degenerate_val
         self.nanmean = nanmean
+        self.interp_grid = interp_grid
+        self.top_k = top_k
 
-    def update_state(self, z: np.ndarray, a: np.ndarray):
+    def update_state(self, z: Optional[np.ndarray], a: np.ndarray):
         """
-        Update metric states. This function append the latent vectors and attributes to the internal state lists.
+        Update metric states. This function computes the monotonicity of each sample in the batch and accumulates them into the internal states. If `reduce_mode` is "attribute" or "all", only the running per-attribute sums and counts are kept. Otherwise, the per-sample monotonicity arrays are kept.
 
         Parameters
         ----------
-        z : np.ndarray, (n_samples, n_interp) or (n_samples, n_features or n_attributes, n_interp)
-            a batch of latent vectors
+        z : Optional[np.ndarray], (n_samples, n_interp), (n_samples, n_features or n_attributes, n_interp), (n_interp,), or (n_features or n_attributes, n_interp)
+            a batch of latent vectors, or interpolation points shared by all samples. If None, `interp_grid` is used.
         a : np.ndarray, (n_samples, n_interp) or (n_samples, n_attributes, n_interp)
             a batch of attribute(s)
         """
 
-        # TODO: compute intermediate values instead of storing the entire data in state
-        self.z.append(z)
-        self.a.append(a)
+        if z is None:
+            assert (
+                self.interp_grid is not None
+            ), "`z` must be provided if `interp_grid` is None"
+            z = self.interp_grid
+
+        mntc, degenerate = _get_sample_monotonicity(
+            z,
+            a,
+            reg_dim=self.reg_dim,
+            liad_mode=self.liad_mode,
+            liad_thresh=self.liad_thresh,
+            degenerate_val=self.degenerate_val,
+            return_degenerate=True,
+        )
 
-    def compute(self) -> np.ndarray:
+        self.sums, self.counts, self.values = _utils._accumulate_samples(
+            self.sums, self.counts, self.values, mntc, self.reduce_mode, self.nanmean
+        )
+
+        if self.top_k is not None:
+            self.worst_scores, self.worst_indices = _utils._update_worst_samples(
+                self.worst_scores,
+                self.worst_indices,
+                mntc,
+                self.n_seen,
+                self.top_k,
+                absolute=True,
+                exclude=degenerate,
+            )
+            self.n_seen = self.n_seen + mntc.shape[-2]
+
+    def compute(self) -> Union[np.ndarray, Dict[str, np.ndarray]]:
         """
-        Compute metric values from the current state. The latent vectors and attributes in the internal states are concatenated along the sample dimension and passed to the metric function to obtain the metric values.
+        Compute metric values from the current state. The running sums and counts, or the per-sample monotonicity arrays, in the internal states are reduced to obtain the metric values.
 
         Returns
         -------
-        np.ndarray
+        Union[np.ndarray, Dict[str, np.ndarray]]
             monotonicity array. See `reduce mode` for return shape.
+            If `top_k` is provided, a dictionary of the monotonicity array and the worst samples is returned instead.
         """
 
-        z = np.concatenate(self.z, axis=0)
-        a = np.concatenate(self.a, axis=0)
-
-        return monotonicity(
-            z,
-            a,
-            self.reg_dim,
-            self.liad_mode,
-            self.reduce_mode,
-            self.liad_thresh,
-            self.degenerate_val,
-            self.nanmean,
-        )
+        if self.reduce_mode in ["sample", "none"]:
+            mntc = _utils._reduce_samples(
+                np.concatenate(self.values, axis=-2), self.reduce_mode, self.nanmean
+            )
+        else:
+            mntc = _utils._reduce_accumulated(self.sums, self.counts, self.reduce_mode)
+
+        if self.top_k is None:
+            return mntc
+
+        return {
+            "monotonicity": mntc,
+            "monotonicity_worst_indices": self.worst_indices,
+            "monotonicity_worst_scores": self.worst_scores,
+        }
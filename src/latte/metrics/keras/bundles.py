@@ -68,15 +68,15 @@ class LiadInterpolatabilityBundle(KerasMetricWrapper):
         regularized dimensions, by default None
         Attribute `a[:, i]` is regularized by `z[:, reg_dim[i]]`. If `None`, `a[:, i]` is assumed to be regularized by `z[:, i]`.
     liad_mode : str, optional
-        options for calculating LIAD, by default "forward". Only "forward" is currently supported.
+        options for calculating LIAD, by default "forward". Must be one of {"forward", "central", "spline"}. If "forward", forward differences are used. If "central", second-order accurate central differences at the interior interpolation points are used. If "spline", the derivatives of the natural cubic spline through the interpolation points are used.
     max_mode : str, optional
         options for calculating array maximum of 2nd order LIAD, by default "lehmer". Must be one of {"lehmer", "naive"}. If "lehmer", the maximum is calculated using the Lehmer mean with power `p`. If "naive", the maximum is calculated using the naive array maximum. Only affects smoothness.
     ptp_mode : str, optional
         options for calculating range of 1st order LIAD for normalization, by default "naive". Must be either "naive" or a float value in (0.0, 1.0]. If "naive", the range is calculated using the naive peak-to-peak range. If float, the range is taken to be the range between quantile `0.5-0.5*ptp_mode` and quantile `0.5+0.5*ptp_mode`. Only affects smoothness.
     reduce_mode : str, optional
         options for reduction of the return array, by default "attribute". Must be one of {"attribute", "samples", "all", "none"}. If "all", returns a scalar. If "attribute", an average is taken along the sample axis and the return array is of shape `(n_attributes,)`. If "samples", an average is taken along the attribute axis and the return array is of shape `(n_samples,)`. If "none", returns a smoothness matrix of shape `(n_samples, n_attributes,)`.
-    liad_thresh : float, optional
-        threshold for ignoring noisy 1st order LIAD, by default 1e-3. Only affects monotonicity.
+    liad_thresh : Union[float, np.ndarray], optional
+        threshold for ignoring noisy 1st order LIAD, by default 1e-3. If a 1D array of thresholds is provided, the metric is curve-valued, and the monotonicity output has an additional leading axis of size `n_thresholds`. Only affects monotonicity.
     degenerate_val : float, optional
         fill value for samples with all noisy LIAD (i.e., absolute value below `liad_thresh`), by default np.nan. Another possible option is to set this to 0.0. Only affects monotonicity.
     nanmean : bool, optional
@@ -85,6 +85,10 @@ class LiadInterpolatabilityBundle(KerasMetricWrapper):
         Whether to clamp smoothness to [0, 1], by default False. Only affects smoothness.
     p : float, optional
         Lehmer mean power, by default 2.0 (i.e., contraharmonic mean). Only used if `max_mode == "lehmer"`. Must be greater than 1.0. Only affects smoothness.
+    interp_grid : Optional[np.ndarray], (n_interp,) or (n_features or n_attributes, n_interp), optional
+        interpolation points shared by all samples, by default None. If provided, `z` can be omitted from `update_state` and the grid is used for every batch instead.
+    top_k : Optional[int], optional
+        number of worst samples to track for each attribute and metric, by default None. If provided, the indices and values of the `top_k` samples with the lowest smoothness and the lowest absolute monotonicity since the last reset are kept with O(`top_k`) extra memory, and are returned by `compute` under the keys ['smoothness_worst_indices', 'smoothness_worst_scores', 'monotonicity_worst_indices', 'monotonicity_worst_scores']. The worst samples are sorted from the worst along axis -2, and the sample indices count from the first sample after the last reset. Samples with all LIAD below `liad_thresh` are never counted among the worst monotonicity, whatever `degenerate_val` is.
 
     References
     ----------
@@ -98,11 +102,13 @@ class LiadInterpolatabilityBundle(KerasMetricWrapper):
         max_mode: str = "lehmer",
         ptp_mode: Union[float, str] = "naive",
         reduce_mode: str = "attribute",
-        liad_thresh: float = 1e-3,
+        liad_thresh: Union[float, np.ndarray] = 1e-3,
         degenerate_val: float = np.nan,
         nanmean: bool = True,
         clamp: bool = False,
         p: float = 2.0,
+        interp_grid: Optional[np.ndarray] = None,
+        top_k: Optional[int] = None,
     ):
         super().__init__(
             metric=C.LiadInterpolatabilityBundle,
@@ -116,16 +122,18 @@ class LiadInterpolatabilityBundle(KerasMetricWrapper):
             nanmean=nanmean,
             clamp=clamp,
             p=p,
+            interp_grid=interp_grid,
+            top_k=top_k,
         )
 
-    def update_state(self, z: tf.Tensor, a: tf.Tensor):
+    def update_state(self, z: Optional[tf.Tensor], a: tf.Tensor):
         """
         Update metric states. This function append the latent vectors and attributes to the internal state lists.
 
         Parameters
         ----------
-        z : tf.Tensor, (n_samples, n_interp) or (n_samples, n_features or n_attributes, n_interp)
-            a batch of latent vectors
+        z : Optional[tf.Tensor], (n_samples, n_interp), (n_samples, n_features or n_attributes, n_interp), (n_interp,), or (n_features or n_attributes, n_interp)
+            a batch of latent vectors, or interpolation points shared by all samples. If None, `interp_grid` is used.
         a : tf.Tensor, (n_samples, n_interp) or (n_samples, n_attributes, n_interp)
             a batch of attribute(s)
         """
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import numpy as np
 import tensorflow as tf
 
@@ -297,6 +297,14 @@ class SeparateAttributePredictability(KerasMetricWrapper):
         regularization parameter for linear classifier, by default 1.0. Ignored if `discrete` is `False`. See `sklearn.svm.LinearSVC` for more details.
     thresh : float, optional
         threshold for latent vector variance, by default 1e-12. Latent dimensions with variance below `thresh` will have SAP contribution zeroed. Ignored if `discrete` is `True`.
+    streaming : bool, optional
+        Whether to keep running sufficient statistics instead of the latent vectors and attributes, by default False. If True, the memory required is independent of the number of samples. If `discrete` is also True, per-class histograms of the latent dimensions are kept instead.
+    discrete_mode : str, optional
+        options for calculating the classification accuracy of discrete attributes, by default "svc". Must be one of {"svc", "exact"}. See `latte.functional.disentanglement.sap.sap` for details. Ignored if `discrete` is `False` or `streaming` is True.
+    n_bins : int, optional
+        number of histogram bins of each latent dimension, by default 256. Only used if both `discrete` and `streaming` are True.
+    hist_range : Optional[Tuple[float, float]], optional
+        range of the histogram of each latent dimension, by default None (i.e., taken from the first batch). Only used if both `discrete` and `streaming` are True.
 
     See Also
     --------
@@ -313,6 +321,10 @@ class SeparateAttributePredictability(KerasMetricWrapper):
         discrete: bool = False,
         l2_reg: float = 1.0,
         thresh: float = 1e-12,
+        streaming: bool = False,
+        discrete_mode: str = "svc",
+        n_bins: int = 256,
+        hist_range: Optional[Tuple[float, float]] = None,
     ):
         super().__init__(
             metric=C.SeparateAttributePredictability,
@@ -320,6 +332,10 @@ class SeparateAttributePredictability(KerasMetricWrapper):
             discrete=discrete,
             l2_reg=l2_reg,
             thresh=thresh,
+            streaming=streaming,
+            discrete_mode=discrete_mode,
+            n_bins=n_bins,
+            hist_range=hist_range,
         )
 
     def update_state(self, z: tf.Tensor, a: tf.Tensor):
@@ -27,13 +27,15 @@ class Smoothness(KerasMetricWrapper):
     
     .. math:: \mathcal{D}^{(n)}_{i, d}(\mathbf{z}; \delta) =\dfrac{{\mathcal{D}^{(n-1)}_i(\mathbf{z}+\delta \mathbf{e}_d) - \mathcal{D}^{(n-1)}_i(\mathbf{z})}}{\delta}.
 
+    The interpolation points need not be equally spaced, as long as they are strictly monotonic. With unequal spacing, the LIADs are computed as non-uniform divided differences, and :math:`\delta` in the normalization of smoothness is taken to be the mean spacing of the interpolation points.
+
     Parameters
     ----------
     reg_dim : Optional[List], optional
         regularized dimensions, by default None
         Attribute `a[:, i]` is regularized by `z[:, reg_dim[i]]`. If `None`, `a[:, i]` is assumed to be regularized by `z[:, i]`.
     liad_mode : str, optional
-        options for calculating LIAD, by default "forward". Only "forward" is currently supported.
+        options for calculating LIAD, by default "forward". Must be one of {"forward", "central", "spline"}. If "forward", forward differences are used. If "central", second-order accurate central differences at the interior interpolation points are used. If "spline", the derivatives of the natural cubic spline through the interpolation points are used.
     max_mode : str, optional
         options for calculating array maximum of 2nd order LIAD, by default "lehmer". Must be one of {"lehmer", "naive"}. If "lehmer", the maximum is calculated using the Lehmer mean with power `p`. If "naive", the maximum is calculated using the naive array maximum.
     ptp_mode : str, optional
@@ -43,8 +45,12 @@ class Smoothness(KerasMetricWrapper):
     clamp : bool, optional
         Whether to clamp smoothness to [0, 1], by default False
     p : float, optional
-        Lehmer mean power, by default 2.0 (i.e., contraharmonic mean). Only used if `max_mode == "lehmer"`. Must be greater than 1.0. 
-        
+        Lehmer mean power, by default 2.0 (i.e., contraharmonic mean). Only used if `max_mode == "lehmer"`. Must be greater than 1.0.
+    interp_grid : Optional[np.ndarray], (n_interp,) or (n_features or n_attributes, n_interp), optional
+        interpolation points shared by all samples, by default None. If provided, `z` can be omitted from `update_state` and the grid is used for every batch instead.
+    top_k : Optional[int], optional
+        number of worst samples to track for each attribute, by default None. If provided, the indices and values of the `top_k` samples with the lowest smoothness since the last reset are kept with O(`top_k`) extra memory, and `compute` returns a dictionary with keys ['smoothness', 'smoothness_worst_indices', 'smoothness_worst_scores'] instead. The worst samples are sorted from the worst along axis -2, and the sample indices count from the first sample after the last reset.
+
     References
     ----------
     .. [1] K. N. Watcharasupat, “Controllable Music: Supervised Learning of Disentangled Representations for Music Generation”, 2021.
@@ -59,6 +65,8 @@ class Smoothness(KerasMetricWrapper):
         reduce_mode: str = "attribute",
         clamp: bool = False,
         p: float = 2.0,
+        interp_grid: Optional[np.ndarray] = None,
+        top_k: Optional[int] = None,
     ):
         super().__init__(
             metric=C.Smoothness,
@@ -69,16 +77,18 @@ class Smoothness(KerasMetricWrapper):
             reduce_mode=reduce_mode,
             clamp=clamp,
             p=p,
+            interp_grid=interp_grid,
+            top_k=top_k,
         )
 
-    def update_state(self, z: tf.Tensor, a: tf.Tensor):
+    def update_state(self, z: Optional[tf.Tensor], a: tf.Tensor):
         """
         Update metric states. This function append the latent vectors and attributes to the internal state lists.
 
         Parameters
         ----------
-        z : tf.Tensor, (n_samples, n_interp) or (n_samples, n_features or n_attributes, n_interp)
-            a batch of latent vectors
+        z : Optional[tf.Tensor], (n_samples, n_interp), (n_samples, n_features or n_attributes, n_interp), (n_interp,), or (n_features or n_attributes, n_interp)
+            a batch of latent vectors, or interpolation points shared by all samples. If None, `interp_grid` is used.
         a : tf.Tensor, (n_samples, n_interp) or (n_samples, n_attributes, n_interp)
             a batch of attribute(s)
         """
@@ -119,15 +129,19 @@ class Monotonicity(KerasMetricWrapper):
         regularized dimensions, by default None
         Attribute `a[:, i]` is regularized by `z[:, reg_dim[i]]`. If `None`, `a[:, i]` is assumed to be regularized by `z[:, i]`.
     liad_mode : str, optional
-        options for calculating LIAD, by default "forward". Only "forward" is currently supported.
+        options for calculating LIAD, by default "forward". Must be one of {"forward", "central", "spline"}. If "forward", forward differences are used. If "central", second-order accurate central differences at the interior interpolation points are used. If "spline", the derivatives of the natural cubic spline through the interpolation points are used.
     reduce_mode : str, optional
         options for reduction of the return array, by default "attribute". Must be one of {"attribute", "samples", "all", "none"}. If "all", returns a scalar. If "attribute", an average is taken along the sample axis and the return array is of shape `(n_attributes,)`. If "samples", an average is taken along the attribute axis and the return array is of shape `(n_samples,)`. If "none", returns a smoothness matrix of shape `(n_samples, n_attributes,)`.
-    liad_thresh : float, optional
-        threshold for ignoring noisy 1st order LIAD, by default 1e-3
+    liad_thresh : Union[float, np.ndarray], optional
+        threshold for ignoring noisy 1st order LIAD, by default 1e-3. If a 1D array of thresholds is provided, the metric is curve-valued, and the output has an additional leading axis of size `n_thresholds`.
     degenerate_val : float, optional
         fill value for samples with all noisy LIAD (i.e., absolute value below `liad_thresh`), by default np.nan. Another possible option is to set this to 0.0.
     nanmean : bool, optional
         whether to ignore the NaN values in calculating the return array, by default True. Ignored if `reduce_mode` is "none". If all LIAD in an axis are NaNs, the return array in that axis is filled with NaNs.
+    interp_grid : Optional[np.ndarray], (n_interp,) or (n_features or n_attributes, n_interp), optional
+        interpolation points shared by all samples, by default None. If provided, `z` can be omitted from `update_state` and the grid is used for every batch instead.
+    top_k : Optional[int], optional
+        number of worst samples to track for each attribute, by default None. If provided, the indices and values of the `top_k` samples with the lowest absolute monotonicity since the last reset are kept with O(`top_k`) extra memory, and `compute` returns a dictionary with keys ['monotonicity', 'monotonicity_worst_indices', 'monotonicity_worst_scores'] instead. The worst samples are sorted from the worst along axis -2, and the sample indices count from the first sample after the last reset. Degenerate samples, with all LIAD below `liad_thresh`, are never counted as the worst, whatever `degenerate_val` is. If fewer than `top_k` samples are not degenerate, the remaining entries are degenerate samples with NaN scores.
 
     References
     ----------
@@ -139,9 +153,11 @@ class Monotonicity(KerasMetricWrapper):
         reg_dim: Optional[List[int]] = None,
         liad_mode: str = "forward",
         reduce_mode: str = "attribute",
-        liad_thresh: float = 1e-3,
+        liad_thresh: Union[float, np.ndarray] = 1e-3,
         degenerate_val: float = np.nan,
         nanmean: bool = True,
+        interp_grid: Optional[np.ndarray] = None,
+        top_k: Optional[int] = None,
     ):
         super().__init__(
             metric=C.Monotonicity,
@@ -151,16 +167,18 @@ class Monotonicity(KerasMetricWrapper):
             liad_thresh=liad_thresh,
             degenerate_val=degenerate_val,
             nanmean=nanmean,
+            interp_grid=interp_grid,
+            top_k=top_k,
         )
 
-    def update_state(self, z: tf.Tensor, a: tf.Tensor):
+    def update_state(self, z: Optional[tf.Tensor], a: tf.Tensor):
         """
         Update metric states. This function append the latent vectors and attributes to the internal state lists.
 
         Parameters
         ----------
-        z : tf.Tensor, (n_samples, n_interp) or (n_samples, n_features or n_attributes, n_interp)
-            a batch of latent vectors
+        z : Optional[tf.Tensor], (n_samples, n_interp), (n_samples, n_features or n_attributes, n_interp), (n_interp,), or (n_features or n_attributes, n_interp)
+            a batch of latent vectors, or interpolation points shared by all samples. If None, `interp_grid` is used.
         a : tf.Tensor, (n_samples, n_interp) or (n_samples, n_attributes, n_interp)
             a batch of attribute(s)
         """
@@ -14,8 +14,10 @@ import numpy as np
 from ...metrics.base import LatteMetric
 
 
-def _safe_numpy(t: tf.Tensor) -> np.ndarray:
-    if hasattr(t, "numpy"):
+def _safe_numpy(t: Optional[tf.Tensor]) -> Optional[np.ndarray]:
+    if t is None:
+        return None
+    elif hasattr(t, "numpy"):
         return t.numpy()
     else:
         raise RuntimeError(
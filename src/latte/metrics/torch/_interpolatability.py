@@ -0,0 +1,240 @@
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+import torch
+
+from ...functional._utils import _get_validation_level
+from ...functional.interpolatability import _utils
+
+
+# these torch operations are only all available from torch 1.10
+__NATIVE_OPS__ = ["diff", "amax", "amin", "movedim", "quantile", "nanmean"]
+
+
+def _has_native_ops() -> bool:
+    return all(hasattr(torch, op) for op in __NATIVE_OPS__)
+
+
+def _is_native(liad_mode: str, top_k: Optional[int]) -> bool:
+    # the other LIAD modes, the tracking of the worst samples, and older torch versions fall back to NumPy
+    return _has_native_ops() and liad_mode == "forward" and top_k is None
+
+
+def _validate_interp(z: torch.Tensor, strict: bool = True):
+    # value checks need a host sync, so they only run at the "full" validation level
+    if _get_validation_level() != "full":
+        return
+
+    dz = torch.diff(z, dim=-1)
+
+    if strict:
+        monotonic = torch.all(dz > 0, dim=-1) | torch.all(dz < 0, dim=-1)
+        if not bool(torch.all(monotonic)):
+            raise ValueError(
+                "`z` must be strictly monotonic along the interpolation axis."
+            )
+    elif bool(torch.any(torch.all(dz == 0, dim=-1))):
+        raise ValueError("`z` must not be constant along the interpolation axis.")
+
+
+def _prepare_za(
+    z: Union[torch.Tensor, np.ndarray],
+    a: torch.Tensor,
+    reg_dim: Optional[List[int]] = None,
+    min_size: int = 2,
+    strict: bool = True,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    # a shared grid given as np.ndarray is moved to the device of `a`
+    z = torch.as_tensor(z, device=a.device)
+    if not torch.is_floating_point(a):
+        a = a.to(torch.get_default_dtype())
+
+    z, a = _utils._validate_za_shape(z, a, reg_dim=reg_dim, min_size=min_size)
+    _validate_interp(z, strict=strict)
+
+    return z, a
+
+
+def _forward_liads(
+    z: torch.Tensor, a: torch.Tensor, order: int = 1
+) -> List[torch.Tensor]:
+    """
+    Calculate forward LIADs of all orders up to `order` with torch operations.
+
+    Parameters
+    ----------
+    z : torch.Tensor, (..., n_interp)
+        interpolation points
+    a : torch.Tensor, (..., n_interp)
+        attributes
+
+    Returns
+    -------
+    List[torch.Tensor]
+        LIADs of each order, from 1 to `order`, identical to `_finite_diff` with `mode="forward"`
+    """
+    liads = []
+    for _ in range(order):
+        a = torch.diff(a, dim=-1) / torch.diff(z, dim=-1)
+        z = 0.5 * (z[..., :-1] + z[..., 1:])
+        liads.append(a)
+
+    return liads
+
+
+def _lehmer_mean(x: torch.Tensor, p: float) -> torch.Tensor:
+    if p == 1.0:
+        den = torch.ones_like(x)
+    else:
+        den = torch.pow(x, p - 1.0)
+
+    out = torch.sum(x * den, dim=-1) / torch.sum(den, dim=-1)
+
+    # catch constant array, particularly all-zero axes
+    return torch.where(torch.all(x == x[..., :1], dim=-1), x[..., 0], out)
+
+
+def _get_sample_smoothness(
+    z: torch.Tensor,
+    liad1: torch.Tensor,
+    liad2: torch.Tensor,
+    max_mode: str = "lehmer",
+    ptp_mode: Union[float, str] = "naive",
+    clamp: bool = False,
+    p: float = 2.0,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    liad2abs = torch.abs(liad2)
+
+    if max_mode == "naive":
+        num = torch.amax(liad2abs, dim=-1)
+    elif max_mode == "lehmer":
+        num = _lehmer_mean(liad2abs, p=p)
+    else:
+        raise NotImplementedError
+
+    if ptp_mode == "naive":
+        den = torch.amax(liad1, dim=-1) - torch.amin(liad1, dim=-1)
+    elif isinstance(ptp_mode, float):
+        q = torch.tensor(
+            [0.5 - 0.5 * ptp_mode, 0.5 + 0.5 * ptp_mode],
+            dtype=liad1.dtype,
+            device=liad1.device,
+        )
+        qlo, qhi = torch.quantile(liad1, q, dim=-1)
+        den = qhi - qlo
+    else:
+        raise NotImplementedError
+
+    # mean spacing of the interpolation points, which may be unequal
+    z_interval = (z[..., -1] - z[..., 0]) / (z.shape[-1] - 1)
+
+    smth = 1.0 - num / (den / z_interval)
+
+    if clamp:
+        smth = torch.clamp(smth, 0.0, 1.0)
+
+    return smth, num == 0
+
+
+def _get_sample_monotonicity(
+    liad1: torch.Tensor,
+    liad_thresh: Union[float, np.ndarray] = 1e-3,
+    degenerate_val: float = np.nan,
+) -> torch.Tensor:
+    if np.ndim(liad_thresh) > 0:
+        # the thresholds are broadcast along a new leading axis
+        thresh = torch.as_tensor(
+            np.asarray(liad_thresh), dtype=liad1.dtype, device=liad1.device
+        ).reshape((-1,) + (1,) * liad1.ndim)
+    else:
+        thresh = liad_thresh
+
+    sgn = torch.sign(liad1 * (torch.abs(liad1) > thresh))
+    nz = torch.sum(sgn != 0, dim=-1)
+    ssgn = torch.sum(sgn, dim=-1)
+
+    return torch.where(nz == 0, torch.full_like(ssgn, degenerate_val), ssgn / nz)
+
+
+def _accumulate_samples(
+    sums: torch.Tensor,
+    counts: torch.Tensor,
+    values: List[torch.Tensor],
+    batch: torch.Tensor,
+    reduce_mode: str,
+    nanmean: bool = False,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    # the sample axis is moved first, as list states are concatenated along dim 0
+    if reduce_mode in ["sample", "none"]:
+        values.append(torch.movedim(batch, -2, 0))
+        return sums, counts
+
+    if nanmean:
+        isnan = torch.isnan(batch)
+        batch = torch.where(isnan, torch.zeros_like(batch), batch)
+        return sums + torch.sum(batch, dim=-2), counts + torch.sum(~isnan, dim=-2)
+
+    batch_sums = torch.sum(batch, dim=-2)
+    return sums + batch_sums, counts + torch.full_like(batch_sums, batch.shape[-2])
+
+
+def _concat_samples(values: List[torch.Tensor]) -> torch.Tensor:
+    return torch.movedim(torch.cat(values, dim=0), 0, -2)
+
+
+def _reduce_samples(
+    values: torch.Tensor, reduce_mode: str, nanmean: bool = False
+) -> torch.Tensor:
+    meanfunc = torch.nanmean if nanmean else torch.mean
+
+    if reduce_mode == "attribute":
+        return meanfunc(values, dim=-2)
+    elif reduce_mode == "sample":
+        return meanfunc(values, dim=-1)
+    elif reduce_mode == "all":
+        return meanfunc(values, dim=(-2, -1))
+    else:
+        return values
+
+
+def _reduce_accumulated(
+    sums: torch.Tensor, counts: torch.Tensor, reduce_mode: str
+) -> torch.Tensor:
+    if reduce_mode == "attribute":
+        return sums / counts
+    elif reduce_mode == "all":
+        return torch.sum(sums, dim=-1) / torch.sum(counts, dim=-1)
+    else:
+        raise NotImplementedError
+
+
+def _compute_smoothness(
+    sums: torch.Tensor,
+    counts: torch.Tensor,
+    values: List[torch.Tensor],
+    n_curved: torch.Tensor,
+    reduce_mode: str,
+) -> torch.Tensor:
+    # attributes without any curvature in all samples have a smoothness of 1.0
+    all_flat = n_curved == 0
+
+    if reduce_mode in ["sample", "none"]:
+        smth = _concat_samples(values)
+        smth = torch.where(all_flat[..., None, :], torch.ones_like(smth), smth)
+        return _reduce_samples(smth, reduce_mode)
+
+    sums = torch.where(all_flat, counts.to(sums.dtype), sums)
+    return _reduce_accumulated(sums, counts, reduce_mode)
+
+
+def _compute_monotonicity(
+    sums: torch.Tensor,
+    counts: torch.Tensor,
+    values: List[torch.Tensor],
+    reduce_mode: str,
+    nanmean: bool = True,
+) -> torch.Tensor:
+    if reduce_mode in ["sample", "none"]:
+        return _reduce_samples(_concat_samples(values), reduce_mode, nanmean)
+
+    return _reduce_accumulated(sums, counts, reduce_mode)
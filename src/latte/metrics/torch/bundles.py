@@ -5,6 +5,7 @@ import torch
 
 from ..torch.wrapper import TorchMetricWrapper
 from ..core import bundles as C
+from . import _interpolatability as T
 
 
 class DependencyAwareMutualInformationBundle(TorchMetricWrapper):
@@ -47,7 +48,7 @@ class DependencyAwareMutualInformationBundle(TorchMetricWrapper):
         """
         return super().update(z=z, a=a)
     
-    def compute(self) -> Dict[torch.Tensor]:
+    def compute(self) -> Dict[str, torch.Tensor]:
         """
         Compute metric values from the current state. The latent vectors and attributes in the internal states are concatenated along the sample dimension and passed to the metric function to obtain the metric values.
 
@@ -67,11 +68,13 @@ class LiadInterpolatabilityBundle(TorchMetricWrapper):
         max_mode: str = "lehmer",
         ptp_mode: Union[float, str] = "naive",
         reduce_mode: str = "attribute",
-        liad_thresh: float = 1e-3,
+        liad_thresh: Union[float, np.ndarray] = 1e-3,
         degenerate_val: float = np.nan,
         nanmean: bool = True,
         clamp: bool = False,
         p: float = 2.0,
+        interp_grid: Optional[np.ndarray] = None,
+        top_k: Optional[int] = None,
     ):
         super().__init__(
             metric=C.LiadInterpolatabilityBundle,
@@ -85,22 +88,77 @@ class LiadInterpolatabilityBundle(TorchMetricWrapper):
             nanmean=nanmean,
             clamp=clamp,
             p=p,
+            interp_grid=interp_grid,
+            top_k=top_k,
         )
 
-    def update(self, z: torch.Tensor, a: torch.Tensor):
+        # see the torch `Smoothness` and `Monotonicity` for the torch-native path
+        self.native = T._is_native(liad_mode, top_k)
+        if self.native:
+            for name in ["smoothness", "monotonicity"]:
+                self.add_state(name + "_sums", torch.zeros(()), dist_reduce_fx="sum")
+                self.add_state(name + "_counts", torch.zeros(()), dist_reduce_fx="sum")
+                self.add_state(name + "_values", [], dist_reduce_fx="cat")
+            self.add_state(
+                "n_curved", torch.zeros((), dtype=torch.long), dist_reduce_fx="sum"
+            )
+
+    def update(self, z: Optional[torch.Tensor], a: torch.Tensor):
         """
         Update metric states. This function append the latent vectors and attributes to the internal state lists.
 
         Parameters
         ----------
-        z : torch.Tensor, (n_samples, n_interp) or (n_samples, n_features or n_attributes, n_interp)
-            a batch of latent vectors
+        z : Optional[torch.Tensor], (n_samples, n_interp), (n_samples, n_features or n_attributes, n_interp), (n_interp,), or (n_features or n_attributes, n_interp)
+            a batch of latent vectors, or interpolation points shared by all samples. If None, `interp_grid` is used.
         a : torch.Tensor, (n_samples, n_interp) or (n_samples, n_attributes, n_interp)
             a batch of attribute(s)
         """
-        return super().update(z=z, a=a)
+        if not self.native:
+            return super().update(z=z, a=a)
+
+        if z is None:
+            assert (
+                self.metric.interp_grid is not None
+            ), "`z` must be provided if `interp_grid` is None"
+            z = self.metric.interp_grid
+
+        z, a = T._prepare_za(z, a, reg_dim=self.metric.reg_dim, min_size=3)
+        liad1, liad2 = T._forward_liads(z, a, order=2)
+
+        smth, flat = T._get_sample_smoothness(
+            z,
+            liad1,
+            liad2,
+            max_mode=self.metric.max_mode,
+            ptp_mode=self.metric.ptp_mode,
+            clamp=self.metric.clamp,
+            p=self.metric.p,
+        )
+        mntc = T._get_sample_monotonicity(
+            liad1,
+            liad_thresh=self.metric.liad_thresh,
+            degenerate_val=self.metric.degenerate_val,
+        )
+
+        self.n_curved = self.n_curved + torch.sum(~flat, dim=-2)
+        self.smoothness_sums, self.smoothness_counts = T._accumulate_samples(
+            self.smoothness_sums,
+            self.smoothness_counts,
+            self.smoothness_values,
+            smth,
+            self.metric.reduce_mode,
+        )
+        self.monotonicity_sums, self.monotonicity_counts = T._accumulate_samples(
+            self.monotonicity_sums,
+            self.monotonicity_counts,
+            self.monotonicity_values,
+            mntc,
+            self.metric.reduce_mode,
+            self.metric.nanmean,
+        )
     
-    def compute(self) -> Dict[torch.Tensor]:
+    def compute(self) -> Dict[str, torch.Tensor]:
         """
         Compute metric values from the current state. The latent vectors and attributes in the internal states are concatenated along the sample dimension and passed to the metric function to obtain the metric values.
 
@@ -109,4 +167,22 @@ class LiadInterpolatabilityBundle(TorchMetricWrapper):
         Dict[str, torch.Tensor]
             A dictionary of LIAD-based interpolatability metrics with keys ['smoothness', 'monotonicity'] each mapping to a corresponding metric torch.Tensor. See `reduce_mode` for details on the shape of the return arrays.
         """
-        return super().compute()
+        if not self.native:
+            return super().compute()
+
+        return {
+            "smoothness": T._compute_smoothness(
+                self.smoothness_sums,
+                self.smoothness_counts,
+                self.smoothness_values,
+                self.n_curved,
+                self.metric.reduce_mode,
+            ),
+            "monotonicity": T._compute_monotonicity(
+                self.monotonicity_sums,
+                self.monotonicity_counts,
+                self.monotonicity_values,
+                self.metric.reduce_mode,
+                self.metric.nanmean,
+            ),
+        }
@@ -3,6 +3,7 @@ import numpy as np
 import torch
 
 from ..core import interpolatability as C
+from . import _interpolatability as T
 from .wrapper import TorchMetricWrapper
 
 
@@ -26,13 +27,17 @@ class Smoothness(TorchMetricWrapper):
     
     .. math:: \mathcal{D}^{(n)}_{i, d}(\mathbf{z}; \delta) =\dfrac{{\mathcal{D}^{(n-1)}_i(\mathbf{z}+\delta \mathbf{e}_d) - \mathcal{D}^{(n-1)}_i(\mathbf{z})}}{\delta}.
 
+    The interpolation points need not be equally spaced, as long as they are strictly monotonic. With unequal spacing, the LIADs are computed as non-uniform divided differences, and :math:`\delta` in the normalization of smoothness is taken to be the mean spacing of the interpolation points.
+
+    If `liad_mode` is "forward", `top_k` is None, and torch is version 1.10 or later, smoothness is computed with torch operations on the device of the inputs, and only running sums and counts (or the per-sample values for `reduce_mode` "sample" or "none") are kept as metric states, so that no host round-trip is needed. Value checks on `z` still synchronize with the host unless `latte.VALIDATION_LEVEL` is set to "shape-only" or "off". Otherwise, the inputs are converted to np.ndarray and the metric is computed with NumPy.
+
     Parameters
     ----------
     reg_dim : Optional[List], optional
         regularized dimensions, by default None
         Attribute `a[:, i]` is regularized by `z[:, reg_dim[i]]`. If `None`, `a[:, i]` is assumed to be regularized by `z[:, i]`.
     liad_mode : str, optional
-        options for calculating LIAD, by default "forward". Only "forward" is currently supported.
+        options for calculating LIAD, by default "forward". Must be one of {"forward", "central", "spline"}. If "forward", forward differences are used. If "central", second-order accurate central differences at the interior interpolation points are used. If "spline", the derivatives of the natural cubic spline through the interpolation points are used.
     max_mode : str, optional
         options for calculating array maximum of 2nd order LIAD, by default "lehmer". Must be one of {"lehmer", "naive"}. If "lehmer", the maximum is calculated using the Lehmer mean with power `p`. If "naive", the maximum is calculated using the naive array maximum.
     ptp_mode : str, optional
@@ -42,8 +47,12 @@ class Smoothness(TorchMetricWrapper):
     clamp : bool, optional
         Whether to clamp smoothness to [0, 1], by default False
     p : float, optional
-        Lehmer mean power, by default 2.0 (i.e., contraharmonic mean). Only used if `max_mode == "lehmer"`. Must be greater than 1.0. 
-        
+        Lehmer mean power, by default 2.0 (i.e., contraharmonic mean). Only used if `max_mode == "lehmer"`. Must be greater than 1.0.
+    interp_grid : Optional[np.ndarray], (n_interp,) or (n_features or n_attributes, n_interp), optional
+        interpolation points shared by all samples, by default None. If provided, `z` can be omitted from `update_state` and the grid is used for every batch instead.
+    top_k : Optional[int], optional
+        number of worst samples to track for each attribute, by default None. If provided, the indices and values of the `top_k` samples with the lowest smoothness since the last reset are kept with O(`top_k`) extra memory, and `compute` returns a dictionary with keys ['smoothness', 'smoothness_worst_indices', 'smoothness_worst_scores'] instead. The worst samples are sorted from the worst along axis -2, and the sample indices count from the first sample after the last reset.
+
     References
     ----------
     .. [1] K. N. Watcharasupat, “Controllable Music: Supervised Learning of Disentangled Representations for Music Generation”, 2021.
@@ -58,6 +67,8 @@ class Smoothness(TorchMetricWrapper):
         reduce_mode: str = "attribute",
         clamp: bool = False,
         p: float = 2.0,
+        interp_grid: Optional[np.ndarray] = None,
+        top_k: Optional[int] = None,
     ):
         super().__init__(
             metric=C.Smoothness,
@@ -68,20 +79,56 @@ class Smoothness(TorchMetricWrapper):
             reduce_mode=reduce_mode,
             clamp=clamp,
             p=p,
+            interp_grid=interp_grid,
+            top_k=top_k,
         )
 
-    def update(self, z: torch.Tensor, a: torch.Tensor):
+        self.native = T._is_native(liad_mode, top_k)
+        if self.native:
+            self.add_state("sums", torch.zeros(()), dist_reduce_fx="sum")
+            self.add_state("counts", torch.zeros(()), dist_reduce_fx="sum")
+            self.add_state("values", [], dist_reduce_fx="cat")
+            self.add_state(
+                "n_curved", torch.zeros((), dtype=torch.long), dist_reduce_fx="sum"
+            )
+
+    def update(self, z: Optional[torch.Tensor], a: torch.Tensor):
         """
         Update metric states. This function append the latent vectors and attributes to the internal state lists.
 
         Parameters
         ----------
-        z : torch.Tensor, (n_samples, n_interp) or (n_samples, n_features or n_attributes, n_interp)
-            a batch of latent vectors
+        z : Optional[torch.Tensor], (n_samples, n_interp), (n_samples, n_features or n_attributes, n_interp), (n_interp,), or (n_features or n_attributes, n_interp)
+            a batch of latent vectors, or interpolation points shared by all samples. If None, `interp_grid` is used.
         a : torch.Tensor, (n_samples, n_interp) or (n_samples, n_attributes, n_interp)
             a batch of attribute(s)
         """
-        return super().update(z=z, a=a)
+        if not self.native:
+            return super().update(z=z, a=a)
+
+        if z is None:
+            assert (
+                self.metric.interp_grid is not None
+            ), "`z` must be provided if `interp_grid` is None"
+            z = self.metric.interp_grid
+
+        z, a = T._prepare_za(z, a, reg_dim=self.metric.reg_dim, min_size=3)
+        liad1, liad2 = T._forward_liads(z, a, order=2)
+
+        smth, flat = T._get_sample_smoothness(
+            z,
+            liad1,
+            liad2,
+            max_mode=self.metric.max_mode,
+            ptp_mode=self.metric.ptp_mode,
+            clamp=self.metric.clamp,
+            p=self.metric.p,
+        )
+
+        self.n_curved = self.n_curved + torch.sum(~flat, dim=-2)
+        self.sums, self.counts = T._accumulate_samples(
+            self.sums, self.counts, self.values, smth, self.metric.reduce_mode
+        )
     
     def compute(self) -> torch.Tensor:
         """
@@ -92,7 +139,12 @@ class Smoothness(TorchMetricWrapper):
         torch.Tensor, (n_attributes,)
             Smoothness array. See `reduce mode` for return shape.
         """
-        return super().compute()
+        if not self.native:
+            return super().compute()
+
+        return T._compute_smoothness(
+            self.sums, self.counts, self.values, self.n_curved, self.metric.reduce_mode
+        )
 
 
 class Monotonicity(TorchMetricWrapper):
@@ -112,21 +164,27 @@ class Monotonicity(TorchMetricWrapper):
     where :math:`\mathcal{A}_i(\cdot)` is the measurement of attribute :math:`a_i` from a sample generated from its latent vector argument, :math:`d` is the latent dimension regularizing :math:`a_i`, :math:`\delta>0` is the latent step size.
 
     
+    If `liad_mode` is "forward", `top_k` is None, and torch is version 1.10 or later, monotonicity is computed with torch operations on the device of the inputs, and only running sums and counts (or the per-sample values for `reduce_mode` "sample" or "none") are kept as metric states, so that no host round-trip is needed. Value checks on `z` still synchronize with the host unless `latte.VALIDATION_LEVEL` is set to "shape-only" or "off". Otherwise, the inputs are converted to np.ndarray and the metric is computed with NumPy.
+
     Parameters
     ----------
     reg_dim : Optional[List], optional
         regularized dimensions, by default None
         Attribute `a[:, i]` is regularized by `z[:, reg_dim[i]]`. If `None`, `a[:, i]` is assumed to be regularized by `z[:, i]`.
     liad_mode : str, optional
-        options for calculating LIAD, by default "forward". Only "forward" is currently supported.
+        options for calculating LIAD, by default "forward". Must be one of {"forward", "central", "spline"}. If "forward", forward differences are used. If "central", second-order accurate central differences at the interior interpolation points are used. If "spline", the derivatives of the natural cubic spline through the interpolation points are used.
     reduce_mode : str, optional
         options for reduction of the return array, by default "attribute". Must be one of {"attribute", "samples", "all", "none"}. If "all", returns a scalar. If "attribute", an average is taken along the sample axis and the return array is of shape `(n_attributes,)`. If "samples", an average is taken along the attribute axis and the return array is of shape `(n_samples,)`. If "none", returns a smoothness matrix of shape `(n_samples, n_attributes,)`.
-    liad_thresh : float, optional
-        threshold for ignoring noisy 1st order LIAD, by default 1e-3
+    liad_thresh : Union[float, np.ndarray], optional
+        threshold for ignoring noisy 1st order LIAD, by default 1e-3. If a 1D array of thresholds is provided, the metric is curve-valued, and the output has an additional leading axis of size `n_thresholds`.
     degenerate_val : float, optional
         fill value for samples with all noisy LIAD (i.e., absolute value below `liad_thresh`), by default np.nan. Another possible option is to set this to 0.0.
     nanmean : bool, optional
         whether to ignore the NaN values in calculating the return array, by default True. Ignored if `reduce_mode` is "none". If all LIAD in an axis are NaNs, the return array in that axis is filled with NaNs.
+    interp_grid : Optional[np.ndarray], (n_interp,) or (n_features or n_attributes, n_interp), optional
+        interpolation points shared by all samples, by default None. If provided, `z` can be omitted from `update_state` and the grid is used for every batch instead.
+    top_k : Optional[int], optional
+        number of worst samples to track for each attribute, by default None. If provided, the indices and values of the `top_k` samples with the lowest absolute monotonicity since the last reset are kept with O(`top_k`) extra memory, and `compute` returns a dictionary with keys ['monotonicity', 'monotonicity_worst_indices', 'monotonicity_worst_scores'] instead. The worst samples are sorted from the worst along axis -2, and the sample indices count from the first sample after the last reset. Degenerate samples, with all LIAD below `liad_thresh`, are never counted as the worst, whatever `degenerate_val` is. If fewer than `top_k` samples are not degenerate, the remaining entries are degenerate samples with NaN scores.
 
     References
     ----------
@@ -138,9 +196,11 @@ class Monotonicity(TorchMetricWrapper):
         reg_dim: Optional[List[int]] = None,
         liad_mode: str = "forward",
         reduce_mode: str = "attribute",
-        liad_thresh: float = 1e-3,
+        liad_thresh: Union[float, np.ndarray] = 1e-3,
         degenerate_val: float = np.nan,
         nanmean: bool = True,
+        interp_grid: Optional[np.ndarray] = None,
+        top_k: Optional[int] = None,
     ):
         super().__init__(
             metric=C.Monotonicity,
@@ -150,20 +210,55 @@ class Monotonicity(TorchMetricWrapper):
             liad_thresh=liad_thresh,
             degenerate_val=degenerate_val,
             nanmean=nanmean,
+            interp_grid=interp_grid,
+            top_k=top_k,
         )
 
-    def update(self, z: torch.Tensor, a: torch.Tensor):
+        self.native = T._is_native(liad_mode, top_k)
+        if self.native:
+            self.add_state("sums", torch.zeros(()), dist_reduce_fx="sum")
+            self.add_state("counts", torch.zeros(()), dist_reduce_fx="sum")
+            self.add_state("values", [], dist_reduce_fx="cat")
+
+    def update(self, z: Optional[torch.Tensor], a: torch.Tensor):
         """
         Update metric states. This function append the latent vectors and attributes to the internal state lists.
 
         Parameters
         ----------
-        z : torch.Tensor, (n_samples, n_interp) or (n_samples, n_features or n_attributes, n_interp)
-            a batch of latent vectors
+        z : Optional[torch.Tensor], (n_samples, n_interp), (n_samples, n_features or n_attributes, n_interp), (n_interp,), or (n_features or n_attributes, n_interp)
+            a batch of latent vectors, or interpolation points shared by all samples. If None, `interp_grid` is used.
         a : torch.Tensor, (n_samples, n_interp) or (n_samples, n_attributes, n_interp)
             a batch of attribute(s)
         """
-        return super().update(z=z, a=a)
+        if not self.native:
+            return super().update(z=z, a=a)
+
+        if z is None:
+            assert (
+                self.metric.interp_grid is not None
+            ), "`z` must be provided if `interp_grid` is None"
+            z = self.metric.interp_grid
+
+        z, a = T._prepare_za(
+            z, a, reg_dim=self.metric.reg_dim, min_size=2, strict=False
+        )
+        (liad1,) = T._forward_liads(z, a, order=1)
+
+        mntc = T._get_sample_monotonicity(
+            liad1,
+            liad_thresh=self.metric.liad_thresh,
+            degenerate_val=self.metric.degenerate_val,
+        )
+
+        self.sums, self.counts = T._accumulate_samples(
+            self.sums,
+            self.counts,
+            self.values,
+            mntc,
+            self.metric.reduce_mode,
+            self.metric.nanmean,
+        )
     
     def compute(self) -> torch.Tensor:
         """
@@ -174,4 +269,13 @@ class Monotonicity(TorchMetricWrapper):
         torch.Tensor, (n_attributes,)
             Monotonicity array. See `reduce mode` for return shape.
         """
-        return super().compute()
+        if not self.native:
+            return super().compute()
+
+        return T._compute_monotonicity(
+            self.sums,
+            self.counts,
+            self.values,
+            self.metric.reduce_mode,
+            self.metric.nanmean,
+        )
@@ -18,19 +18,23 @@ from ...metrics.base import LatteMetric
 
 
 def _torch_to_numpy(args, kwargs):
-    args = [a.detach().cpu().numpy() for a in args]
-    kwargs = {k: kwargs[k].detach().cpu().numpy() for k in kwargs}
+    args = [a.detach().cpu().numpy() if a is not None else None for a in args]
+    kwargs = {
+        k: kwargs[k].detach().cpu().numpy() if kwargs[k] is not None else None
+        for k in kwargs
+    }
 
     return args, kwargs
 
 
 def _numpy_to_torch(val):
-    if isinstance(val, np.ndarray):
-        return torch.from_numpy(val)
+    if isinstance(val, (np.ndarray, np.generic)):
+        # fully reduced outputs may be NumPy scalars
+        return torch.from_numpy(np.asarray(val))
     elif isinstance(val, list):
-        return [torch.from_numpy(v) for v in val]
+        return [_numpy_to_torch(v) for v in val]
     elif isinstance(val, dict):
-        return {k: torch.from_numpy(val[k]) for k in val}
+        return {k: _numpy_to_torch(val[k]) for k in val}
     else:
         raise TypeError
 
@@ -106,6 +110,8 @@ class TorchMetricWrapper(tm.Metric):
         return _numpy_to_torch(self.metric.compute())
 
     def reset(self):
+        # torch-native states, if any, are reset along with the Latte metric
+        super().reset()
         return self.metric.reset_state()
 
     def __getattr__(self, name: str):
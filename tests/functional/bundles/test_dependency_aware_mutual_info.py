@@ -36,3 +36,57 @@ class TestDMIBundle:
 
                 for key in ["MIG", "DMIG", "DLIG", "XMIG"]:
                     np.testing.assert_allclose(bundle_out[key], indiv_out[key])
+
+    def test_anytime(self):
+        z = np.random.randn(1000, 8)
+        a = np.random.randn(1000, 3)
+
+        bundle_out, n_used, converged = dependency_aware_mutual_info_bundle(
+            z, a, anytime=True, anytime_tol=0.0, anytime_min_samples=50
+        )
+
+        assert n_used == 1000
+        assert not converged
+
+        full_out = dependency_aware_mutual_info_bundle(z, a)
+        for key in ["MIG", "DMIG", "DLIG", "XMIG"]:
+            np.testing.assert_allclose(bundle_out[key], full_out[key])
+
+        _, n_used, converged = dependency_aware_mutual_info_bundle(
+            z, a, anytime=True, anytime_tol=np.inf, anytime_min_samples=50
+        )
+
+        assert n_used == 200
+        assert converged
+
+    def test_masked_values(self):
+        z = np.random.randn(64, 8)
+        a = np.random.randn(64, 3)
+        a[:10, 0] = np.nan
+        a[20:25, 2] = np.nan
+
+        bundle_out = dependency_aware_mutual_info_bundle(z, a)
+        indiv_out = {
+            "MIG": mig(z, a, reg_dim=[0, 1, 2]),
+            "DMIG": dmig(z, a),
+            "DLIG": dlig(z, a),
+            "XMIG": xmig(z, a),
+        }
+
+        for key in ["MIG", "DMIG", "DLIG", "XMIG"]:
+            np.testing.assert_allclose(bundle_out[key], indiv_out[key])
+
+    def test_groups(self):
+        z = np.random.randn(96, 8)
+        a = np.random.randn(96, 3)
+        groups = np.random.randint(3, size=(96,))
+
+        bundle_out = dependency_aware_mutual_info_bundle(z, a, groups=groups)
+
+        assert sorted(bundle_out.keys()) == [0, 1, 2]
+        for g in bundle_out:
+            indiv_out = dependency_aware_mutual_info_bundle(
+                z[groups == g], a[groups == g]
+            )
+            for key in ["MIG", "DMIG", "DLIG", "XMIG"]:
+                np.testing.assert_allclose(bundle_out[g][key], indiv_out[key])
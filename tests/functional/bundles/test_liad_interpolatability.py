@@ -1,9 +1,11 @@
 import warnings
 
 import numpy as np
+import pytest
 
 from latte.functional.bundles.liad_interpolatability import (
     liad_interpolatability_bundle,
+    liad_interpolatability_sweep,
 )
 from latte.functional.interpolatability.monotonicity import monotonicity
 from latte.functional.interpolatability.smoothness import smoothness
@@ -84,3 +86,119 @@ class TestLiadInterp:
                                                             bundle_out[key],
                                                             indiv_out[key],
                                                         )
+
+
+def test_groups():
+    z = np.repeat(np.repeat(np.arange(16)[None, None, :], 8, axis=0), 3, axis=1)
+    a = np.random.randn(8, 3, 16)
+    groups = np.array([1, 0, 1, 1, 0, 2, 2, 0])
+
+    bundle_out = liad_interpolatability_bundle(z, a, groups=groups)
+
+    assert sorted(bundle_out.keys()) == [0, 1, 2]
+    for g in bundle_out:
+        indiv_out = liad_interpolatability_bundle(z[groups == g], a[groups == g])
+        for key in ["smoothness", "monotonicity"]:
+            np.testing.assert_allclose(bundle_out[g][key], indiv_out[key])
+
+
+def test_chunked_memmap(tmp_path):
+    z = np.repeat(np.repeat(np.arange(16)[None, None, :], 10, axis=0), 3, axis=1)
+    a = np.random.randn(10, 3, 16)
+    np.save(tmp_path / "z.npy", z)
+    np.save(tmp_path / "a.npy", a)
+
+    zm = np.load(tmp_path / "z.npy", mmap_mode="r")
+    am = np.load(tmp_path / "a.npy", mmap_mode="r")
+    groups = np.array([1, 0, 1, 1, 0, 2, 2, 0, 1, 2])
+
+    chunked_out = liad_interpolatability_bundle(zm, am, groups=groups, chunk_size=4)
+    bundle_out = liad_interpolatability_bundle(z, a, groups=groups)
+
+    for g in bundle_out:
+        for key in ["smoothness", "monotonicity"]:
+            np.testing.assert_allclose(chunked_out[g][key], bundle_out[g][key])
+
+
+def test_sweep():
+    z = np.repeat(np.repeat(np.arange(16)[None, None, :], 8, axis=0), 3, axis=1)
+    a = np.random.randn(8, 3, 16)
+    a[:, 1, :] = 2.0 * z[:, 1, :]
+
+    max_modes = ["lehmer", "naive"]
+    ps = [1.5, 2.0, 3.0]
+    ptp_modes = ["naive", 0.9, 0.5]
+    reduce_modes = ["attribute", "sample", "all", "none"]
+    liad_threshs = [1e-3, 0.5]
+
+    out = liad_interpolatability_sweep(
+        z,
+        a,
+        max_modes=max_modes,
+        ps=ps,
+        ptp_modes=ptp_modes,
+        reduce_modes=reduce_modes,
+        liad_threshs=liad_threshs,
+    )
+
+    assert len(out["smoothness"]) == 2 * 3 * 3 * 4
+    assert len(out["monotonicity"]) == 2 * 4
+
+    for (max_mode, p, ptp_mode, reduce_mode), val in out["smoothness"].items():
+        np.testing.assert_allclose(
+            val,
+            smoothness(
+                z, a, max_mode=max_mode, p=p, ptp_mode=ptp_mode, reduce_mode=reduce_mode
+            ),
+        )
+
+    for (liad_thresh, reduce_mode), val in out["monotonicity"].items():
+        np.testing.assert_allclose(
+            val, monotonicity(z, a, liad_thresh=liad_thresh, reduce_mode=reduce_mode)
+        )
+
+
+def test_sweep_bad_config():
+    z = np.repeat(np.repeat(np.arange(16)[None, None, :], 8, axis=0), 3, axis=1)
+    a = np.random.randn(8, 3, 16)
+
+    with pytest.raises(ValueError):
+        liad_interpolatability_sweep(z, a, ps=[2.0, 0.5])
+
+
+def test_model_axis():
+    z = np.repeat(np.repeat(np.arange(16)[None, None, :], 8, axis=0), 3, axis=1)
+    a = np.random.randn(4, 8, 3, 16)
+
+    bundle_out = liad_interpolatability_bundle(
+        np.stack([z] * 4), a, reduce_mode="none", model_axis=True
+    )
+
+    for m in range(4):
+        indiv_out = liad_interpolatability_bundle(z, a[m], reduce_mode="none")
+        for key in ["smoothness", "monotonicity"]:
+            np.testing.assert_allclose(bundle_out[key][m], indiv_out[key])
+
+
+def test_ragged():
+    sizes = [5, 8, 16, 3]
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    z = np.concatenate([np.sort(np.random.randn(n)) for n in sizes])
+    a = np.random.randn(offsets[-1], 3)
+
+    for ptp_mode in ["naive", 0.8]:
+        for reduce_mode in ["attribute", "none"]:
+            out = liad_interpolatability_bundle(
+                z, a, ptp_mode=ptp_mode, reduce_mode=reduce_mode, offsets=offsets
+            )
+
+            np.testing.assert_allclose(
+                out["smoothness"],
+                smoothness(
+                    z, a, ptp_mode=ptp_mode, reduce_mode=reduce_mode, offsets=offsets
+                ),
+            )
+            np.testing.assert_allclose(
+                out["monotonicity"],
+                monotonicity(z, a, reduce_mode=reduce_mode, offsets=offsets),
+            )
@@ -132,6 +132,15 @@ class TestMIG:
         assert mig.shape[0] == a.shape[-1]
 
 
+    def test_mig_max_samples(self):
+        z = np.random.randn(64, 8)
+        a = np.random.randint(4, size=(64, 3))
+
+        mig = mi.mig(z, a, discrete=True, max_samples=32)
+
+        assert mig.shape == (3,)
+
+
 class TestDMIG:
     def test_dmig_shape(self):
         for _ in range(10):
@@ -187,3 +196,140 @@ class TestDLIG:
 
         with pytest.raises(AssertionError):
             mi.dlig(z, a)
+
+
+class TestAnytime:
+    def test_mig_converged(self):
+        z = np.random.randn(1000, 8)
+        a = np.random.randn(1000, 3)
+
+        val, n_used, converged = mi.mig(
+            z, a, anytime=True, anytime_tol=np.inf, anytime_min_samples=50
+        )
+
+        assert val.shape == (3,)
+        assert n_used == 200
+        assert converged
+
+    def test_mig_not_converged(self):
+        z = np.random.randn(1000, 8)
+        a = np.random.randn(1000, 3)
+
+        val, n_used, converged = mi.mig(
+            z, a, anytime=True, anytime_tol=0.0, anytime_min_samples=50
+        )
+
+        assert n_used == 1000
+        assert not converged
+        np.testing.assert_allclose(val, mi.mig(z, a))
+
+    def test_dmig_converged(self):
+        z = np.random.randn(1000, 8)
+        a = np.random.randn(1000, 3)
+
+        val, n_used, converged = mi.dmig(
+            z, a, anytime=True, anytime_tol=np.inf, anytime_min_samples=50
+        )
+
+        assert val.shape == (3,)
+        assert n_used == 200
+        assert converged
+
+    def test_dmig_not_converged(self):
+        z = np.random.randn(1000, 8)
+        a = np.random.randn(1000, 3)
+
+        val, n_used, converged = mi.dmig(
+            z, a, anytime=True, anytime_tol=0.0, anytime_min_samples=50
+        )
+
+        assert n_used == 1000
+        assert not converged
+        np.testing.assert_allclose(val, mi.dmig(z, a))
+
+    def test_sample_sizes(self):
+        assert _utils._anytime_sample_sizes(1000, 50) == [50, 200, 800, 1000]
+        assert _utils._anytime_sample_sizes(800, 50) == [50, 200, 800]
+        assert _utils._anytime_sample_sizes(10, 50) == [10]
+
+
+class TestMasked:
+    def _masked_za(self):
+        z = np.random.randn(64, 8)
+        a = np.random.randn(64, 3)
+        a[:10, 0] = np.nan
+        a[20:25, 2] = np.nan
+        return z, a
+
+    def test_mig_nan(self):
+        z, a = self._masked_za()
+
+        val = mi.mig(z, a)
+
+        for i in range(3):
+            rows = ~np.isnan(a[:, i])
+            np.testing.assert_allclose(val[i], mi.mig(z[rows], a[rows, i])[0])
+
+    def test_mig_mask(self):
+        z = np.random.randn(64, 8)
+        a = np.random.randn(64, 3)
+        mask = np.ones((64, 3), dtype=bool)
+        mask[:10, 1] = False
+
+        val = mi.mig(z, a, mask=mask)
+
+        np.testing.assert_allclose(val[1], mi.mig(z[10:], a[10:, 1])[0])
+        np.testing.assert_allclose(val[[0, 2]], mi.mig(z, a)[[0, 2]])
+
+    def test_mig_sample_mask(self):
+        z, a = self._masked_za()
+        mask = np.ones((64,), dtype=bool)
+        mask[40:] = False
+
+        val = mi.mig(z, a, mask=mask)
+
+        np.testing.assert_allclose(val, mi.mig(z[:40], a[:40]))
+
+    def test_dmig_nan(self):
+        z, a = self._masked_za()
+
+        val = mi.dmig(z, a)
+
+        assert val.shape == (3,)
+        assert np.all(np.isfinite(val))
+
+    def test_dlig_xmig_nan(self):
+        z, a = self._masked_za()
+
+        assert np.all(np.isfinite(mi.dlig(z, a)))
+        assert np.all(np.isfinite(mi.xmig(z, a)))
+
+
+class TestGrouped:
+    def test_grouped(self):
+        z = np.random.randn(96, 8)
+        a = np.random.randn(96, 3)
+        groups = np.random.randint(3, size=(96,))
+
+        for func in [mi.mig, mi.dmig, mi.dlig, mi.xmig]:
+            val = func(z, a, groups=groups)
+
+            assert sorted(val.keys()) == [0, 1, 2]
+            for g in val:
+                np.testing.assert_allclose(
+                    val[g], func(z[groups == g], a[groups == g])
+                )
+
+    def test_grouped_mask(self):
+        z = np.random.randn(96, 8)
+        a = np.random.randn(96, 3)
+        mask = np.random.rand(96, 3) > 0.2
+        groups = np.random.randint(2, size=(96,))
+
+        val = mi.mig(z, a, mask=mask, groups=groups)
+
+        for g in val:
+            rows = groups == g
+            np.testing.assert_allclose(
+                val[g], mi.mig(z[rows], a[rows], mask=mask[rows])
+            )
@@ -65,3 +65,16 @@ class TestModularity:
         mod_score = modularity(z, a, discrete=True)
         assert mod_score.ndim == 1
         assert mod_score.shape[0] == 8
+
+    def test_groups(self):
+        z = np.random.randn(96, 8)
+        a = np.random.randn(96, 3)
+        groups = np.random.randint(3, size=(96,))
+
+        mod_score = modularity(z, a, groups=groups)
+
+        assert sorted(mod_score.keys()) == [0, 1, 2]
+        for g in mod_score:
+            np.testing.assert_allclose(
+                mod_score[g], modularity(z[groups == g], a[groups == g])
+            )
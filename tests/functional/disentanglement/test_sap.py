@@ -143,3 +143,134 @@ class TestSAP:
         sap_score = sap.sap(z, a, discrete=True)
         assert sap_score.ndim == 1
         assert sap_score.shape[0] == 3
+
+    def test_max_samples(self):
+        z = np.random.randn(64, 8)
+        a = np.random.randn(64, 3) > 0.0
+
+        sap_score = sap.sap(z, a, discrete=True, max_samples=32)
+        assert sap_score.shape == (3,)
+
+        np.testing.assert_allclose(
+            sap.sap(z, a, discrete=True, max_samples=64), sap.sap(z, a, discrete=True)
+        )
+
+    def test_mask_continuous(self):
+        z = np.random.randn(64, 8)
+        a = np.random.randn(64, 3)
+        a[:10, 1] = np.nan
+
+        sap_score = sap.sap(z, a)
+
+        np.testing.assert_allclose(sap_score[1], sap.sap(z[10:], a[10:, 1])[0])
+        np.testing.assert_allclose(
+            sap_score[[0, 2]], sap.sap(z, a[:, [0, 2]])
+        )
+
+    def test_mask_discrete(self):
+        z = np.random.randn(64, 8)
+        a = np.random.randn(64, 2) > 0.0
+        mask = np.ones((64, 2), dtype=bool)
+        mask[:10, 1] = False
+
+        sap_score = sap.sap(z, a, discrete=True, mask=mask)
+
+        np.testing.assert_allclose(
+            sap_score[1], sap.sap(z[10:], a[10:, 1], discrete=True)[0]
+        )
+
+    def test_groups(self):
+        z = np.random.randn(96, 8)
+        a = np.random.randn(96, 3)
+        groups = np.random.randint(3, size=(96,))
+
+        sap_score = sap.sap(z, a, groups=groups)
+
+        assert sorted(sap_score.keys()) == [0, 1, 2]
+        for g in sap_score:
+            np.testing.assert_allclose(
+                sap_score[g], sap.sap(z[groups == g], a[groups == g])
+            )
+
+    def test_groups_exact(self):
+        z = np.random.randn(96, 8)
+        z[:, 2] = np.round(z[:, 2])
+        a = np.random.randint(3, size=(96, 2))
+        mask = np.random.rand(96, 2) > 0.2
+        groups = np.random.randint(4, size=(96,))
+
+        sap_score = sap.sap(
+            z, a, discrete=True, mask=mask, groups=groups, discrete_mode="exact"
+        )
+
+        for g in sap_score:
+            rows = groups == g
+            np.testing.assert_allclose(
+                sap_score[g],
+                sap.sap(
+                    z[rows],
+                    a[rows],
+                    discrete=True,
+                    mask=mask[rows],
+                    discrete_mode="exact",
+                ),
+            )
+
+    def test_grouped_rank_order(self):
+        z = np.round(np.random.randn(50, 4))
+        groups = np.random.randint(3, size=(50,))
+
+        keys, slices, (zs,) = sap._sort_by_group(groups, z)
+        order = sap._get_grouped_rank_order(zs, slices)
+
+        for g, sl in zip(keys, slices):
+            rows = groups == g
+            np.testing.assert_equal(
+                order[sl], np.argsort(z[rows], axis=0, kind="stable")
+            )
+
+    def test_continuous_score_matrix(self):
+        z = np.random.randn(64, 8)
+        z[:, 3] = 1.0
+        a = np.random.randn(64, 3)
+
+        score = sap._get_continuous_sap_score(z, a)
+
+        expected = np.zeros((8, 3))
+        for i in range(8):
+            for j in range(3):
+                cov = np.cov(z[:, i], a[:, j], ddof=1)
+                if cov[0, 0] > 1e-12:
+                    expected[i, j] = np.square(cov[0, 1]) / (cov[0, 0] * cov[1, 1])
+
+        np.testing.assert_allclose(score, expected)
+
+    def test_discrete_exact_binary(self):
+        z = np.round(np.random.randn(64, 8), 1)
+        a = (z[:, 2] + np.random.randn(64) > 0.0)[:, None]
+
+        exact = sap._get_exact_discrete_sap_score(z, a)
+        svc = sap._get_discrete_sap_score(z, a)
+
+        assert np.all(exact >= svc - 1e-12)
+
+        for i in range(8):
+            best = max(np.mean(a[:, 0]), np.mean(~a[:, 0]))
+            for thresh in np.unique(z[:, i]):
+                pred = z[:, i] >= thresh
+                best = max(best, np.mean(pred == a[:, 0]), np.mean(pred != a[:, 0]))
+            np.testing.assert_allclose(exact[i, 0], best)
+
+    def test_discrete_exact_multiclass(self):
+        z = np.random.randn(64, 4)
+        a = np.digitize(z[:, 1], [-0.5, 0.5])
+
+        score = sap._get_exact_discrete_sap_score(z, a[:, None])
+
+        np.testing.assert_allclose(score[1], [1.0])
+        assert np.all(score >= np.max(np.bincount(a)) / 64)
+        assert np.all(score < 1.0 + 1e-12)
+
+    def test_bad_discrete_mode(self):
+        with pytest.raises(AssertionError):
+            sap.sap(np.random.randn(16, 4), np.random.randn(16, 2), discrete_mode="svm")
@@ -76,3 +76,122 @@ class TestShape:
             _utils._validate_za_shape(
                 np.random.randn(16, 32), np.random.randn(16, 2), list(range(3))
             )
+
+
+class TestSubsample:
+    def test_no_subsample(self):
+        z = np.random.randn(16, 8)
+        a = np.random.randn(16, 3)
+
+        zs, as_, _ = _utils._subsample_za(z, a, None)
+        assert zs is z and as_ is a
+
+        zs, as_, _ = _utils._subsample_za(z, a, 16)
+        assert zs is z and as_ is a
+
+    def test_continuous(self):
+        z = np.random.randn(100, 8)
+        a = np.random.randn(100, 3)
+
+        zs, as_, _ = _utils._subsample_za(z, a, 10)
+
+        assert zs.shape == (10, 8)
+        assert as_.shape == (10, 3)
+
+        idx = np.flatnonzero(np.isin(a[:, 0], as_[:, 0]))
+        np.testing.assert_equal(zs, z[idx])
+
+    def test_stratified_keeps_rare_class(self):
+        z = np.random.randn(1000, 8)
+        a = np.zeros((1000, 1), dtype=int)
+        a[:5] = 1
+        a[5:505] = 2
+
+        _, as_, _ = _utils._subsample_za(z, a, 50, discrete=True)
+
+        assert as_.shape[0] == 50
+        assert np.sum(as_ == 1) >= 1
+        assert np.sum(as_ == 2) == 25
+        assert np.sum(as_ == 0) in [24, 25]
+
+    def test_stratified_many_attributes(self):
+        z = np.random.randn(200, 8)
+        a = np.random.randint(2, size=(200, 12)).astype(float)
+        a[::7, 0] = np.nan
+
+        zs, as_, _ = _utils._subsample_za(z, a, 20, discrete=True)
+
+        assert zs.shape[0] == 20
+        for j in range(12):
+            assert np.sum(as_[:, j] == 0) >= 1
+            assert np.sum(as_[:, j] == 1) >= 1
+
+        _, as_, _ = _utils._subsample_za(z, a, 10, discrete=True)
+        assert as_.shape[0] == 10
+
+    def test_seeded(self):
+        z = np.random.randn(100, 8)
+        a = np.random.randint(4, size=(100, 2))
+
+        zs1, _, _ = _utils._subsample_za(z, a, 20, discrete=True)
+        zs2, _, _ = _utils._subsample_za(z, a, 20, discrete=True)
+
+        np.testing.assert_equal(zs1, zs2)
+
+
+class TestAttrMask:
+    def test_all_valid(self):
+        a = np.random.randn(16, 3)
+
+        assert _utils._validate_attr_mask(a) is None
+        assert _utils._validate_attr_mask(a, np.ones((16, 3), dtype=bool)) is None
+
+    def test_nan(self):
+        a = np.random.randn(16, 3)
+        a[2, 1] = np.nan
+
+        valid = _utils._validate_attr_mask(a)
+
+        assert valid.shape == (16, 3)
+        assert not valid[2, 1]
+        assert np.sum(~valid) == 1
+
+    def test_mask_and_nan(self):
+        a = np.random.randn(16, 3)
+        a[2, 1] = np.nan
+        mask = np.ones((16, 3), dtype=bool)
+        mask[5, 0] = False
+
+        valid = _utils._validate_attr_mask(a, mask)
+
+        assert not valid[2, 1]
+        assert not valid[5, 0]
+        assert np.sum(~valid) == 2
+
+    def test_sample_mask(self):
+        a = np.random.randn(16, 3)
+        a[2, 1] = np.nan
+        mask = np.ones((16,), dtype=bool)
+        mask[5] = False
+
+        valid = _utils._validate_attr_mask(a, mask)
+
+        assert valid.shape == (16, 3)
+        assert not np.any(valid[5])
+        assert not valid[2, 1]
+        assert np.sum(~valid) == 4
+
+    def test_bad_mask_shape(self):
+        with pytest.raises(AssertionError):
+            _utils._validate_attr_mask(
+                np.random.randn(16, 3), np.ones((16, 2), dtype=bool)
+            )
+
+    def test_valid_rows(self):
+        valid = np.ones((4, 2), dtype=bool)
+        valid[1, 0] = False
+        valid[2, 1] = False
+
+        assert _utils._valid_rows(None, 0) == slice(None)
+        np.testing.assert_equal(_utils._valid_rows(valid, 0), [0, 2, 3])
+        np.testing.assert_equal(_utils._valid_rows(valid, 0, 1), [0, 3])
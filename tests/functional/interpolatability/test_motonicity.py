@@ -58,3 +58,115 @@ class TestMonotonicity:
 
         with pytest.raises(ValueError):
             monotonicity(z, a)
+
+    def test_groups(self):
+        z = np.repeat(np.repeat(np.arange(16)[None, None, :], 8, axis=0), 3, axis=1)
+        a = np.random.randn(8, 3, 16)
+        groups = np.array([1, 0, 1, 1, 0, 2, 2, 0])
+
+        mntc = monotonicity(z, a, groups=groups)
+
+        assert sorted(mntc.keys()) == [0, 1, 2]
+        for g in mntc:
+            np.testing.assert_allclose(
+                mntc[g], monotonicity(z[groups == g], a[groups == g])
+            )
+
+    def test_chunked_memmap(self, tmp_path):
+        z = np.repeat(np.repeat(np.arange(16)[None, None, :], 10, axis=0), 3, axis=1)
+        a = np.random.randn(10, 3, 16)
+        np.save(tmp_path / "z.npy", z)
+        np.save(tmp_path / "a.npy", a)
+
+        zm = np.load(tmp_path / "z.npy", mmap_mode="r")
+        am = np.load(tmp_path / "a.npy", mmap_mode="r")
+
+        for reduce_mode in ["attribute", "sample", "all", "none"]:
+            np.testing.assert_allclose(
+                monotonicity(zm, am, reduce_mode=reduce_mode, chunk_size=3),
+                monotonicity(z, a, reduce_mode=reduce_mode),
+            )
+
+    def test_curve(self):
+        z = np.repeat(np.repeat(np.arange(16)[None, None, :], 8, axis=0), 3, axis=1)
+        a = np.round(np.random.randn(8, 3, 16), 1)
+        # unsorted thresholds, with duplicates and values equal to some LIADs
+        liad_thresh = np.array([0.5, 1e-3, 0.1, 2.0, 0.5, 10.0])
+
+        for reduce_mode in ["attribute", "sample", "all", "none"]:
+            curve = monotonicity(
+                z, a, reduce_mode=reduce_mode, liad_thresh=liad_thresh
+            )
+
+            assert curve.shape[0] == liad_thresh.shape[0]
+            for t, thresh in enumerate(liad_thresh):
+                np.testing.assert_allclose(
+                    curve[t],
+                    monotonicity(z, a, reduce_mode=reduce_mode, liad_thresh=thresh),
+                )
+
+    def test_curve_groups(self):
+        z = np.repeat(np.repeat(np.arange(16)[None, None, :], 10, axis=0), 3, axis=1)
+        a = np.random.randn(10, 3, 16)
+        groups = np.array([1, 0, 1, 1, 0, 2, 2, 0, 1, 2])
+        liad_thresh = np.array([1e-3, 0.5, 1.0])
+
+        curve = monotonicity(z, a, liad_thresh=liad_thresh, groups=groups, chunk_size=4)
+
+        for g in curve:
+            np.testing.assert_allclose(
+                curve[g],
+                monotonicity(z[groups == g], a[groups == g], liad_thresh=liad_thresh),
+            )
+
+    def test_model_axis(self):
+        grid = np.arange(16.0)[None, :].repeat(4, axis=0)
+        a = np.random.randn(4, 8, 3, 16)
+        groups = np.array([1, 0, 1, 1, 0, 2, 2, 0])
+
+        mntc = monotonicity(grid, a, groups=groups, chunk_size=3, model_axis=True)
+
+        for g in mntc:
+            assert mntc[g].shape == (4, 3)
+            for m in range(4):
+                np.testing.assert_allclose(
+                    mntc[g][m], monotonicity(grid[m], a[m][groups == g])
+                )
+
+    def test_liad_modes(self):
+        z = np.repeat(np.repeat(np.arange(16)[None, None, :], 8, axis=0), 3, axis=1)
+        a = np.square(z - 7.5)
+
+        for liad_mode in ["forward", "central", "spline"]:
+            mntc = monotonicity(z, a, liad_mode=liad_mode)
+            np.testing.assert_allclose(mntc, np.zeros((3,)), atol=0.2)
+
+        z = np.repeat(np.arange(3)[None, None, :], 8, axis=0)
+        with pytest.raises(AssertionError):
+            monotonicity(z[..., :2], z[..., :2], liad_mode="central")
+
+    def test_ragged(self):
+        sizes = [5, 2, 16, 9]
+        offsets = np.concatenate([[0], np.cumsum(sizes)])
+        zs = [np.arange(n, dtype=float) for n in sizes]
+        as_ = [np.random.randn(n, 3) for n in sizes]
+        z = np.concatenate(zs)
+        a = np.concatenate(as_)
+
+        for liad_thresh in [1e-3, np.array([0.5, 1e-3, 1.0])]:
+            mntc = monotonicity(
+                z, a, liad_thresh=liad_thresh, reduce_mode="none", offsets=offsets
+            )
+            ref = np.concatenate(
+                [
+                    monotonicity(
+                        zi, ai.T[None], liad_thresh=liad_thresh, reduce_mode="none"
+                    )
+                    for zi, ai in zip(zs, as_)
+                ],
+                axis=-2,
+            )
+            np.testing.assert_allclose(mntc, ref)
+
+        with pytest.raises(AssertionError):
+            monotonicity(z, a, offsets=offsets, model_axis=True)
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from latte.functional.interpolatability.sketch import QuantileSketch
+
+
+class TestQuantileSketch:
+    def test_exact(self):
+        x = np.random.randn(3, 2, 200)
+        qs = [0.05, 0.5, 0.95]
+
+        sketch = QuantileSketch(k=256)
+        sketch.update(x[..., :120])
+        sketch.update(x[..., 120:])
+
+        assert sketch.n_seen == 200
+        np.testing.assert_allclose(sketch.quantile(qs), np.quantile(x, q=qs, axis=-1))
+        assert sketch.quantile(0.5).shape == (3, 2)
+
+    def test_bounded(self):
+        x = np.random.randn(2, 20000)
+        qs = [0.05, 0.25, 0.5, 0.75, 0.95]
+
+        sketch = QuantileSketch(k=128)
+        for start in range(0, x.shape[-1], 333):
+            sketch.update(x[..., start : start + 333])
+
+        assert all(buf.shape[-1] <= 128 for buf in sketch._levels)
+
+        # rank error of the estimated quantiles
+        est = sketch.quantile(qs)
+        ranks = np.mean(x[None, :, :] <= est[:, :, None], axis=-1)
+        np.testing.assert_allclose(ranks, np.repeat([qs], 2, axis=0).T, atol=0.03)
+
+    def test_ptp(self):
+        x = np.random.randn(4, 100)
+
+        sketch = QuantileSketch()
+        sketch.update(x)
+
+        np.testing.assert_allclose(
+            sketch.ptp(0.9),
+            np.quantile(x, q=0.95, axis=-1) - np.quantile(x, q=0.05, axis=-1),
+        )
+
+        with pytest.raises(ValueError):
+            sketch.ptp(1.5)
+
+    def test_nan(self):
+        x = np.random.randn(3, 1000)
+        x[1, 10] = np.nan
+
+        sketch = QuantileSketch(k=64)
+        sketch.update(x)
+
+        out = sketch.quantile([0.25, 0.75])
+        assert np.all(np.isnan(out[:, 1]))
+        assert not np.any(np.isnan(out[:, [0, 2]]))
+
+    def test_bad_shape(self):
+        sketch = QuantileSketch()
+        sketch.update(np.random.randn(3, 10))
+
+        with pytest.raises(AssertionError):
+            sketch.update(np.random.randn(4, 10))
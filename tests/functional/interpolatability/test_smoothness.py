@@ -124,10 +124,21 @@ class TestSmoothness:
             smoothness(z, a, max_mode="naive", ptp_mode=0.9, p=0.1)
 
     def test_unequal(self):
+        z = np.sort(np.random.uniform(size=(8, 3, 16)), axis=-1)
+        a = np.square(z)
+
+        smth = smoothness(z, a, max_mode="naive", reduce_mode="none")
+
+        z_interval = (z[..., -1] - z[..., 0]) / 15.0
+        liad1_ptp = (z[..., -2] + z[..., -1]) - (z[..., 0] + z[..., 1])
+
+        np.testing.assert_allclose(smth, 1.0 - 2.0 / (liad1_ptp / z_interval))
+
+    def test_non_monotonic(self):
         z = np.random.randn(8, 3, 16)
         a = z * np.array([1.0, -2.0, 0.0])[None, :, None]
 
-        with pytest.raises(NotImplementedError):
+        with pytest.raises(ValueError):
             smoothness(z, a)
 
     def test_z_const(self):
@@ -164,3 +175,129 @@ class TestSmoothness:
 
         assert smth.shape == tuple()
         np.testing.assert_allclose(smth, 13.0 / 14.0)
+
+    def test_groups(self):
+        z = np.repeat(np.repeat(np.arange(16)[None, None, :], 8, axis=0), 3, axis=1)
+        a = np.random.randn(8, 3, 16)
+        groups = np.array([1, 0, 1, 1, 0, 2, 2, 0])
+
+        smth = smoothness(z, a, reduce_mode="none", groups=groups)
+
+        assert sorted(smth.keys()) == [0, 1, 2]
+        for g in smth:
+            np.testing.assert_allclose(
+                smth[g], smoothness(z[groups == g], a[groups == g], reduce_mode="none")
+            )
+
+    def test_chunked_memmap(self, tmp_path):
+        z = np.repeat(np.repeat(np.arange(16)[None, None, :], 10, axis=0), 3, axis=1)
+        a = np.random.randn(10, 3, 16)
+        np.save(tmp_path / "z.npy", z)
+        np.save(tmp_path / "a.npy", a)
+
+        zm = np.load(tmp_path / "z.npy", mmap_mode="r")
+        am = np.load(tmp_path / "a.npy", mmap_mode="r")
+
+        for reduce_mode in ["attribute", "sample", "all", "none"]:
+            np.testing.assert_allclose(
+                smoothness(zm, am, reduce_mode=reduce_mode, chunk_size=3),
+                smoothness(z, a, reduce_mode=reduce_mode),
+            )
+
+    def test_shared_grid(self):
+        grid = np.sort(np.random.uniform(size=(16,)))
+        z = np.repeat(np.repeat(grid[None, None, :], 8, axis=0), 3, axis=1)
+        a = np.random.randn(8, 3, 16)
+
+        for liad_mode in ["forward", "central", "spline"]:
+            np.testing.assert_allclose(
+                smoothness(grid, a, liad_mode=liad_mode, reduce_mode="none"),
+                smoothness(z, a, liad_mode=liad_mode, reduce_mode="none"),
+            )
+            np.testing.assert_allclose(
+                smoothness(z[0], a, liad_mode=liad_mode, reduce_mode="none"),
+                smoothness(z, a, liad_mode=liad_mode, reduce_mode="none"),
+            )
+
+    def test_model_axis(self):
+        z = np.repeat(np.repeat(np.arange(16)[None, None, :], 8, axis=0), 5, axis=1)
+        a = np.random.randn(4, 8, 3, 16)
+
+        for reduce_mode in ["attribute", "sample", "all", "none"]:
+            smth = smoothness(
+                np.stack([z] * 4),
+                a,
+                reg_dim=[4, 0, 2],
+                reduce_mode=reduce_mode,
+                model_axis=True,
+            )
+
+            assert smth.shape[0] == 4
+            for m in range(4):
+                np.testing.assert_allclose(
+                    smth[m],
+                    smoothness(z, a[m], reg_dim=[4, 0, 2], reduce_mode=reduce_mode),
+                )
+
+    def test_central(self):
+        z = np.repeat(np.repeat(np.arange(16)[None, None, :], 8, axis=0), 3, axis=1)
+        a = np.square(z)
+
+        smth = smoothness(z, a, liad_mode="central", reduce_mode="all")
+
+        np.testing.assert_allclose(smth, 1.0 - 2.0 / 26.0)
+
+    def test_spline(self):
+        z = np.repeat(np.repeat(np.arange(16)[None, None, :], 8, axis=0), 3, axis=1)
+        a = 3.0 * z
+
+        smth = smoothness(z, a, liad_mode="spline", reduce_mode="all")
+
+        np.testing.assert_allclose(smth, 1.0)
+
+    def test_ragged(self):
+        sizes = [5, 8, 16, 3]
+        offsets = np.concatenate([[0], np.cumsum(sizes)])
+        zs = [np.sort(np.random.randn(n, 3), axis=0) for n in sizes]
+        as_ = [np.random.randn(n, 2) for n in sizes]
+        z = np.concatenate(zs)
+        a = np.concatenate(as_)
+
+        for max_mode in ["naive", "lehmer"]:
+            for ptp_mode in ["naive", 0.8]:
+                smth = smoothness(
+                    z,
+                    a,
+                    reg_dim=[2, 0],
+                    max_mode=max_mode,
+                    ptp_mode=ptp_mode,
+                    reduce_mode="none",
+                    offsets=offsets,
+                )
+                ref = np.concatenate(
+                    [
+                        smoothness(
+                            zi.T[None],
+                            ai.T[None],
+                            reg_dim=[2, 0],
+                            max_mode=max_mode,
+                            ptp_mode=ptp_mode,
+                            reduce_mode="none",
+                        )
+                        for zi, ai in zip(zs, as_)
+                    ]
+                )
+                np.testing.assert_allclose(smth, ref, atol=1e-12)
+
+        groups = np.array([1, 0, 1, 0])
+        out = smoothness(z, a, reg_dim=[2, 0], groups=groups, offsets=offsets)
+        full = smoothness(z, a, reg_dim=[2, 0], reduce_mode="none", offsets=offsets)
+        for g in [0, 1]:
+            np.testing.assert_allclose(out[g], np.mean(full[groups == g], axis=0))
+
+        with pytest.raises(AssertionError):
+            smoothness(z, a, reg_dim=[2, 0], offsets=offsets, liad_mode="central")
+        with pytest.raises(AssertionError):
+            smoothness(z, a, reg_dim=[2, 0], offsets=offsets, chunk_size=2)
+        with pytest.raises(AssertionError):
+            smoothness(z, a, reg_dim=[2, 0], offsets=[0, 2, 32])
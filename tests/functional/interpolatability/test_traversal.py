@@ -0,0 +1,212 @@
+import numpy as np
+import pytest
+
+from latte.functional.interpolatability.smoothness import smoothness
+from latte.functional.bundles.liad_interpolatability import (
+    liad_interpolatability_bundle,
+)
+from latte.functional.interpolatability.traversal import (
+    AttributeCache,
+    adaptive_traverse,
+    traverse,
+    update_from_traversal,
+)
+from latte.metrics.core.interpolatability import Monotonicity, Smoothness
+
+
+def _decode(z):
+    return np.concatenate([z, np.square(z)], axis=-1)
+
+
+def _measure(x):
+    # attribute i is the square of latent dimension i
+    return x[:, 4:6]
+
+
+class TestTraverse:
+    def test_shapes(self):
+        z = np.random.randn(10, 4)
+
+        chunks = list(traverse(z, _decode, _measure, reg_dim=[0, 1], chunk_size=4))
+
+        assert [zc.shape for zc, _ in chunks] == [(4, 2, 16), (4, 2, 16), (2, 2, 16)]
+        assert [ac.shape for _, ac in chunks] == [(4, 2, 16), (4, 2, 16), (2, 2, 16)]
+
+    def test_values(self):
+        z = np.random.randn(10, 4)
+
+        zc, ac = next(
+            traverse(z, _decode, _measure, reg_dim=[0, 1], step=0.5, n_interp=5)
+        )
+
+        offsets = 0.5 * np.arange(-2, 3)
+        np.testing.assert_allclose(zc, z[:, :2, None] + offsets)
+        np.testing.assert_allclose(ac, np.square(zc))
+
+    def test_reg_dim(self):
+        z = np.random.randn(10, 4)
+
+        zc, ac = next(traverse(z, None, lambda x: x[:, [3, 1]], reg_dim=[3, 1]))
+
+        np.testing.assert_allclose(zc[:, 0, 0], z[:, 3] - 0.75)
+        np.testing.assert_allclose(ac, zc)
+
+    def test_batched(self):
+        z = np.random.randn(10, 4)
+        calls = []
+
+        def measure(x):
+            calls.append(x.shape[0])
+            return _measure(x)
+
+        ref = list(traverse(z, _decode, _measure, reg_dim=[0, 1]))
+        out = list(
+            traverse(z, _decode, measure, reg_dim=[0, 1], batch_size=100, n_workers=2)
+        )
+
+        assert max(calls) <= 100
+        assert sum(calls) == 10 * 2 * 16
+
+        for (zr, ar), (zo, ao) in zip(ref, out):
+            np.testing.assert_allclose(zo, zr)
+            np.testing.assert_allclose(ao, ar)
+
+    def test_bad_measure(self):
+        z = np.random.randn(10, 4)
+
+        with pytest.raises(AssertionError):
+            next(traverse(z, _decode, lambda x: x, reg_dim=[0, 1]))
+
+
+class TestAdaptiveTraverse:
+    def test_linear(self):
+        z = np.random.randn(10, 4)
+
+        chunks = list(adaptive_traverse(z, None, lambda x: 2.0 * x, chunk_size=4))
+
+        assert [zc.shape for zc, _ in chunks] == [(4, 4, 5), (4, 4, 5), (2, 4, 5)]
+        for zc, ac in chunks:
+            np.testing.assert_allclose(ac, 2.0 * zc)
+
+    def test_kink(self):
+        z = np.array([[0.03]])
+
+        zc, ac = next(
+            adaptive_traverse(
+                z, None, np.abs, step=0.1, n_interp=9, max_interp=100, min_step=0.01
+            )
+        )
+
+        assert 9 < zc.shape[-1] < 100
+        np.testing.assert_allclose(ac, np.abs(zc))
+        assert np.all(np.diff(zc, axis=-1) > 0.0)
+
+        # the grid is finest next to the kink at z = 0 and coarse far from it
+        h = np.diff(zc[0, 0])
+        mid = 0.5 * (zc[0, 0, 1:] + zc[0, 0, :-1])
+        assert np.max(np.abs(mid[h < 0.02])) < 0.05
+        np.testing.assert_allclose(h[[0, -1]], 0.1)
+        assert np.min(h) >= 0.01
+
+    def test_budget(self):
+        z = np.random.randn(10, 2)
+
+        for zc, ac in adaptive_traverse(
+            z, None, np.sin, step=0.5, max_interp=12, tol=0.0
+        ):
+            assert zc.shape == (10, 2, 12)
+            np.testing.assert_allclose(ac, np.sin(zc))
+
+    def test_bundle(self):
+        z = np.random.randn(10, 2)
+
+        zc, ac = next(adaptive_traverse(z, None, np.sin, step=0.5))
+        out = liad_interpolatability_bundle(zc, ac)
+
+        assert out["smoothness"].shape == (2,)
+        assert out["monotonicity"].shape == (2,)
+
+
+class TestUpdateFromTraversal:
+    def test_metrics(self):
+        z = np.random.randn(10, 4)
+
+        smth = Smoothness(reduce_mode="none")
+        mntc = Monotonicity()
+
+        update_from_traversal(
+            [smth, mntc], traverse(z, _decode, _measure, reg_dim=[0, 1], chunk_size=3)
+        )
+
+        zc, ac = next(traverse(z, _decode, _measure, reg_dim=[0, 1], chunk_size=10))
+
+        np.testing.assert_allclose(
+            smth.compute(), smoothness(zc, ac, reduce_mode="none")
+        )
+        assert mntc.compute().shape == (2,)
+
+
+class TestAttributeCache:
+    def test_shared_base(self):
+        z = np.random.randn(10, 4)
+        calls = []
+
+        def measure(x):
+            calls.append(x.shape[0])
+            return x
+
+        cache = AttributeCache()
+        out = list(traverse(z, None, measure, n_interp=5, cache=cache))
+        ref = list(traverse(z, None, lambda x: x, n_interp=5))
+
+        # the base point is shared by the sweeps of all 4 attributes
+        assert sum(calls) == 10 * (4 * 4 + 1)
+        assert cache.misses == 10 * (4 * 4 + 1)
+        assert cache.hits == 10 * 3
+
+        for (zr, ar), (zo, ao) in zip(ref, out):
+            np.testing.assert_allclose(zo, zr)
+            np.testing.assert_allclose(ao, ar)
+
+    def test_reuse(self):
+        z = np.random.randn(10, 4)
+        calls = []
+
+        def measure(x):
+            calls.append(x.shape[0])
+            return _measure(x)
+
+        cache = AttributeCache()
+        first = list(traverse(z, _decode, measure, reg_dim=[0, 1], cache=cache))
+        n_calls = len(calls)
+        second = list(traverse(z, _decode, measure, reg_dim=[0, 1], cache=cache))
+
+        assert len(calls) == n_calls
+        assert cache.hit_rate == 0.5
+        for (z1, a1), (z2, a2) in zip(first, second):
+            np.testing.assert_allclose(z2, z1)
+            np.testing.assert_allclose(a2, a1)
+
+    def test_eviction(self):
+        cache = AttributeCache(max_size=3)
+
+        cache.get_or_measure(np.arange(4.0)[:, None], lambda x: 2.0 * x)
+        assert len(cache) == 3
+
+        # the first point was evicted, the last one is still cached
+        out = cache.get_or_measure(np.array([[0.0], [3.0]]), lambda x: 2.0 * x)
+        np.testing.assert_allclose(out, [[0.0], [6.0]])
+        assert (cache.hits, cache.misses) == (1, 5)
+
+        cache.clear()
+        assert len(cache) == 0
+        assert cache.hit_rate == 0.0
+
+    def test_resolution(self):
+        cache = AttributeCache(resolution=1e-3)
+
+        cache.get_or_measure(np.array([[0.1]]), lambda x: x)
+        out = cache.get_or_measure(np.array([[0.1 + 1e-5]]), lambda x: 2.0 * x)
+
+        np.testing.assert_allclose(out, [[0.1]])
+        assert cache.hits == 1
@@ -78,6 +78,43 @@ class TestShape:
 
         np.testing.assert_equal(zin, z)
 
+    def test_shared_grid(self):
+        z, a = _utils._validate_za_shape(np.arange(32.0), np.random.randn(16, 3, 32))
+
+        assert z.shape == (1, 1, 32)
+        assert a.shape == (16, 3, 32)
+
+    def test_shared_grid_regdim(self):
+        zin = np.random.randn(8, 32)
+        z, _ = _utils._validate_za_shape(
+            zin, np.random.randn(16, 3, 32), reg_dim=[3, 4, 5]
+        )
+
+        np.testing.assert_equal(zin[None, [3, 4, 5], :], z)
+
+    def test_shared_grid_bad_interp(self):
+
+        with pytest.raises(AssertionError):
+            _utils._validate_za_shape(np.arange(31.0), np.random.randn(16, 3, 32))
+
+    def test_model_axis(self):
+        zin = np.random.randn(4, 16, 8, 32)
+        z, a = _utils._validate_za_shape(
+            zin, np.random.randn(4, 16, 32), reg_dim=[3], model_axis=True
+        )
+
+        assert a.shape == (4, 16, 1, 32)
+        np.testing.assert_equal(zin[..., [3], :], z)
+
+    def test_model_axis_bad_models(self):
+
+        with pytest.raises(AssertionError):
+            _utils._validate_za_shape(
+                np.random.randn(3, 16, 8, 32),
+                np.random.randn(4, 16, 8, 32),
+                model_axis=True,
+            )
+
     def test_auto_expand(self):
         z, a = _utils._validate_za_shape(
             np.random.randn(16, 32), np.random.randn(16, 32)
@@ -151,12 +188,69 @@ class TestFiniteDiff:
 
         assert len(rets) == 3
 
+    def test_fused(self):
+        z = np.sort(np.random.rand(8, 3, 12), axis=-1)
+        a = np.random.rand(8, 3, 12)
+
+        rets = _utils._finite_diff(z, a, order=3, mode="forward", return_list=True)
+        fused = _utils._finite_diff(
+            z, a, order=3, mode="forward", return_list=True, return_z=False
+        )
+
+        for (d, _), (df, zf) in zip(rets, fused):
+            np.testing.assert_allclose(df, d)
+            assert zf is None
+
+    def test_fused_out(self):
+        z = np.arange(16)[None, None, :]
+        a = np.random.rand(8, 3, 16)
+
+        out = [np.empty((8, 3, 15)), np.empty((8, 3, 14))]
+        fused = _utils._fused_forward_diff(z, a, order=2, out=out)
+
+        assert fused[0] is out[0]
+        assert fused[1] is out[1]
+        np.testing.assert_allclose(out[0], np.diff(a, axis=-1))
+        np.testing.assert_allclose(out[1], np.diff(a, n=2, axis=-1))
+
+    def test_buffer_pool(self):
+        z = np.arange(16)
+        a = np.random.rand(8, 3, 16)
+        pool = _utils._LiadBufferPool()
+
+        out = pool.get(z, a, order=2)
+        assert [buf.shape for buf in out] == [(8, 3, 15), (8, 3, 14)]
+        assert all(x is y for x, y in zip(pool.get(z, a, order=2), out))
+        assert pool.get(z, a[:5], order=2)[0].shape == (5, 3, 15)
+        assert pool.get(z, a, order=2, mode="central") is None
+
+        liads = _utils._liad(
+            z, a, order=2, return_list=True, return_z=False, out=out
+        )
+        assert liads[1][0] is out[1]
+        np.testing.assert_allclose(out[1], np.diff(a, n=2, axis=-1))
+
     def test_mode(self):
         z = np.repeat(np.linspace(0.0, 1.0, 10)[None, :], 8, axis=0)
         a = np.repeat(np.linspace(0.0, 0.5, 10)[None, :], 8, axis=0)
 
         with pytest.raises(NotImplementedError):
-            _utils._finite_diff(z, a, order=1, mode="central", return_list=False)
+            _utils._finite_diff(z, a, order=1, mode="backward", return_list=False)
+
+
+    def test_central(self):
+        z = np.cumsum(np.random.rand(8, 3, 12) + 0.5, axis=-1)
+        a = 0.5 * np.square(z) - 3.0 * z
+
+        rets = _utils._finite_diff(z, a, order=2, mode="central", return_list=True)
+
+        (d1, z1), (d2, z2) = rets
+
+        # the three-point stencils are exact for quadratics, even with unequal spacing
+        np.testing.assert_allclose(z1, z[..., 1:-1])
+        np.testing.assert_allclose(d1, z[..., 1:-1] - 3.0)
+        np.testing.assert_allclose(z2, z[..., 1:-1])
+        np.testing.assert_allclose(d2, np.ones((8, 3, 10)))
 
 
 class TestLiad:
@@ -181,6 +275,66 @@ class TestLiad:
         np.testing.assert_allclose(z1, z2)
 
 
+    def test_spline(self):
+        z = np.cumsum(np.random.rand(8, 3, 12) + 0.5, axis=-1)
+        a = 2.0 * z + 1.0
+
+        rets = _utils._liad(z, a, order=3, mode="spline", return_list=True)
+
+        (d1, z1), (d2, z2), (d3, z3) = rets
+
+        np.testing.assert_allclose(z1, z)
+        np.testing.assert_allclose(d1, 2.0 * np.ones((8, 3, 12)))
+        np.testing.assert_allclose(z2, z[..., 1:-1])
+        np.testing.assert_allclose(d2, np.zeros((8, 3, 10)), atol=1e-10)
+        np.testing.assert_allclose(d3, np.zeros((8, 3, 11)), atol=1e-10)
+
+    def test_spline_natural(self):
+        z = np.linspace(0.0, 2.0, 9)
+        a = np.exp(z)
+
+        d1, _ = _utils._liad(z, a, order=1, mode="spline")
+        d2, _ = _utils._liad(z, a, order=2, mode="spline")
+
+        # natural cubic spline of exp on 9 uniform knots, with M0 = M8 = 0
+        h = 0.25
+        m = np.zeros(9)
+        lhs = (
+            np.diag(np.full(7, 4.0 * h))
+            + np.diag(np.full(6, h), 1)
+            + np.diag(np.full(6, h), -1)
+        )
+        m[1:-1] = np.linalg.solve(lhs, 6.0 * np.diff(a, n=2) / h)
+
+        np.testing.assert_allclose(d2, m[1:-1])
+        np.testing.assert_allclose(
+            d1[:-1], np.diff(a) / h - h * (2.0 * m[:-1] + m[1:]) / 6.0
+        )
+
+    def test_bad_mode(self):
+        with pytest.raises(NotImplementedError):
+            _utils._liad(np.random.rand(8, 16), np.random.rand(8, 16), mode="backward")
+
+
+class TestPartitionQuantiles:
+    def test_values(self):
+        x = np.random.randn(3, 4, 17)
+        qs = [0.0, 0.05, 0.5, 0.95, 1.0]
+
+        np.testing.assert_allclose(
+            _utils._partition_quantiles(x, qs), np.quantile(x, q=qs, axis=-1)
+        )
+
+    def test_nan(self):
+        x = np.random.randn(3, 17)
+        x[1, 4] = np.nan
+
+        out = _utils._partition_quantiles(x, [0.25, 0.75])
+
+        assert np.all(np.isnan(out[:, 1]))
+        assert not np.any(np.isnan(out[:, [0, 2]]))
+
+
 class TestLehmerMean:
     def test_p1(self):
         x = np.random.rand(8, 16)
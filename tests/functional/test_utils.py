@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+import latte
+from latte.functional import _utils
+from latte.functional.disentanglement import _utils as _dis_utils
+from latte.functional.disentanglement.sap import sap
+from latte.functional.interpolatability.smoothness import smoothness
+
+
+class TestGroups:
+    def test_sorted_groups(self):
+        order, keys, slices = _utils._group_slices(np.array([0, 0, 1, 1, 1, 3]))
+
+        assert order is None
+        assert keys == [0, 1, 3]
+        assert slices == [slice(0, 2), slice(2, 5), slice(5, 6)]
+
+    def test_unsorted_groups(self):
+        groups = np.array(["b", "a", "b", "c", "a"])
+        keys, slices, (x,) = _utils._sort_by_group(groups, np.arange(5))
+
+        assert keys == ["a", "b", "c"]
+        np.testing.assert_array_equal(x[slices[0]], [1, 4])
+        np.testing.assert_array_equal(x[slices[1]], [0, 2])
+        np.testing.assert_array_equal(x[slices[2]], [3])
+
+    def test_apply_grouped(self):
+        groups = np.array([2, 1, 2, 1, 1])
+        x = np.arange(5)
+
+        out = _utils._apply_grouped(
+            lambda x, y=None: (np.sum(x), y), groups, x, y=None
+        )
+
+        assert out == {1: (8, None), 2: (2, None)}
+
+
+class TestValidationLevel:
+    def test_context(self):
+        assert _utils._get_validation_level() == "full"
+
+        with latte.validation_level("off"):
+            assert _utils._get_validation_level() == "off"
+
+            with latte.validation_level("shape-only"):
+                assert _utils._get_validation_level() == "shape-only"
+
+            assert _utils._get_validation_level() == "off"
+
+        assert _utils._get_validation_level() == "full"
+
+    def test_bad_level(self):
+        with pytest.raises(AssertionError):
+            latte.set_validation_level("none")
+
+    def test_interp_checks(self):
+        z = np.random.randn(8, 3, 16)
+        z[0, 0, :] = 3.14
+        a = np.random.randn(8, 3, 16)
+
+        with pytest.raises(ValueError):
+            smoothness(z, a)
+
+        with pytest.raises(AssertionError):
+            smoothness(z, a[:4])
+
+        with latte.validation_level("shape-only"):
+            smoothness(z, a)
+
+            with pytest.raises(AssertionError):
+                smoothness(z, a[:4])
+
+    def test_off(self):
+        z = np.random.randn(16, 8)
+        a = np.random.randn(16, 3)
+
+        with latte.validation_level("off"):
+            np.testing.assert_allclose(sap(z, a), sap(z, a.copy()))
+            _, a1, reg_dim = _dis_utils._validate_za_shape(
+                z, a[:, 0], fill_reg_dim=True
+            )
+
+        assert a1.shape == (16, 1)
+        assert reg_dim == [0]
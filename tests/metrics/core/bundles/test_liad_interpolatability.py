@@ -0,0 +1,99 @@
+import numpy as np
+
+from latte.functional.bundles.liad_interpolatability import (
+    liad_interpolatability_bundle,
+)
+from latte.metrics.core.bundles import LiadInterpolatabilityBundle
+
+
+class TestLiadInterpolatabilityBundle:
+    def test_bundle_reduce_modes(self):
+        for reduce_mode in ["attribute", "sample", "all", "none"]:
+            mod = LiadInterpolatabilityBundle(reduce_mode=reduce_mode)
+
+            zl = []
+            al = []
+
+            for n in [16, 5, 9]:
+                z = np.repeat(
+                    np.repeat(np.arange(16)[None, None, :], n, axis=0), 3, axis=1
+                )
+                a = np.random.randn(n, 3, 16)
+                a[:, 1, :] = 2.0 * z[:, 1, :]
+                a[:2, 2, :] = 1.0
+
+                zl.append(z)
+                al.append(a)
+
+                mod.update_state(z, a)
+
+            val = mod.compute()
+            ref = liad_interpolatability_bundle(
+                np.concatenate(zl, axis=0),
+                np.concatenate(al, axis=0),
+                reduce_mode=reduce_mode,
+            )
+
+            for key in ["smoothness", "monotonicity"]:
+                np.testing.assert_allclose(val[key], ref[key], atol=1e-12)
+
+    def test_interp_grid(self):
+        grid = np.arange(16.0)
+        mod = LiadInterpolatabilityBundle(interp_grid=grid)
+
+        al = []
+
+        for n in [16, 5, 9]:
+            a = np.random.randn(n, 3, 16)
+            al.append(a)
+
+            mod.update_state(z=None, a=a)
+
+        a = np.concatenate(al, axis=0)
+        val = mod.compute()
+        ref = liad_interpolatability_bundle(grid, a)
+
+        for key in ["smoothness", "monotonicity"]:
+            np.testing.assert_allclose(val[key], ref[key], atol=1e-12)
+
+    def test_top_k(self):
+        mod = LiadInterpolatabilityBundle(reduce_mode="none", top_k=2)
+
+        zl = []
+        al = []
+
+        for n in [16, 5, 9]:
+            z = np.repeat(
+                np.repeat(np.arange(16)[None, None, :], n, axis=0), 3, axis=1
+            )
+            a = np.random.randn(n, 3, 16)
+
+            zl.append(z)
+            al.append(a)
+
+            mod.update_state(z, a)
+
+        val = mod.compute()
+
+        np.testing.assert_equal(
+            val["smoothness_worst_indices"], np.argsort(val["smoothness"], axis=0)[:2]
+        )
+        np.testing.assert_allclose(
+            np.abs(val["monotonicity_worst_scores"]),
+            np.sort(np.abs(val["monotonicity"]), axis=0)[:2],
+        )
+
+    def test_top_k_degenerate(self):
+        mod = LiadInterpolatabilityBundle(
+            reduce_mode="none", degenerate_val=0.0, liad_thresh=0.5, top_k=2
+        )
+
+        z = np.arange(16)
+        a = np.cumsum(np.random.choice([-1.0, 1.0], size=(6, 2, 16)), axis=-1)
+        a[1, 0] = 0.0
+
+        mod.update_state(z, a)
+        val = mod.compute()
+
+        assert val["monotonicity"][1, 0] == 0.0
+        assert not np.any(val["monotonicity_worst_indices"][:, 0] == 1)
@@ -1,4 +1,5 @@
 import numpy as np
+import pytest
 
 from latte.functional.disentanglement.sap import sap
 from latte.metrics.core.disentanglement import SeparateAttributePredictability
@@ -25,3 +26,169 @@ class TestDependencyAware:
         np.testing.assert_allclose(
             val, sap(np.concatenate(zl, axis=0), np.concatenate(al, axis=0))
         )
+
+    def test_sap_streaming(self):
+        mod = SeparateAttributePredictability(reg_dim=[2, 0, 1], streaming=True)
+
+        zl = []
+        al = []
+
+        for n in [16, 7, 32]:
+            z = np.random.randn(n, 16) * 3.0 + 100.0
+            a = np.random.randn(n, 3)
+            a[:2, 1] = np.nan
+
+            zl.append(z)
+            al.append(a)
+
+            mod.update_state(z, a)
+
+        val = mod.compute()
+
+        np.testing.assert_allclose(
+            val,
+            sap(
+                np.concatenate(zl, axis=0),
+                np.concatenate(al, axis=0),
+                reg_dim=[2, 0, 1],
+            ),
+        )
+
+        mod.reset_state()
+        assert mod.n.shape == tuple()
+
+    def test_sap_streaming_discrete(self):
+        mod = SeparateAttributePredictability(
+            discrete=True, streaming=True, n_bins=8, hist_range=(0.0, 8.0)
+        )
+
+        zl = []
+        al = []
+
+        for n in [16, 7, 32]:
+            z = np.random.randint(8, size=(n, 16)).astype(float)
+            a = np.random.randint(3, size=(n, 3))
+            a[:, 0] = z[:, 0] > 3
+
+            zl.append(z)
+            al.append(a)
+
+            mod.update_state(z, a)
+
+        val = mod.compute()
+
+        np.testing.assert_allclose(
+            val,
+            sap(
+                np.concatenate(zl, axis=0),
+                np.concatenate(al, axis=0),
+                discrete=True,
+                discrete_mode="exact",
+            ),
+        )
+
+    def test_sap_streaming_discrete_merge(self):
+        kwargs = dict(discrete=True, streaming=True, n_bins=8, hist_range=(0.0, 8.0))
+        mod1 = SeparateAttributePredictability(**kwargs)
+        mod2 = SeparateAttributePredictability(**kwargs)
+        ref = SeparateAttributePredictability(**kwargs)
+
+        for n, mod, n_classes in [(16, mod1, 2), (32, mod2, 3), (7, mod1, 3)]:
+            z = np.random.randint(8, size=(n, 16)).astype(float)
+            a = np.random.randint(n_classes, size=(n, 3)) + 1
+            a[:, 0] = z[:, 0] > 3
+
+            mod.update_state(z, a)
+            ref.update_state(z, a)
+
+        mod1.merge_state(mod2)
+
+        for cls, ref_cls in zip(mod1.classes, ref.classes):
+            np.testing.assert_equal(cls, ref_cls)
+        np.testing.assert_allclose(mod1.compute(), ref.compute())
+
+        empty = SeparateAttributePredictability(**kwargs)
+        empty.merge_state(mod1)
+        np.testing.assert_allclose(empty.compute(), ref.compute())
+
+    def test_sap_streaming_discrete_range(self):
+        mod1 = SeparateAttributePredictability(
+            discrete=True, streaming=True, hist_range=(0.0, 1.0)
+        )
+        mod2 = SeparateAttributePredictability(
+            discrete=True, streaming=True, hist_range=(0.0, 2.0)
+        )
+
+        mod1.update_state(np.random.rand(16, 4), np.random.randint(2, size=(16, 2)))
+        mod2.update_state(np.random.rand(16, 4), np.random.randint(2, size=(16, 2)))
+
+        with pytest.raises(ValueError):
+            mod1.merge_state(mod2)
+
+        with pytest.warns(RuntimeWarning):
+            mod1.update_state(
+                np.random.rand(16, 4) + 2.0, np.random.randint(2, size=(16, 2))
+            )
+
+    def test_sap_streaming_discrete_default_range(self):
+        kwargs = dict(discrete=True, streaming=True, n_bins=64)
+        mod1 = SeparateAttributePredictability(**kwargs)
+        mod2 = SeparateAttributePredictability(**kwargs)
+        ref = SeparateAttributePredictability(**kwargs)
+
+        zl = []
+        al = []
+
+        # the first batches only cover a small part of the latent range
+        batches = [(8, 1, mod1), (4, 2, mod2), (16, 8, mod1), (16, 20, mod2)]
+        for n, scale, mod in batches:
+            z = np.random.randint(-scale, scale + 1, size=(n, 4)).astype(float)
+            a = np.random.randint(2, size=(n, 2))
+            a[:, 0] = z[:, 0] > 0
+
+            zl.append(z)
+            al.append(a)
+
+            mod.update_state(z, a)
+            ref.update_state(z, a)
+
+        mod1.merge_state(mod2)
+
+        # integer latent values each fall into their own bin
+        exact = sap(
+            np.concatenate(zl, axis=0),
+            np.concatenate(al, axis=0),
+            discrete=True,
+            discrete_mode="exact",
+        )
+
+        np.testing.assert_allclose(ref.compute(), exact)
+        np.testing.assert_allclose(mod1.compute(), exact)
+
+    def test_sap_streaming_discrete_small_batches(self):
+        mod = SeparateAttributePredictability(discrete=True, streaming=True)
+
+        z = np.random.randn(2000, 4)
+        a = np.stack([z[:, 0] > 0.5, z[:, 1] > -1.0, z[:, 2] > 2.0], axis=1)
+
+        for start in range(0, 2000, 16):
+            mod.update_state(z[start : start + 16], a[start : start + 16])
+
+        np.testing.assert_allclose(
+            mod.compute(),
+            sap(z, a, discrete=True, discrete_mode="exact"),
+            atol=0.01,
+        )
+
+    def test_sap_streaming_merge(self):
+        mod1 = SeparateAttributePredictability(streaming=True)
+        mod2 = SeparateAttributePredictability(streaming=True)
+
+        z = np.random.randn(48, 16)
+        a = np.random.randn(48, 3)
+
+        mod1.update_state(z[:20], a[:20])
+        mod2.update_state(z[20:], a[20:])
+        mod1.merge_state(mod2)
+
+        np.testing.assert_allclose(mod1.compute(), sap(z, a))
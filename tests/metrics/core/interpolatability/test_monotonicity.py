@@ -25,5 +25,147 @@ class TestMonotonicity:
         val = mod.compute()
 
         np.testing.assert_allclose(
-            val, monotonicity(np.concatenate(zl, axis=0), np.concatenate(al, axis=0))
+            val,
+            monotonicity(np.concatenate(zl, axis=0), np.concatenate(al, axis=0)),
+            atol=1e-12,
         )
+
+    def test_monotonicity_reduce_modes(self):
+        for reduce_mode in ["attribute", "sample", "all", "none"]:
+            for nanmean in [True, False]:
+                mod = Monotonicity(reduce_mode=reduce_mode, nanmean=nanmean)
+
+                zl = []
+                al = []
+
+                for n in [16, 5, 9]:
+                    z = np.repeat(
+                        np.repeat(np.arange(16)[None, None, :], n, axis=0), 3, axis=1
+                    )
+                    a = np.random.randn(n, 3, 16)
+                    # degenerate samples
+                    a[:2, 2, :] = 1.0
+
+                    zl.append(z)
+                    al.append(a)
+
+                    mod.update_state(z, a)
+
+                np.testing.assert_allclose(
+                    mod.compute(),
+                    monotonicity(
+                        np.concatenate(zl, axis=0),
+                        np.concatenate(al, axis=0),
+                        reduce_mode=reduce_mode,
+                        nanmean=nanmean,
+                    ),
+                    atol=1e-12,
+                )
+
+    def test_monotonicity_curve(self):
+        liad_thresh = np.array([1e-3, 0.1, 0.5, 1.0])
+
+        for reduce_mode in ["attribute", "sample", "all", "none"]:
+            mod = Monotonicity(reduce_mode=reduce_mode, liad_thresh=liad_thresh)
+
+            zl = []
+            al = []
+
+            for n in [16, 5, 9]:
+                z = np.repeat(
+                    np.repeat(np.arange(16)[None, None, :], n, axis=0), 3, axis=1
+                )
+                a = np.random.randn(n, 3, 16)
+
+                zl.append(z)
+                al.append(a)
+
+                mod.update_state(z, a)
+
+            val = mod.compute()
+
+            assert val.shape[0] == liad_thresh.shape[0]
+            np.testing.assert_allclose(
+                val,
+                monotonicity(
+                    np.concatenate(zl, axis=0),
+                    np.concatenate(al, axis=0),
+                    reduce_mode=reduce_mode,
+                    liad_thresh=liad_thresh,
+                ),
+                atol=1e-12,
+            )
+
+    def test_top_k(self):
+        liad_thresh = np.array([1e-3, 1.0])
+        mod = Monotonicity(liad_thresh=liad_thresh, top_k=3)
+
+        zl = []
+        al = []
+
+        for n in [16, 5, 9]:
+            z = np.repeat(
+                np.repeat(np.arange(16)[None, None, :], n, axis=0), 3, axis=1
+            )
+            a = np.random.randn(n, 3, 16)
+
+            zl.append(z)
+            al.append(a)
+
+            mod.update_state(z, a)
+
+        out = mod.compute()
+        mntc = monotonicity(
+            np.concatenate(zl, axis=0),
+            np.concatenate(al, axis=0),
+            reduce_mode="none",
+            liad_thresh=liad_thresh,
+        )
+        key = np.where(np.isnan(mntc), np.inf, np.abs(mntc))
+        order = np.argsort(key, axis=-2, kind="stable")[..., :3, :]
+
+        assert out["monotonicity_worst_indices"].shape == (2, 3, 3)
+        np.testing.assert_allclose(
+            np.abs(out["monotonicity_worst_scores"]),
+            np.take_along_axis(key, order, axis=-2),
+        )
+
+    def test_top_k_degenerate(self):
+        for liad_thresh in [0.5, np.array([0.5, 1e-3])]:
+            mod = Monotonicity(liad_thresh=liad_thresh, degenerate_val=0.0, top_k=2)
+
+            z = np.arange(16)
+            a = np.cumsum(np.random.choice([-1.0, 1.0], size=(6, 1, 16)), axis=-1)
+            a[3] = 1e-5 * np.random.randn(16)
+
+            mod.update_state(z, a[:4])
+            mod.update_state(z, a[4:])
+            out = mod.compute()
+
+            mntc = monotonicity(
+                z,
+                a,
+                reduce_mode="none",
+                liad_thresh=liad_thresh,
+                degenerate_val=0.0,
+            )
+            assert np.all(mntc[..., 3, :] == 0.0)
+
+            worst = out["monotonicity_worst_indices"]
+            assert not np.any(worst[..., 0, :] == 3)
+
+            key = np.abs(mntc)
+            key[..., 3, :] = np.inf
+            order = np.argsort(key, axis=-2, kind="stable")[..., :2, :]
+            np.testing.assert_allclose(
+                np.abs(out["monotonicity_worst_scores"]),
+                np.take_along_axis(key, order, axis=-2),
+            )
+
+        mod = Monotonicity(degenerate_val=0.0, top_k=2)
+        mod.update_state(np.arange(16), np.zeros((3, 1, 16)))
+        mod.update_state(np.arange(16), np.cumsum(np.ones((1, 1, 16)), axis=-1))
+
+        out = mod.compute()
+        assert out["monotonicity_worst_scores"][0, 0] == 1.0
+        assert np.isnan(out["monotonicity_worst_scores"][1, 0])
@@ -27,3 +27,92 @@ class TestSmoothness:
         np.testing.assert_allclose(
             val, smoothness(np.concatenate(zl, axis=0), np.concatenate(al, axis=0))
         )
+
+    def test_smoothness_reduce_modes(self):
+        for reduce_mode in ["attribute", "sample", "all", "none"]:
+            mod = Smoothness(reduce_mode=reduce_mode)
+
+            zl = []
+            al = []
+
+            for n in [16, 5, 9]:
+                z = np.repeat(
+                    np.repeat(np.arange(16)[None, None, :], n, axis=0), 3, axis=1
+                )
+                a = np.random.randn(n, 3, 16)
+                # an attribute without any curvature in all samples
+                a[:, 1, :] = 2.0 * z[:, 1, :]
+                # a constant attribute in some samples only
+                a[:2, 2, :] = 1.0
+
+                zl.append(z)
+                al.append(a)
+
+                mod.update_state(z, a)
+
+            assert "z" not in mod._buffers
+
+            np.testing.assert_allclose(
+                mod.compute(),
+                smoothness(
+                    np.concatenate(zl, axis=0),
+                    np.concatenate(al, axis=0),
+                    reduce_mode=reduce_mode,
+                ),
+                atol=1e-12,
+            )
+
+    def test_interp_grid(self):
+        grid = np.arange(16.0)
+        mod = Smoothness(reduce_mode="none", interp_grid=grid)
+
+        al = []
+
+        for n in [16, 5, 9]:
+            a = np.random.randn(n, 3, 16)
+            al.append(a)
+
+            mod.update_state(None, a)
+
+        a = np.concatenate(al, axis=0)
+        z = np.broadcast_to(grid, a.shape)
+
+        np.testing.assert_allclose(mod.compute(), smoothness(z, a, reduce_mode="none"))
+
+    def test_top_k(self):
+        mod = Smoothness(reduce_mode="all", top_k=4)
+
+        zl = []
+        al = []
+
+        for n in [16, 5, 9]:
+            z = np.repeat(
+                np.repeat(np.arange(16)[None, None, :], n, axis=0), 3, axis=1
+            )
+            a = np.random.randn(n, 3, 16)
+
+            zl.append(z)
+            al.append(a)
+
+            mod.update_state(z, a)
+
+        out = mod.compute()
+        smth = smoothness(
+            np.concatenate(zl, axis=0), np.concatenate(al, axis=0), reduce_mode="none"
+        )
+
+        np.testing.assert_allclose(out["smoothness"], np.mean(smth))
+        np.testing.assert_equal(
+            out["smoothness_worst_indices"], np.argsort(smth, axis=0)[:4]
+        )
+        np.testing.assert_allclose(
+            out["smoothness_worst_scores"], np.sort(smth, axis=0)[:4]
+        )
+
+        mod.reset_state()
+        mod.update_state(zl[1], al[1])
+
+        np.testing.assert_equal(
+            mod.compute()["smoothness_worst_indices"],
+            np.argsort(smth[16:21], axis=0)[:4],
+        )
@@ -1,7 +1,11 @@
 try:
     import torch
 
-    from latte.metrics.torch.bundles import DependencyAwareMutualInformationBundle
+    from latte.metrics.core.bundles import LiadInterpolatabilityBundle as CoreLiadBundle
+    from latte.metrics.torch.bundles import (
+        DependencyAwareMutualInformationBundle,
+        LiadInterpolatabilityBundle,
+    )
     from latte.metrics.torch.disentanglement import (
         DependencyAwareLatentInformationGap,
         DependencyAwareMutualInformationGap,
@@ -14,6 +18,7 @@ except:
     has_torch = False
 
 
+import numpy as np
 import pytest
 
 
@@ -46,3 +51,50 @@ class TestDMIBundle:
 
         for key in ["MIG", "DMIG", "DLIG", "XMIG"]:
             torch.testing.assert_allclose(bundle_out[key], indiv_out[key])
+
+
+@pytest.mark.skipif(not has_torch, reason="requires torch and torchmetrics")
+class TestLiadBundle:
+    def test_native(self):
+        z = np.arange(16)
+
+        for reduce_mode in ["attribute", "sample", "all", "none"]:
+            core_bundle = CoreLiadBundle(reduce_mode=reduce_mode)
+            torch_bundle = LiadInterpolatabilityBundle(reduce_mode=reduce_mode)
+
+            for _ in range(3):
+                a = np.cumsum(np.random.randn(16, 3, 16), axis=-1)
+                core_bundle.update_state(z, a)
+                torch_bundle.update(torch.from_numpy(z), torch.from_numpy(a))
+
+            core_out = core_bundle.compute()
+            torch_out = torch_bundle.compute()
+
+            for key in ["smoothness", "monotonicity"]:
+                np.testing.assert_allclose(
+                    torch_out[key].numpy(), core_out[key], atol=1e-12
+                )
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        [{"top_k": 2}, {"liad_mode": "spline"}, {"liad_mode": "central"}],
+    )
+    def test_fallback_all(self, kwargs):
+        z = np.arange(16)
+
+        core_bundle = CoreLiadBundle(reduce_mode="all", **kwargs)
+        torch_bundle = LiadInterpolatabilityBundle(reduce_mode="all", **kwargs)
+
+        for _ in range(3):
+            a = np.cumsum(np.random.randn(16, 3, 16), axis=-1)
+            core_bundle.update_state(z, a)
+            torch_bundle.update(torch.from_numpy(z), torch.from_numpy(a))
+
+        core_out = core_bundle.compute()
+        torch_out = torch_bundle.compute()
+
+        assert set(torch_out) == set(core_out)
+        for key in core_out:
+            np.testing.assert_allclose(
+                torch_out[key].numpy(), core_out[key], atol=1e-12
+            )
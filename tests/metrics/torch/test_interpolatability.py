@@ -1,6 +1,7 @@
 try:
     import torch
 
+    from latte.metrics.torch import _interpolatability as TI
     from latte.metrics.torch import interpolatability as T
 
     has_torch_and_tm = True
@@ -10,6 +11,7 @@ except:
 import numpy as np
 import pytest
 
+from latte.functional.interpolatability.smoothness import smoothness
 from latte.metrics.core import interpolatability as C
 
 
@@ -37,3 +39,82 @@ class TestSmoothness:
         np.testing.assert_allclose(val, valtm)
 
         torch.testing.assert_allclose(val, valtm)
+
+    def test_native(self):
+        z = np.repeat(np.repeat(np.arange(16)[None, None, :], 16, axis=0), 8, axis=1)
+
+        for reduce_mode in ["attribute", "sample", "all", "none"]:
+            for liad_mode in ["forward", "central"]:
+                core_smth = C.Smoothness(
+                    liad_mode=liad_mode, reduce_mode=reduce_mode, ptp_mode=0.8
+                )
+                torch_smth = T.Smoothness(
+                    liad_mode=liad_mode, reduce_mode=reduce_mode, ptp_mode=0.8
+                )
+                assert torch_smth.native == (liad_mode == "forward")
+
+                for _ in range(3):
+                    a = np.random.randn(16, 3, 16)
+                    core_smth.update_state(z, a)
+                    torch_smth.update(torch.from_numpy(z), torch.from_numpy(a))
+
+                np.testing.assert_allclose(
+                    torch_smth.compute().numpy(), core_smth.compute(), atol=1e-12
+                )
+
+    def test_old_torch(self, monkeypatch):
+        # an operation missing from older torch versions forces the NumPy path
+        monkeypatch.setattr(TI, "__NATIVE_OPS__", TI.__NATIVE_OPS__ + ["missing_op"])
+
+        z = np.arange(16)
+        a = np.random.randn(16, 3, 16)
+
+        core_smth = C.Smoothness()
+        torch_smth = T.Smoothness()
+        assert not torch_smth.native
+
+        core_smth.update_state(z, a)
+        torch_smth.update(torch.from_numpy(z), torch.from_numpy(a))
+
+        np.testing.assert_allclose(torch_smth.compute().numpy(), core_smth.compute())
+
+    def test_native_reset(self):
+        z = torch.arange(16.0)
+        a = torch.randn(16, 3, 16, requires_grad=True)
+
+        torch_smth = T.Smoothness(interp_grid=z.numpy())
+
+        with torch.no_grad():
+            torch_smth.update(None, 2.0 * a)
+            torch_smth.reset()
+            torch_smth.update(None, a[:4])
+
+        np.testing.assert_allclose(
+            torch_smth.compute().numpy(),
+            smoothness(z.numpy(), a[:4].detach().numpy()),
+            rtol=1e-6,
+        )
+
+
+@pytest.mark.skipif(not has_torch_and_tm, reason="requires torch and torchmetrics")
+class TestMonotonicity:
+    def test_native(self):
+        z = np.arange(16)
+
+        for reduce_mode in ["attribute", "sample", "all", "none"]:
+            for liad_thresh in [1e-3, np.array([0.5, 1e-3])]:
+                core_mntc = C.Monotonicity(
+                    reduce_mode=reduce_mode, liad_thresh=liad_thresh, nanmean=False
+                )
+                torch_mntc = T.Monotonicity(
+                    reduce_mode=reduce_mode, liad_thresh=liad_thresh, nanmean=False
+                )
+
+                for _ in range(3):
+                    a = np.cumsum(np.random.randn(16, 3, 16), axis=-1)
+                    core_mntc.update_state(z, a)
+                    torch_mntc.update(torch.from_numpy(z), torch.from_numpy(a))
+
+                np.testing.assert_allclose(
+                    torch_mntc.compute().numpy(), core_mntc.compute(), atol=1e-12
+                )